@@ -0,0 +1,358 @@
+"""
+Agent loop benchmarks against a deterministic fake LLM.
+
+Measures what proto-agent itself costs per turn, separately from provider
+latency: framework overhead (message conversion, bookkeeping, dispatch),
+request serialization, toolkit latency percentiles and memory growth over a
+long session. Results are written as JSON so runs of different versions can
+be compared:
+
+    python benchmarks/bench_agent.py
+    python benchmarks/bench_agent.py --compare benchmarks/results/0.7.1.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_llm import FakeCompletion, ToolCall  # noqa: E402
+
+from proto_agent import Agent, AgentConfig  # noqa: E402
+from proto_agent.tool_kit_registry import ToolKitRegistery  # noqa: E402
+from proto_agent.tool_kits import FileOperationToolkit  # noqa: E402
+from proto_agent.tool_kits.search_index import SearchIndex  # noqa: E402
+
+RESULTS_DIRECTORY = Path(__file__).resolve().parent / "results"
+
+TOOL_LOOP_SCRIPT = [
+    [ToolCall("get_files_info", {"directory": ".", "recursive": True, "limit": 200})],
+    [
+        ToolCall("get_file_content", {"file_path": "pkg/module_7.py"}),
+        ToolCall("search_files", {"pattern": "def function_3"}),
+    ],
+    [ToolCall("get_file_content", {"file_path": "pkg/module_42.py", "start_line": 5})],
+    "The functions are defined in pkg/.",
+]
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of a sample, nearest-rank"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p * len(ordered)) - 1))]
+
+    return {
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+        "count": len(ordered),
+    }
+
+
+def _milliseconds(values: List[float]) -> List[float]:
+    return [value * 1000 for value in values]
+
+
+def make_workspace(root: Path, modules: int = 100) -> Path:
+    """A small synthetic project for the toolkit calls to work on"""
+    package = root / "pkg"
+    package.mkdir(parents=True, exist_ok=True)
+    for index in range(modules):
+        functions = "\n\n".join(
+            f"def function_{n}(value):\n    return value * {n}\n" for n in range(20)
+        )
+        (package / f"module_{index}.py").write_text(
+            f'"""Module {index}"""\n\nimport os\n\n{functions}'
+        )
+    (root / "README.md").write_text("# Benchmark workspace\n")
+    return root
+
+
+class ToolTimer:
+    """Wraps an agent's registry dispatch to time each toolkit call"""
+
+    def __init__(self, dispatch):
+        self.samples: Dict[str, List[float]] = {}
+        self.total = 0.0
+        self._dispatch = dispatch
+
+    def __call__(self, name, working_directory, args):
+        start = time.perf_counter()
+        try:
+            return self._dispatch(name, working_directory, args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.total += elapsed
+            self.samples.setdefault(name, []).append(elapsed)
+
+
+@contextmanager
+def fake_llm(fake: FakeCompletion):
+    with patch("proto_agent.agent.completion", fake):
+        yield
+
+
+class Scenario:
+    """Runs prompts through an agent and accumulates per-turn measurements"""
+
+    def __init__(self, workspace: Path, script, latency: float, tool_cache: bool):
+        ToolKitRegistery.cache.clear()
+        ToolKitRegistery.cache.enabled = tool_cache
+        toolkit = FileOperationToolkit(enable_write=False, enable_execute=False)
+        self.agent = Agent(
+            AgentConfig(
+                api_key="benchmark",
+                model="fake/model",
+                working_directory=str(workspace),
+                tools=[toolkit.tool],
+                max_iterations=len(script) + 1,
+            )
+        )
+        self.fake = FakeCompletion(script=script, latency=latency)
+        self.timer = ToolTimer(self.agent.registry.dispatch)
+        self.overhead: List[float] = []
+        self.serialization: List[float] = []
+        self.request_bytes: List[int] = []
+
+    def prompt(self, text: str):
+        calls_before = len(self.fake.calls)
+        tools_before = self.timer.total
+        start = time.perf_counter()
+        # Anything the agent prints still costs time but would bury the report
+        with (
+            fake_llm(self.fake),
+            patch.object(self.agent.registry, "dispatch", self.timer),
+            redirect_stdout(io.StringIO()),
+        ):
+            self.agent.generate_content(prompt=text)
+        total = time.perf_counter() - start
+        calls = self.fake.calls[calls_before:]
+        model_time = sum(call.exited - call.entered for call in calls)
+        tool_time = self.timer.total - tools_before
+        # Spread the framework's share of the prompt evenly over its turns
+        per_turn = (total - model_time - tool_time) / max(len(calls), 1)
+        self.overhead.extend([per_turn] * len(calls))
+        self.serialization.extend(call.serialization_seconds for call in calls)
+        self.request_bytes.extend(call.request_bytes for call in calls)
+
+    def results(self) -> dict:
+        return {
+            "turns": len(self.overhead),
+            "overhead_ms": percentiles(_milliseconds(self.overhead)),
+            "serialization_ms": percentiles(_milliseconds(self.serialization)),
+            "request_bytes": {
+                "first": self.request_bytes[0] if self.request_bytes else 0,
+                "last": self.request_bytes[-1] if self.request_bytes else 0,
+            },
+            "tool_latency_ms": {
+                name: percentiles(_milliseconds(samples))
+                for name, samples in sorted(self.timer.samples.items())
+            },
+        }
+
+
+def bench_single_turn(workspace: Path, args) -> dict:
+    """A prompt answered without tools, conversation cleared in between"""
+    scenario = Scenario(workspace, ["Hello!"], args.latency, args.tool_cache)
+    for index in range(args.sessions):
+        scenario.agent.clear_messages()
+        scenario.prompt(f"Say hello #{index}")
+    return scenario.results()
+
+
+def bench_tool_loop(workspace: Path, args) -> dict:
+    """Scripted multi-turn tool use, conversation cleared in between"""
+    scenario = Scenario(workspace, TOOL_LOOP_SCRIPT, args.latency, args.tool_cache)
+    for index in range(args.sessions):
+        scenario.agent.clear_messages()
+        scenario.prompt(f"Where are the functions defined? #{index}")
+    return scenario.results()
+
+
+def bench_long_session(workspace: Path, args) -> dict:
+    """Tool loops in one ever-growing conversation, with memory tracing"""
+    scenario = Scenario(workspace, TOOL_LOOP_SCRIPT, args.latency, args.tool_cache)
+    tracemalloc.start()
+    try:
+        scenario.prompt("warm up")
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for index in range(args.session_prompts):
+            scenario.prompt(f"Where are the functions defined? #{index}")
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    results = scenario.results()
+    results["memory"] = {
+        "traced": True,
+        "start_kib": baseline / 1024,
+        "end_kib": current / 1024,
+        "peak_kib": peak / 1024,
+        "growth_per_turn_kib": (current - baseline) / 1024 / max(results["turns"], 1),
+        "messages": len(scenario.agent.conversation),
+    }
+    return results
+
+
+SCENARIOS = {
+    "single_turn": bench_single_turn,
+    "tool_loop": bench_tool_loop,
+    "long_session": bench_long_session,
+}
+
+
+def _version() -> str:
+    try:
+        return metadata.version("proto-agent")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = make_workspace(Path(directory) / "workspace")
+        # Keep the search index of the throwaway workspace out of the user cache
+        SearchIndex.cache_dir = Path(directory) / "cache"
+        scenarios = {}
+        for name, bench in SCENARIOS.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            start = time.perf_counter()
+            scenarios[name] = bench(workspace, args)
+            scenarios[name]["wall_seconds"] = time.perf_counter() - start
+        for index in SearchIndex._indexes.values():
+            index.close()
+        SearchIndex._indexes.clear()
+        SearchIndex.cache_dir = None
+    return {
+        "version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "sessions": args.sessions,
+            "session_prompts": args.session_prompts,
+            "latency": args.latency,
+            "tool_cache": args.tool_cache,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def _metrics(results: dict) -> Dict[str, float]:
+    """Flatten the numbers that are compared between runs, lower is better"""
+    metrics = {}
+    for name, scenario in results["scenarios"].items():
+        for key in ("overhead_ms", "serialization_ms"):
+            for stat in ("p50", "p95"):
+                if stat in scenario.get(key, {}):
+                    metrics[f"{name}.{key}.{stat}"] = scenario[key][stat]
+        for tool, stats in scenario.get("tool_latency_ms", {}).items():
+            metrics[f"{name}.tool.{tool}.p95"] = stats["p95"]
+        if "memory" in scenario:
+            metrics[f"{name}.memory.growth_per_turn_kib"] = scenario["memory"][
+                "growth_per_turn_kib"
+            ]
+    return metrics
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the metrics that regressed"""
+    old, new = _metrics(baseline), _metrics(current)
+    regressions = []
+    print(
+        f"{'metric':<58} {baseline['version']:>10} {current['version']:>10} {'change':>8}"
+    )
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and after - before > 0.01:
+            regressions.append(key)
+            flag = "  <-- regression"
+        print(f"{key:<58} {before:>10.3f} {after:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _summary(results: dict):
+    for name, scenario in results["scenarios"].items():
+        overhead = scenario["overhead_ms"]
+        line = (
+            f"{name:<14} turns={scenario['turns']:<6} "
+            f"overhead p50={overhead.get('p50', 0):.3f}ms p95={overhead.get('p95', 0):.3f}ms "
+            f"serialization p95={scenario['serialization_ms'].get('p95', 0):.3f}ms"
+        )
+        if "memory" in scenario:
+            line += f" memory/turn={scenario['memory']['growth_per_turn_kib']:.1f}KiB"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--session-prompts", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds each fake completion takes"
+    )
+    parser.add_argument(
+        "--no-tool-cache",
+        dest="tool_cache",
+        action="store_false",
+        help="Disable the toolkit result cache",
+    )
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), help="Only run these"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Where to save the results (default: benchmarks/results/<version>.json)",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative slowdown reported as a regression (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    _summary(results)
+    output = args.output or RESULTS_DIRECTORY / f"{results['version']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        regressions = compare(
+            json.loads(args.compare.read_text()), results, args.threshold
+        )
+        if regressions:
+            print(
+                f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+CLI startup benchmark.
+
+Times fresh interpreters importing the package and running
+``proto-agent --help``, and records which heavy dependencies each one
+loaded. The CLI is started thousands of times a day from scripts, so none of
+litellm, psutil or pydantic may load before a completion or toolkit needs
+them:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --compare benchmarks/results/startup-0.7.1.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_agent import RESULTS_DIRECTORY, _milliseconds, _version, percentiles  # noqa: E402
+
+SOURCE_DIRECTORY = Path(__file__).resolve().parent.parent / "src"
+
+# Dependencies that must stay unloaded until they are needed
+HEAVY_MODULES = ("litellm", "openai", "psutil", "pydantic", "asyncio")
+
+# Reports the heavy modules that were loaded once the interpreter exits
+_PRELUDE = (
+    "import atexit, json, sys\n"
+    "atexit.register(lambda: print(json.dumps("
+    f"[m for m in {HEAVY_MODULES!r} if m in sys.modules]), file=sys.stderr))\n"
+)
+
+SCENARIOS = {
+    # Nothing but the interpreter, the floor under every other number
+    "python": "pass",
+    "import_cli": "import proto_agent.main",
+    "help": (
+        "import proto_agent.main\n"
+        "sys.argv = ['proto-agent', '--help']\n"
+        "proto_agent.main.main_cli()"
+    ),
+    "import_agent": "from proto_agent import Agent",
+}
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(SOURCE_DIRECTORY), env.get("PYTHONPATH")])
+    )
+    return env
+
+
+def bench_scenario(code: str, runs: int) -> dict:
+    env = _environment()
+    durations = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-c", _PRELUDE + code],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        durations.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr)
+        lines = process.stderr.strip().splitlines()
+        if lines:
+            loaded = json.loads(lines[-1])
+    return {"wall_ms": percentiles(_milliseconds(durations)), "loaded": loaded}
+
+
+def run(args) -> dict:
+    scenarios = {}
+    for name, code in SCENARIOS.items():
+        if args.scenario and name not in args.scenario:
+            continue
+        scenarios[name] = bench_scenario(code, args.runs)
+    return {
+        "version": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"runs": args.runs},
+        "scenarios": scenarios,
+    }
+
+
+def _metrics(results: dict) -> Dict[str, float]:
+    return {
+        f"{name}.wall_ms.{stat}": scenario["wall_ms"][stat]
+        for name, scenario in results["scenarios"].items()
+        for stat in ("p50", "p95")
+        if stat in scenario["wall_ms"]
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the metrics that regressed"""
+    old, new = _metrics(baseline), _metrics(current)
+    regressions = []
+    print(
+        f"{'metric':<32} {baseline['version']:>10} {current['version']:>10} {'change':>8}"
+    )
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        # A few milliseconds is process start-up noise
+        if change > threshold and after - before > 5:
+            regressions.append(key)
+            flag = "  <-- regression"
+        print(f"{key:<32} {before:>10.1f} {after:>10.1f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def eager_imports(results: dict) -> Dict[str, List[str]]:
+    """Heavy modules loaded by scenarios that should not have loaded any"""
+    return {
+        name: scenario["loaded"]
+        for name, scenario in results["scenarios"].items()
+        if name in ("import_cli", "help") and scenario["loaded"]
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--runs", type=int, default=20, help="Interpreters per scenario"
+    )
+    parser.add_argument(
+        "--scenario", action="append", choices=sorted(SCENARIOS), help="Only run these"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Where to save the results (default: benchmarks/results/startup-<version>.json)",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative slowdown reported as a regression (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    for name, scenario in results["scenarios"].items():
+        wall = scenario["wall_ms"]
+        print(
+            f"{name:<14} p50={wall['p50']:.1f}ms p95={wall['p95']:.1f}ms "
+            f"loaded={','.join(scenario['loaded']) or '-'}"
+        )
+    output = args.output or RESULTS_DIRECTORY / f"startup-{results['version']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results saved to {output}")
+
+    status = 0
+    for name, modules in eager_imports(results).items():
+        print(f"{name} loaded {', '.join(modules)} at startup")
+        status = 1
+    if args.compare:
+        regressions = compare(
+            json.loads(args.compare.read_text()), results, args.threshold
+        )
+        if regressions:
+            print(
+                f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}"
+            )
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Deterministic stand-in for ``litellm.completion``.
+Replays a script of turns, each either a list of tool calls or a final
+answer, and returns responses shaped like litellm's. Every call is timed and
+the request is serialized to JSON the way a provider client would, so the
+harness can separate framework overhead from "model" time and track how
+request size grows with the conversation.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import List, Optional, Union
+
+
+@dataclass
+class ToolCall:
+    name: str
+    arguments: dict
+
+
+Turn = Union[str, List[ToolCall]]
+
+
+@dataclass
+class CallRecord:
+    """Timing of one completion call"""
+
+    entered: float
+    exited: float
+    serialization_seconds: float
+    request_bytes: int
+    message_count: int
+
+
+@dataclass
+class FakeCompletion:
+    """Replays ``script`` in a loop, one turn per completion call
+
+    Args:
+        script: Turns to replay, a string is a final answer, a list of
+            ``ToolCall`` is one assistant turn calling those tools
+        latency: Seconds each call sleeps to imitate the provider
+    """
+
+    script: List[Turn]
+    latency: float = 0.0
+    calls: List[CallRecord] = field(default_factory=list)
+    _position: int = 0
+    _call_ids: int = 0
+
+    def __call__(self, **kwargs) -> SimpleNamespace:
+        entered = time.perf_counter()
+        start = time.perf_counter()
+        request = json.dumps(
+            {"messages": kwargs.get("messages"), "tools": kwargs.get("tools")},
+            default=str,
+        )
+        serialization = time.perf_counter() - start
+        if self.latency:
+            time.sleep(self.latency)
+
+        turn = self.script[self._position % len(self.script)]
+        self._position += 1
+        response = self._response(turn, len(request))
+        self.calls.append(
+            CallRecord(
+                entered=entered,
+                exited=time.perf_counter(),
+                serialization_seconds=serialization,
+                request_bytes=len(request),
+                message_count=len(kwargs.get("messages") or []),
+            )
+        )
+        return response
+
+    def _response(self, turn: Turn, request_bytes: int) -> SimpleNamespace:
+        content: Optional[str] = turn if isinstance(turn, str) else None
+        tool_calls = None
+        if not isinstance(turn, str):
+            tool_calls = []
+            for call in turn:
+                self._call_ids += 1
+                tool_calls.append(
+                    SimpleNamespace(
+                        id=f"call_{self._call_ids}",
+                        type="function",
+                        function=SimpleNamespace(
+                            name=call.name, arguments=json.dumps(call.arguments)
+                        ),
+                    )
+                )
+        message = SimpleNamespace(content=content, tool_calls=tool_calls)
+        prompt_tokens = request_bytes // 4
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=16,
+            total_tokens=prompt_tokens + 16,
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def reset(self):
+        self.calls.clear()
+        self._position = 0
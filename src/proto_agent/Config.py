@@ -1,4 +1,10 @@
 MAX_BYTES = 10_000  # Max Bytes read from a file
+MAX_LIST_ENTRIES = 1_000  # Max entries returned by one directory listing
+MAX_SEARCH_RESULTS = 100  # Max matching lines returned by one search
+MAX_SEARCH_LINE_CHARS = 300  # Matching lines are cut to this length
+MAX_OUTPUT_BYTES = 20_000  # Max bytes kept per output stream of an executed script
+EXECUTION_TIMEOUT = 30  # Wall-clock seconds a script may run
+EXECUTION_MEMORY_LIMIT = 2 * 1024**3  # Address space limit of a script, in bytes
 
 
 SYSTEM_PROMPT = """
@@ -10,9 +16,11 @@ Use this mode when the user requests file operations or code execution, Before y
 **Available Functions:**
 - `get_file_content`: Read and return file contents
 - `get_files_info`: List file/directory metadata  
+- `search_files`: Search file contents for text or a regex
 - `is_in_boundary`: Verify file path permissions
 - `run_python_file`: Execute Python files
-- `write_file`: Create or modify files
+- `write_file`: Create or overwrite files
+- `edit_file`: Change part of a file with a diff or search/replace blocks
 
 **Function Call Rules:**
 1. **File Path Handling:**
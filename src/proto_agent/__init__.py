@@ -3,9 +3,45 @@ this package provides an ai agent framework that can be used both as a CLI tool
 and imported as a library for custom apps.
 """
 
-from .agent import Agent
-from .agent_settings import AgentConfig
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .agent import Agent
+    from .async_agent import AsyncAgent
+    from .agent_settings import AgentConfig
+    from .completion_cache import CompletionCache
+    from .conversation import ConversationStore
+    from .instrumentation import InstrumentationHook, OTLPJsonExporter
 
 
 __version__ = "0.1.0"
-__all__ = ["Agent", "AgentConfig"]
+__all__ = [
+    "Agent",
+    "AsyncAgent",
+    "AgentConfig",
+    "CompletionCache",
+    "ConversationStore",
+    "InstrumentationHook",
+    "OTLPJsonExporter",
+]
+
+# Exports are imported on first access so that the CLI (and scripts that only
+# need part of the package) don't pay for pydantic and asyncio up front
+_EXPORTS = {
+    "Agent": ".agent",
+    "AsyncAgent": ".async_agent",
+    "AgentConfig": ".agent_settings",
+    "CompletionCache": ".completion_cache",
+    "ConversationStore": ".conversation",
+    "InstrumentationHook": ".instrumentation",
+    "OTLPJsonExporter": ".instrumentation",
+}
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,11 +1,16 @@
-from typing import List
-from litellm import completion
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List
 import json
 import time
 
 from pydantic import BaseModel
-from .Config import SYSTEM_PROMPT
 from .agent_settings import AgentConfig
+from .compaction import CompactionResult
+from .conversation import ConversationStore, estimate_tokens
+from .instrumentation import Instrumentation, args_hash, result_bytes
+from .prompt_cache import add_cache_breakpoints, cached_tokens, uses_cache_breakpoints
+from .scheduler import default_scheduler
+from .streaming import ToolCallAssembler
 from .tool_kit_registry import ToolKitRegistery
 from .types_llm import (
     Content,
@@ -13,6 +18,7 @@ from .types_llm import (
     Part,
     FunctionCall,
     GenerateContentResponse,
+    StreamEvent,
     UsageMetadata,
 )
 from typing import TypeVar
@@ -20,6 +26,13 @@ from typing import TypeVar
 T = TypeVar("T", bound=BaseModel)
 
 
+def completion(**kwargs):
+    """``litellm.completion``, imported on the first call since litellm takes seconds to load"""
+    from litellm import completion
+
+    return completion(**kwargs)
+
+
 def _create_error_response(function_name: str, error: str) -> Content:
     return Content(
         role="tool",
@@ -32,20 +45,45 @@ def _create_error_response(function_name: str, error: str) -> Content:
     )
 
 
+def _create_function_response(function_name: str, result) -> Content:
+    return Content(
+        role="tool",
+        parts=[
+            Part.from_function_response(
+                name=function_name,
+                response={"result": result},
+            )
+        ],
+    )
+
+
 class Agent:
-    def __init__(self, settings: AgentConfig):
+    def __init__(
+        self, settings: AgentConfig, conversation: ConversationStore | None = None
+    ):
         self.settings = settings
         self._last_tool_call_ids = []
 
         self._litellm_tools = None
         if self.settings.tools:
             self._litellm_tools = self._convert_tools_to_litellm(self.settings.tools)
-
-        self._litellm_messages = []
-        self._litellm_messages.append(
-            {"role": "system", "content": self.settings.system_prompt}
+        self.registry = ToolKitRegistery.for_tools(self.settings.tools or [])
+        self.scheduler = self.settings.scheduler or default_scheduler
+        self._tool_tokens: int | None = None
+
+        self.instrumentation = Instrumentation(self.settings.hooks)
+        self.last_compaction: CompactionResult | None = None
+        self.tokens_saved_by_compaction = 0
+        self.conversation = (
+            conversation
+            if conversation is not None
+            else ConversationStore(self.settings.system_prompt)
         )
 
+    @property
+    def _litellm_messages(self) -> List[dict]:
+        return self.conversation.messages
+
     def _convert_content_to_litellm_message(self, content: Content) -> List[dict]:
         """Convert a single Content message to LiteLLM format"""
         messages = []
@@ -65,7 +103,10 @@ class Agent:
 
             if has_function_calls:
                 tool_calls = []
-                for i, part in enumerate(content.parts):
+                function_call_parts = [
+                    part for part in content.parts if part.function_call
+                ]
+                for i, part in enumerate(function_call_parts):
                     if part.function_call:
                         tool_call_id = self._last_tool_call_ids[i]
                         tool_calls.append(
@@ -107,224 +148,590 @@ class Agent:
 
     def _convert_tools_to_litellm(self, tools):
         """Convert our tool format to LiteLLM tools format"""
-        litellm_tools = []
-
-        for tool in tools:
-            for func_decl in tool.function_declarations:
-                litellm_tools.append(
-                    {
-                        "type": "function",
-                        "function": {
-                            "name": func_decl.name,
-                            "description": func_decl.description,
-                            "parameters": func_decl.parameters,
-                        },
-                    }
-                )
-
-        return litellm_tools
+        return [schema for tool in tools for schema in tool.litellm_tools()]
 
     def clear_messages(self):
         """Clear the message history"""
-        self._litellm_messages = []
+        self.conversation.clear()
         self._last_tool_call_ids = []
-        if SYSTEM_PROMPT:
-            self._litellm_messages.append({"role": "system", "content": SYSTEM_PROMPT})
 
-    def call_function(self, function_call_part: FunctionCall, verbose=False):
+    def _resolve_function(self, function_call_part: FunctionCall):
+        """Look up the function to run, returning it or an error response"""
         if function_call_part.name is None:
-            return _create_error_response(
+            return None, _create_error_response(
                 "Invalid function", f"Unknown function: {function_call_part.name}"
             )
-        function_to_run = ToolKitRegistery.get_function(function_call_part.name)
+        function_to_run = self.registry.get_function(function_call_part.name)
         if function_to_run is None:
-            return _create_error_response(
+            return None, _create_error_response(
                 "Invalid function", f"Unknown function: {function_call_part.name}"
             )
-        if verbose:
-            print(
-                f"Calling function: {function_call_part.name}({function_call_part.args})"
-            )
-        else:
-            print(f" - Calling function: {function_call_part.name}")
-        print(function_call_part.name, self.settings.permission_required)
-        if (
+        return function_to_run, None
+
+    def _needs_permission(self, function_call_part: FunctionCall) -> bool:
+        return bool(
             function_call_part.name in self.settings.permission_required
             and self.settings.permission_callback
-        ):
-            if not self.settings.permission_callback(
-                function_call_part.name, function_call_part.args or {}
-            ):
-                return _create_error_response(
-                    function_call_part.name, "User Refused to run function"
-                )
-        args_dict = (function_call_part.args) if function_call_part.args else {}
-        res = function_to_run(
-            working_directory=self.settings.working_directory, **args_dict
         )
-        return Content(
-            role="tool",
-            parts=[
-                Part.from_function_response(
-                    name=function_call_part.name,
-                    response={"result": res},
-                )
-            ],
+
+    def _tool_span(self, function_call_part: FunctionCall):
+        return self.instrumentation.span(
+            "tool.call",
+            **{
+                "tool.name": function_call_part.name,
+                "tool.args_hash": args_hash(function_call_part.args),
+            },
         )
 
-    def generate_content(
-        self,
-        prompt: str | None = None,
-        messages: List[Content] | None = None,
-        response_model: type[T] | None = None,
-        verbose: bool = False,
-    ) -> GenerateContentResponse[T]:
+    def _record_tool_result(self, span, function_call_part: FunctionCall, result):
+        size = result_bytes(result)
+        span.set_attribute("tool.result_bytes", size)
+        self.instrumentation.count(
+            "tool.result.bytes", size, **{"tool.name": function_call_part.name}
+        )
+
+    def _permission_span(self, function_call_part: FunctionCall):
+        return self.instrumentation.span(
+            "permission.wait", **{"tool.name": function_call_part.name}
+        )
+
+    def call_function(self, function_call_part: FunctionCall, verbose=False):
+        with self._tool_span(function_call_part) as span:
+            function_to_run, error = self._resolve_function(function_call_part)
+            if error is not None:
+                return error
+            if self._needs_permission(function_call_part):
+                with self._permission_span(function_call_part) as permission:
+                    granted = self.settings.permission_callback(
+                        function_call_part.name, function_call_part.args or {}
+                    )
+                    permission.set_attribute("permission.granted", bool(granted))
+                if not granted:
+                    return _create_error_response(
+                        function_call_part.name, "User Refused to run function"
+                    )
+            args_dict = (function_call_part.args) if function_call_part.args else {}
+            res = self.registry.dispatch(
+                function_call_part.name, self.settings.working_directory, args_dict
+            )
+            self._record_tool_result(span, function_call_part, res)
+            return _create_function_response(function_call_part.name, res)
+
+    def _execute_function_calls(
+        self, function_calls: List[FunctionCall], verbose=False
+    ) -> List[Content]:
+        """Run the function calls of one turn, returning results in call order.
+
+        With ``parallel_tool_calls`` enabled, calls that don't need permission are
+        fanned out to a bounded thread pool, while calls in ``permission_required``
+        run one at a time on the calling thread so that the permission callback
+        is never prompted concurrently.
+        """
+        if not self.settings.parallel_tool_calls or len(function_calls) < 2:
+            return [self.call_function(call, verbose) for call in function_calls]
+
+        results: List[Content | None] = [None] * len(function_calls)
+        independent = [
+            i
+            for i, call in enumerate(function_calls)
+            if call.name not in self.settings.permission_required
+        ]
+        max_workers = max(
+            1, min(self.settings.max_parallel_tool_calls, len(independent) or 1)
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                i: executor.submit(
+                    self.instrumentation.bind(self.call_function),
+                    function_calls[i],
+                    verbose,
+                )
+                for i in independent
+            }
+            for i, call in enumerate(function_calls):
+                if i not in futures:
+                    results[i] = self.call_function(call, verbose)
+            for i, future in futures.items():
+                results[i] = future.result()
+
+        return [result for result in results if result is not None]
+
+    def _start_turn(
+        self, prompt: str | None, messages: List[Content] | None
+    ) -> List[Content]:
+        """Append the incoming messages to the history and return the working copy"""
         if messages is None:
             if prompt is None:
                 raise ValueError("Either prompt or messages must be provided")
             messages = [Content(role="user", parts=[Part(text=prompt)])]
 
-        for message in messages:
-            new_litellm_messages = self._convert_content_to_litellm_message(message)
-            self._litellm_messages.extend(new_litellm_messages)
+        with self.instrumentation.span("messages.convert", messages=len(messages)):
+            for message in messages:
+                new_litellm_messages = self._convert_content_to_litellm_message(message)
+                self.conversation.extend(new_litellm_messages)
+
+        return messages.copy()
+
+    def _compact_history(self, verbose: bool = False):
+        """Run the configured compactor before a completion call"""
+        if self.settings.compactor is None:
+            return
+        result = self.settings.compactor.compact(self.conversation, self.settings.model)
+        self.last_compaction = result
+        self.tokens_saved_by_compaction += result.tokens_saved
+        if verbose and result.tokens_saved:
+            print(
+                f"Compacted {result.messages_compacted} message(s), "
+                f"saved ~{result.tokens_saved} tokens"
+            )
 
-        working_messages = messages.copy()
-        iterations = 0
-        is_verbose = verbose or self.settings.verbose
+    def _route_tools(self, verbose: bool = False):
+        """Tool schemas offered for the next completion, narrowed by the configured router"""
+        tools = self._litellm_tools
+        if self.settings.tool_router is None or not tools:
+            return tools
+        selected = self.settings.tool_router.select(tools, self.conversation.messages)
+        self.instrumentation.count(
+            "llm.tools.offered", len(selected), model=self.settings.model
+        )
+        if verbose and len(selected) < len(tools):
+            print(f"Offering {len(selected)} of {len(tools)} tools")
+        return selected
+
+    def _prepare_completion(
+        self, response_model: type[T] | None, verbose: bool = False
+    ) -> dict:
+        """Compact the history and build the arguments for the completion call"""
+        self._compact_history(verbose)
+        messages, tools = self.conversation.messages, self._route_tools(verbose)
+        if self._uses_cache_breakpoints():
+            messages, tools = add_cache_breakpoints(messages, tools)
+        return {
+            "api_key": self.settings.api_key,
+            "model": self.settings.model,
+            "messages": messages,
+            "tools": tools,
+            "temperature": 1.0,
+            "response_format": ExctractedWrapper[response_model]
+            if response_model
+            else None,
+        }
+
+    def _uses_cache_breakpoints(self) -> bool:
+        """``prompt_caching`` if set, otherwise whether the model needs breakpoints to cache"""
+        if self.settings.prompt_caching is not None:
+            return self.settings.prompt_caching
+        return uses_cache_breakpoints(self.settings.model)
+
+    def _request_tokens(self) -> int:
+        """Estimated prompt tokens of the next completion, charged to the rate limiter"""
+        if self._tool_tokens is None:
+            self._tool_tokens = (
+                estimate_tokens(json.dumps(self._litellm_tools).encode())
+                if self._litellm_tools
+                else 0
+            )
+        return self.conversation.total_tokens + self._tool_tokens
+
+    def _settle_stream_usage(self, estimated: int, usage):
+        self.scheduler.settle_usage(
+            self.settings.model, self.settings.api_key, estimated, usage
+        )
+
+    def _completion_span(self):
+        """Span around one completion call, counting the size of the request"""
+        request_bytes = self.conversation.total_bytes
+        self.instrumentation.count(
+            "llm.request.bytes", request_bytes, model=self.settings.model
+        )
+        return self.instrumentation.span(
+            "llm.completion",
+            **{
+                "llm.model": self.settings.model,
+                "llm.messages": len(self.conversation),
+                "llm.request.bytes": request_bytes,
+            },
+        )
+
+    def _cached_completion(self, completion_kwargs: dict, span):
+        """Key of the request in the completion cache and the cached response, if any"""
+        cache = self.settings.completion_cache
+        if cache is None:
+            return None, None
+        key, response = cache.lookup(completion_kwargs)
+        if key is not None:
+            hit = response is not None
+            span.set_attribute("llm.completion_cache.hit", hit)
+            self.instrumentation.count(
+                "llm.completion_cache",
+                result="hit" if hit else "miss",
+                model=self.settings.model,
+            )
+        return key, response
+
+    def _cache_completion(self, key, response):
+        if key is not None:
+            self.settings.completion_cache.store(key, self.settings.model, response)
+
+    def _record_usage(self, usage, span=None):
+        """Count token usage, attaching it to the completion span if it is still open"""
+        if not usage:
+            return
+        for token_type, attribute in (
+            ("prompt", "prompt_tokens"),
+            ("completion", "completion_tokens"),
+        ):
+            tokens = getattr(usage, attribute, 0) or 0
+            if span is not None:
+                span.set_attribute(f"llm.usage.{attribute}", tokens)
+            self.instrumentation.count(
+                "llm.tokens", tokens, type=token_type, model=self.settings.model
+            )
+        # A subset of the prompt tokens, counted apart to show the cache savings
+        cached = cached_tokens(usage)
+        if span is not None:
+            span.set_attribute("llm.usage.cached_tokens", cached)
+        if cached:
+            self.instrumentation.count(
+                "llm.tokens", cached, type="cached", model=self.settings.model
+            )
+
+    def _response_message(self, response):
+        choices = getattr(response, "choices", [])
+        if not choices:
+            raise Exception("No choices returned from LiteLLM")
+
+        message = getattr(choices[0], "message", None)
+        if not message:
+            raise Exception("No message in response choice")
+        return message
+
+    def _final_response(
+        self, usage, response_text: str, response_model: type[T] | None
+    ) -> GenerateContentResponse[T]:
+        """Record the assistant's final answer and build the returned response"""
+        usage_metadata = None
+        if usage:
+            usage_metadata = UsageMetadata(
+                prompt_token_count=getattr(usage, "prompt_tokens", 0),
+                candidates_token_count=getattr(usage, "completion_tokens", 0),
+                total_token_count=getattr(usage, "total_tokens", 0),
+                cached_content_token_count=cached_tokens(usage),
+            )
+        assistant_content = Content(role="assistant", parts=[Part(text=response_text)])
+        with self.instrumentation.span("messages.convert", messages=1):
+            assistant_litellm_messages = self._convert_content_to_litellm_message(
+                assistant_content
+            )
+            self.conversation.extend(assistant_litellm_messages)
+        if response_model:
+            parsed_data = json.loads(response_text)
+            response_object = ExctractedWrapper(**parsed_data)
+        else:
+            response_object = None
+
+        return GenerateContentResponse(
+            text=response_text,
+            function_calls=[],
+            usage_metadata=usage_metadata,
+            response_object=(response_object),
+        )
+
+    def _record_tool_calls(
+        self,
+        tool_calls,
+        response_text: str | None,
+        working_messages: List[Content],
+        is_verbose: bool,
+    ) -> List[FunctionCall]:
+        """Record the assistant's tool calls in the history and return them"""
+        with self.instrumentation.span("messages.convert", messages=1):
+            function_calls = []
+            function_call_parts = []
+            litellm_tool_calls = []
+            self._last_tool_call_ids = []
+
+            for i, tool_call in enumerate(tool_calls):
+                func_obj = getattr(tool_call, "function", None)
+                if not func_obj:
+                    continue
+
+                func_name = getattr(func_obj, "name", "") or ""
+                func_args = getattr(func_obj, "arguments", "{}") or "{}"
+                tool_call_id = getattr(tool_call, "id", f"call_{i}")
+
+                self._last_tool_call_ids.append(tool_call_id)
+
+                function_call = FunctionCall(
+                    name=func_name,
+                    arguments=json.loads(func_args) if func_args else {},
+                )
+                function_calls.append(function_call)
+                # Send the model's own argument string back instead of re-encoding it
+                litellm_tool_calls.append(
+                    {
+                        "id": tool_call_id,
+                        "type": "function",
+                        "function": {"name": func_name, "arguments": func_args},
+                    }
+                )
 
-        while iterations < self.settings.max_iterations:
-            try:
-                start_time = time.time()
-                response = completion(
-                    api_key=self.settings.api_key,
-                    model=self.settings.model,
-                    messages=self._litellm_messages,
-                    tools=self._litellm_tools,
-                    temperature=1.0,
-                    response_format=ExctractedWrapper[response_model] if response_model else None,
-                ) 
-                end_time = time.time()
                 if is_verbose:
                     print(
-                        f"LiteLLM completion took {end_time - start_time:.2f} seconds"
-                    )
-                choices = getattr(response, "choices", [])
-                if not choices:
-                    raise Exception("No choices returned from LiteLLM")
-
-                message = getattr(choices[0], "message", None)
-                if not message:
-                    raise Exception("No message in response choice")
-
-                response_text = getattr(message, "content", "")
-                # Check for tool calls
-                tool_calls = getattr(message, "tool_calls", None)
-                if not tool_calls:
-                    usage_metadata = None
-                    usage = getattr(response, "usage", None)
-                    if usage:
-                        usage_metadata = UsageMetadata(
-                            prompt_token_count=getattr(usage, "prompt_tokens", 0),
-                            candidates_token_count=getattr(
-                                usage, "completion_tokens", 0
-                            ),
-                            total_token_count=getattr(usage, "total_tokens", 0),
-                        )
-                    assistant_content = Content(
-                        role="assistant", parts=[Part(text=response_text)]
-                    )
-                    assistant_litellm_messages = (
-                        self._convert_content_to_litellm_message(assistant_content)
+                        f"Calling function: {function_call.name}({function_call.args})"
                     )
 
-                    self._litellm_messages.extend(assistant_litellm_messages)
-                    if response_model:
-                        parsed_data = json.loads(response_text)
-                        response_object = ExctractedWrapper(**parsed_data)
-                    else:
-                        response_object = None
-
-                    return GenerateContentResponse(
-                        text=response_text,
-                        function_calls=[],
-                        usage_metadata=usage_metadata,
-                        response_object=(response_object),
+                function_call_parts.append(
+                    Part.from_function_call(
+                        name=function_call.name, args=function_call.args or {}
                     )
+                )
 
-                function_calls = []
-                function_call_parts = []
-                self._last_tool_call_ids = []
+            assistant_parts = []
+            if response_text:
+                assistant_parts.append(Part(text=response_text))
+            assistant_parts.extend(function_call_parts)
 
-                for i, tool_call in enumerate(tool_calls):
-                    func_obj = getattr(tool_call, "function", None)
-                    if not func_obj:
-                        continue
+            assistant_content = Content(role="assistant", parts=assistant_parts)
+            working_messages.append(assistant_content)
 
-                    func_name = getattr(func_obj, "name", "") or ""
-                    func_args = getattr(func_obj, "arguments", "{}") or "{}"
-                    tool_call_id = getattr(tool_call, "id", f"call_{i}")
+            self.conversation.append(
+                {
+                    "role": "assistant",
+                    "content": response_text or None,
+                    "tool_calls": litellm_tool_calls,
+                }
+            )
+            return function_calls
 
-                    self._last_tool_call_ids.append(tool_call_id)
+    def _record_function_results(
+        self,
+        function_calls: List[FunctionCall],
+        function_results: List[Content],
+        working_messages: List[Content],
+        is_verbose: bool,
+    ):
+        """Record the results of a turn's function calls in the history"""
+        function_response_parts = []
+        for function_call, function_res in zip(function_calls, function_results):
+            if (
+                function_res.parts is None
+                or not function_res.parts
+                or function_res.parts[0].function_response is None
+            ):
+                raise Exception(f"Function {function_call.name} returned no response")
 
-                    function_call = FunctionCall(
-                        name=func_name,
-                        arguments=json.loads(func_args) if func_args else {},
-                    )
-                    function_calls.append(function_call)
+            if (
+                is_verbose
+                and function_res.parts[0].function_response
+                and function_res.parts[0].function_response.response
+            ):
+                print(f"-> {function_res.parts[0].function_response.response}")
+            function_response_parts.extend(function_res.parts)
 
+        tool_content = Content(role="tool", parts=function_response_parts)
+        working_messages.append(tool_content)
+
+        with self.instrumentation.span(
+            "messages.convert", messages=len(function_response_parts)
+        ):
+            tool_litellm_messages = self._convert_content_to_litellm_message(
+                tool_content
+            )
+            self.conversation.extend(tool_litellm_messages)
+
+    def generate_content(
+        self,
+        prompt: str | None = None,
+        messages: List[Content] | None = None,
+        response_model: type[T] | None = None,
+        verbose: bool = False,
+    ) -> GenerateContentResponse[T]:
+        with self.instrumentation.span(
+            "agent.generate_content", **{"llm.model": self.settings.model}
+        ):
+            working_messages = self._start_turn(prompt, messages)
+            iterations = 0
+            is_verbose = verbose or self.settings.verbose
+
+            while iterations < self.settings.max_iterations:
+                try:
+                    start_time = time.time()
+                    completion_kwargs = self._prepare_completion(
+                        response_model, is_verbose
+                    )
+                    with self._completion_span() as span:
+                        key, response = self._cached_completion(completion_kwargs, span)
+                        if response is None:
+                            response = self.scheduler.call(
+                                completion,
+                                completion_kwargs,
+                                self._request_tokens(),
+                                self.settings.priority,
+                            )
+                            self._record_usage(getattr(response, "usage", None), span)
+                            self._cache_completion(key, response)
+                    end_time = time.time()
                     if is_verbose:
                         print(
-                            f"Calling function: {function_call.name}({function_call.args})"
+                            f"LiteLLM completion took {end_time - start_time:.2f} seconds"
                         )
-
-                    function_call_parts.append(
-                        Part.from_function_call(
-                            name=function_call.name, args=function_call.args or {}
+                    message = self._response_message(response)
+
+                    response_text = getattr(message, "content", "")
+                    # Check for tool calls
+                    tool_calls = getattr(message, "tool_calls", None)
+                    if not tool_calls:
+                        return self._final_response(
+                            getattr(response, "usage", None),
+                            response_text,
+                            response_model,
                         )
+
+                    function_calls = self._record_tool_calls(
+                        tool_calls, response_text, working_messages, is_verbose
+                    )
+                    function_results = self._execute_function_calls(
+                        function_calls, is_verbose
+                    )
+                    self._record_function_results(
+                        function_calls, function_results, working_messages, is_verbose
                     )
 
-                assistant_parts = []
-                if response_text:
-                    assistant_parts.append(Part(text=response_text))
-                assistant_parts.extend(function_call_parts)
+                    iterations += 1
 
-                assistant_content = Content(role="assistant", parts=assistant_parts)
-                working_messages.append(assistant_content)
+                except Exception as e:
+                    raise Exception(f"Error in LiteLLM completion: {str(e)}")
 
-                assistant_litellm_messages = self._convert_content_to_litellm_message(
-                    assistant_content
-                )
-                self._litellm_messages.extend(assistant_litellm_messages)
-
-                function_response_parts = []
-                for function_call in function_calls:
-                    function_res = self.call_function(function_call, is_verbose)
-
-                    if (
-                        function_res.parts is None
-                        or not function_res.parts
-                        or function_res.parts[0].function_response is None
-                    ):
-                        raise Exception(
-                            f"Function {function_call.name} returned no response"
-                        )
+            raise Exception(
+                f"Maximum function call iterations ({self.settings.max_iterations}) exceeded"
+            )
 
-                    if (
-                        is_verbose
-                        and function_res.parts[0].function_response
-                        and function_res.parts[0].function_response.response
-                    ):
-                        print(f"-> {function_res.parts[0].function_response.response}")
-                    function_response_parts.extend(function_res.parts)
+    def _stream_worker_count(self) -> int:
+        if self.settings.parallel_tool_calls:
+            return max(1, self.settings.max_parallel_tool_calls)
+        return 1
 
-                tool_content = Content(role="tool", parts=function_response_parts)
-                working_messages.append(tool_content)
+    def _can_start_early(self, name: str, started_all_so_far: bool) -> bool:
+        """Whether a streamed call may run before the whole response has arrived
 
-                tool_litellm_messages = self._convert_content_to_litellm_message(
-                    tool_content
-                )
-                self._litellm_messages.extend(tool_litellm_messages)
+        Permission-gated calls always wait for the end of the stream. Without
+        ``parallel_tool_calls`` the calls must keep their order, so nothing after
+        a permission-gated call starts early either.
+        """
+        if name in self.settings.permission_required:
+            return False
+        return self.settings.parallel_tool_calls or started_all_so_far
+
+    def stream_content(
+        self,
+        prompt: str | None = None,
+        messages: List[Content] | None = None,
+        response_model: type[T] | None = None,
+        verbose: bool = False,
+    ) -> Iterator[StreamEvent]:
+        """Streaming version of generate_content.
+
+        Yields text deltas as they arrive, each tool call and its result, and
+        finally a ``"done"`` event carrying the GenerateContentResponse. Tool
+        calls start running as soon as their arguments have fully streamed in.
+        """
+        working_messages = self._start_turn(prompt, messages)
+        iterations = 0
+        is_verbose = verbose or self.settings.verbose
 
+        while iterations < self.settings.max_iterations:
+            try:
+                completion_kwargs = self._prepare_completion(response_model, is_verbose)
+                estimated_tokens = self._request_tokens()
+                with self._completion_span():
+                    stream = self.scheduler.call(
+                        completion,
+                        {
+                            **completion_kwargs,
+                            "stream": True,
+                            "stream_options": {"include_usage": True},
+                        },
+                        estimated_tokens,
+                        self.settings.priority,
+                    )
+                assembler = ToolCallAssembler()
+                text_parts = []
+                usage = None
+                early: dict[int, Future] = {}
+                blocked = False
+
+                with ThreadPoolExecutor(
+                    max_workers=self._stream_worker_count()
+                ) as executor:
+
+                    def start_completed(indexes: List[int]):
+                        nonlocal blocked
+                        for index in indexes:
+                            name, args = assembler.function_call_args(index)
+                            if self._can_start_early(name, not blocked):
+                                early[index] = executor.submit(
+                                    self.instrumentation.bind(self.call_function),
+                                    FunctionCall(name=name, arguments=args),
+                                    is_verbose,
+                                )
+                            else:
+                                blocked = True
+
+                    for chunk in stream:
+                        usage = getattr(chunk, "usage", None) or usage
+                        choices = getattr(chunk, "choices", None)
+                        if not choices:
+                            continue
+                        delta = getattr(choices[0], "delta", None)
+                        if delta is None:
+                            continue
+                        text = getattr(delta, "content", None)
+                        if text:
+                            text_parts.append(text)
+                            yield StreamEvent(type="text", text=text)
+                        start_completed(
+                            assembler.add(getattr(delta, "tool_calls", None))
+                        )
+                    start_completed(assembler.finish())
+                    self._record_usage(usage)
+                    self._settle_stream_usage(estimated_tokens, usage)
+
+                    response_text = "".join(text_parts)
+                    if not assembler.indexes:
+                        yield StreamEvent(
+                            type="done",
+                            text=response_text,
+                            response=self._final_response(
+                                usage, response_text, response_model
+                            ),
+                        )
+                        return
+
+                    function_calls = self._record_tool_calls(
+                        assembler.tool_calls,
+                        response_text,
+                        working_messages,
+                        is_verbose,
+                    )
+                    function_results = []
+                    for index, function_call in zip(assembler.indexes, function_calls):
+                        yield StreamEvent(type="tool_call", function_call=function_call)
+                        if index in early:
+                            function_res = early[index].result()
+                        else:
+                            function_res = self.call_function(function_call, is_verbose)
+                        function_results.append(function_res)
+                        yield StreamEvent(
+                            type="tool_result",
+                            function_response=function_res.parts[0].function_response
+                            if function_res.parts
+                            else None,
+                        )
+
+                self._record_function_results(
+                    function_calls, function_results, working_messages, is_verbose
+                )
                 iterations += 1
 
             except Exception as e:
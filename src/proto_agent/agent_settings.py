@@ -3,6 +3,11 @@ from pathlib import Path
 from typing import Callable
 
 from proto_agent.Config import SYSTEM_PROMPT
+from .compaction import HistoryCompactor
+from .completion_cache import CompletionCache
+from .instrumentation import InstrumentationHook
+from .scheduler import RequestScheduler
+from .tool_router import ToolRouter
 from .types_llm import Tool
 
 
@@ -19,6 +24,15 @@ class AgentConfig:
         permission_callback: Callable[[str, dict], bool] | None = None,
         permission_required: set = set(),
         system_prompt: str = SYSTEM_PROMPT,
+        parallel_tool_calls: bool = False,
+        max_parallel_tool_calls: int = 4,
+        compactor: HistoryCompactor | None = None,
+        hooks: list[InstrumentationHook] | None = None,
+        scheduler: RequestScheduler | None = None,
+        priority: int = 0,
+        prompt_caching: bool | None = None,
+        completion_cache: CompletionCache | None = None,
+        tool_router: ToolRouter | None = None,
     ):
         self.system_prompt = system_prompt
         self.api_key = api_key
@@ -29,6 +43,15 @@ class AgentConfig:
         self.verbose = verbose
         self.permission_callback = permission_callback
         self.permission_required = permission_required
+        self.parallel_tool_calls = parallel_tool_calls
+        self.max_parallel_tool_calls = max_parallel_tool_calls
+        self.compactor = compactor
+        self.hooks = hooks or []
+        self.scheduler = scheduler
+        self.priority = priority
+        self.prompt_caching = prompt_caching
+        self.completion_cache = completion_cache
+        self.tool_router = tool_router
         if not isinstance(self.working_directory, Path):
             self.working_directory = Path(self.working_directory)
         self.working_directory = self.working_directory.resolve()
@@ -0,0 +1,303 @@
+import asyncio
+import functools
+import inspect
+import time
+from typing import AsyncIterator, List
+
+from .agent import Agent, T, _create_error_response, _create_function_response
+from .agent_settings import AgentConfig
+from .conversation import ConversationStore
+from .streaming import ToolCallAssembler
+from .types_llm import Content, FunctionCall, GenerateContentResponse, StreamEvent
+
+
+async def acompletion(**kwargs):
+    """``litellm.acompletion``, imported on the first call like ``agent.completion``"""
+    from litellm import acompletion
+
+    return await acompletion(**kwargs)
+
+
+class AsyncAgent(Agent):
+    """
+    asyncio counterpart of Agent.
+    Uses the same message history and tool-call semantics, but completions go
+    through ``litellm.acompletion`` so one event loop can drive many agents.
+    Async tool functions are awaited directly, sync ones run in the loop's
+    default executor.
+    """
+
+    def __init__(
+        self, settings: AgentConfig, conversation: ConversationStore | None = None
+    ):
+        super().__init__(settings, conversation)
+        self._permission_lock: asyncio.Lock | None = None
+
+    async def _run_sync(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(function, *args, **kwargs)
+        )
+
+    async def _ask_permission(self, function_call_part: FunctionCall) -> bool:
+        """Ask the permission callback, one prompt at a time"""
+        if self._permission_lock is None:
+            self._permission_lock = asyncio.Lock()
+        callback = self.settings.permission_callback
+        args = function_call_part.args or {}
+        async with self._permission_lock:
+            with self._permission_span(function_call_part) as span:
+                if inspect.iscoroutinefunction(callback):
+                    granted = await callback(function_call_part.name, args)
+                else:
+                    granted = await self._run_sync(
+                        callback, function_call_part.name, args
+                    )
+                span.set_attribute("permission.granted", bool(granted))
+                return granted
+
+    async def acall_function(self, function_call_part: FunctionCall, verbose=False):
+        with self._tool_span(function_call_part) as span:
+            function_to_run, error = self._resolve_function(function_call_part)
+            if error is not None:
+                return error
+            if self._needs_permission(function_call_part):
+                if not await self._ask_permission(function_call_part):
+                    return _create_error_response(
+                        function_call_part.name, "User Refused to run function"
+                    )
+            args_dict = (function_call_part.args) if function_call_part.args else {}
+            if inspect.iscoroutinefunction(function_to_run):
+                res = await self.registry.adispatch(
+                    function_call_part.name,
+                    self.settings.working_directory,
+                    args_dict,
+                )
+            else:
+                res = await self._run_sync(
+                    self.registry.dispatch,
+                    function_call_part.name,
+                    self.settings.working_directory,
+                    args_dict,
+                )
+            self._record_tool_result(span, function_call_part, res)
+            return _create_function_response(function_call_part.name, res)
+
+    async def _aexecute_function_calls(
+        self, function_calls: List[FunctionCall], verbose=False
+    ) -> List[Content]:
+        """Async version of Agent._execute_function_calls"""
+        if not self.settings.parallel_tool_calls or len(function_calls) < 2:
+            return [await self.acall_function(call, verbose) for call in function_calls]
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.max_parallel_tool_calls))
+
+        async def bounded_call(call: FunctionCall) -> Content:
+            async with semaphore:
+                return await self.acall_function(call, verbose)
+
+        async def serialized_calls() -> dict[int, Content]:
+            return {
+                i: await self.acall_function(call, verbose)
+                for i, call in enumerate(function_calls)
+                if call.name in self.settings.permission_required
+            }
+
+        independent = [
+            i
+            for i, call in enumerate(function_calls)
+            if call.name not in self.settings.permission_required
+        ]
+        independent_results, serialized_results = await asyncio.gather(
+            asyncio.gather(*(bounded_call(function_calls[i]) for i in independent)),
+            serialized_calls(),
+        )
+        results = dict(zip(independent, independent_results))
+        results.update(serialized_results)
+        return [results[i] for i in range(len(function_calls))]
+
+    async def agenerate_content(
+        self,
+        prompt: str | None = None,
+        messages: List[Content] | None = None,
+        response_model: type[T] | None = None,
+        verbose: bool = False,
+    ) -> GenerateContentResponse[T]:
+        with self.instrumentation.span(
+            "agent.generate_content", **{"llm.model": self.settings.model}
+        ):
+            working_messages = self._start_turn(prompt, messages)
+            iterations = 0
+            is_verbose = verbose or self.settings.verbose
+
+            while iterations < self.settings.max_iterations:
+                try:
+                    start_time = time.time()
+                    completion_kwargs = self._prepare_completion(
+                        response_model, is_verbose
+                    )
+                    with self._completion_span() as span:
+                        key, response = None, None
+                        if self.settings.completion_cache is not None:
+                            # SQLite and zlib work, kept off the event loop
+                            key, response = await self._run_sync(
+                                self._cached_completion, completion_kwargs, span
+                            )
+                        if response is None:
+                            response = await self.scheduler.acall(
+                                acompletion,
+                                completion_kwargs,
+                                self._request_tokens(),
+                                self.settings.priority,
+                            )
+                            self._record_usage(getattr(response, "usage", None), span)
+                            if key is not None:
+                                await self._run_sync(
+                                    self._cache_completion, key, response
+                                )
+                    end_time = time.time()
+                    if is_verbose:
+                        print(
+                            f"LiteLLM completion took {end_time - start_time:.2f} seconds"
+                        )
+                    message = self._response_message(response)
+
+                    response_text = getattr(message, "content", "")
+                    tool_calls = getattr(message, "tool_calls", None)
+                    if not tool_calls:
+                        return self._final_response(
+                            getattr(response, "usage", None),
+                            response_text,
+                            response_model,
+                        )
+
+                    function_calls = self._record_tool_calls(
+                        tool_calls, response_text, working_messages, is_verbose
+                    )
+                    function_results = await self._aexecute_function_calls(
+                        function_calls, is_verbose
+                    )
+                    self._record_function_results(
+                        function_calls, function_results, working_messages, is_verbose
+                    )
+
+                    iterations += 1
+
+                except Exception as e:
+                    raise Exception(f"Error in LiteLLM completion: {str(e)}")
+
+            raise Exception(
+                f"Maximum function call iterations ({self.settings.max_iterations}) exceeded"
+            )
+
+    async def astream_content(
+        self,
+        prompt: str | None = None,
+        messages: List[Content] | None = None,
+        response_model: type[T] | None = None,
+        verbose: bool = False,
+    ) -> AsyncIterator[StreamEvent]:
+        """Async version of Agent.stream_content"""
+        working_messages = self._start_turn(prompt, messages)
+        iterations = 0
+        is_verbose = verbose or self.settings.verbose
+
+        while iterations < self.settings.max_iterations:
+            early: dict[int, asyncio.Task] = {}
+            try:
+                completion_kwargs = self._prepare_completion(response_model, is_verbose)
+                estimated_tokens = self._request_tokens()
+                with self._completion_span():
+                    stream = await self.scheduler.acall(
+                        acompletion,
+                        {
+                            **completion_kwargs,
+                            "stream": True,
+                            "stream_options": {"include_usage": True},
+                        },
+                        estimated_tokens,
+                        self.settings.priority,
+                    )
+                assembler = ToolCallAssembler()
+                text_parts = []
+                usage = None
+                blocked = False
+                semaphore = asyncio.Semaphore(self._stream_worker_count())
+
+                async def bounded_call(call: FunctionCall) -> Content:
+                    async with semaphore:
+                        return await self.acall_function(call, is_verbose)
+
+                def start_completed(indexes: List[int]):
+                    nonlocal blocked
+                    for index in indexes:
+                        name, args = assembler.function_call_args(index)
+                        if self._can_start_early(name, not blocked):
+                            early[index] = asyncio.create_task(
+                                bounded_call(FunctionCall(name=name, arguments=args))
+                            )
+                        else:
+                            blocked = True
+
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    choices = getattr(chunk, "choices", None)
+                    if not choices:
+                        continue
+                    delta = getattr(choices[0], "delta", None)
+                    if delta is None:
+                        continue
+                    text = getattr(delta, "content", None)
+                    if text:
+                        text_parts.append(text)
+                        yield StreamEvent(type="text", text=text)
+                    start_completed(assembler.add(getattr(delta, "tool_calls", None)))
+                start_completed(assembler.finish())
+                self._record_usage(usage)
+                self._settle_stream_usage(estimated_tokens, usage)
+
+                response_text = "".join(text_parts)
+                if not assembler.indexes:
+                    yield StreamEvent(
+                        type="done",
+                        text=response_text,
+                        response=self._final_response(
+                            usage, response_text, response_model
+                        ),
+                    )
+                    return
+
+                function_calls = self._record_tool_calls(
+                    assembler.tool_calls, response_text, working_messages, is_verbose
+                )
+                function_results = []
+                for index, function_call in zip(assembler.indexes, function_calls):
+                    yield StreamEvent(type="tool_call", function_call=function_call)
+                    if index in early:
+                        function_res = await early.pop(index)
+                    else:
+                        function_res = await self.acall_function(
+                            function_call, is_verbose
+                        )
+                    function_results.append(function_res)
+                    yield StreamEvent(
+                        type="tool_result",
+                        function_response=function_res.parts[0].function_response
+                        if function_res.parts
+                        else None,
+                    )
+
+                self._record_function_results(
+                    function_calls, function_results, working_messages, is_verbose
+                )
+                iterations += 1
+
+            except Exception as e:
+                raise Exception(f"Error in LiteLLM completion: {str(e)}")
+            finally:
+                for task in early.values():
+                    task.cancel()
+
+        raise Exception(
+            f"Maximum function call iterations ({self.settings.max_iterations}) exceeded"
+        )
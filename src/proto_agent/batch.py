@@ -0,0 +1,208 @@
+"""
+Batch runs.
+``proto-agent batch MANIFEST OUTPUT`` runs every job of a JSONL manifest on a
+pool of worker threads, one fresh agent per job. A manifest line looks like::
+
+    {"id": "repo-a", "prompt": "Summarize the README", "working_directory": "/src/repo-a", "read_only": true}
+
+``id`` defaults to the line number and the toolkit flags (``read_only``,
+``no_system``, ``enable_git``, ``git_read_only``) to false. One result line
+is appended to OUTPUT as each job finishes; running the same command again
+skips the jobs OUTPUT already holds a result for, so a crashed or
+interrupted batch resumes where it stopped.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from .agent import Agent
+from .daemon import ConfigFactory, default_config_factory
+from .instrumentation import InstrumentationHook
+
+OPTION_FLAGS = ("read_only", "no_system", "enable_git", "git_read_only")
+
+
+@dataclass
+class BatchJob:
+    """One prompt to run in one working directory"""
+
+    id: str
+    prompt: str
+    working_directory: str
+    options: Dict[str, bool] = field(default_factory=dict)
+
+
+@dataclass
+class BatchSummary:
+    """Totals over the jobs run by one ``run_batch`` call"""
+
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def jobs_per_minute(self) -> float:
+        finished = self.succeeded + self.failed
+        return finished * 60 / self.seconds if self.seconds else 0.0
+
+
+def load_manifest(path: Path) -> List[BatchJob]:
+    """Parse a JSONL manifest, raising ValueError on the first invalid line"""
+    jobs = []
+    seen: Set[str] = set()
+    with Path(path).open() as manifest:
+        for number, line in enumerate(manifest, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e})")
+            if not isinstance(entry, dict):
+                raise ValueError(f"Line {number}: expected a JSON object")
+            for key in ("prompt", "working_directory"):
+                if not isinstance(entry.get(key), str):
+                    raise ValueError(f"Line {number}: '{key}' must be a string")
+            unknown = set(entry) - {"id", "prompt", "working_directory", *OPTION_FLAGS}
+            if unknown:
+                raise ValueError(
+                    f"Line {number}: unknown keys {', '.join(sorted(unknown))}"
+                )
+            job_id = str(entry.get("id", number))
+            if job_id in seen:
+                raise ValueError(f"Line {number}: duplicate id '{job_id}'")
+            seen.add(job_id)
+            jobs.append(
+                BatchJob(
+                    id=job_id,
+                    prompt=entry["prompt"],
+                    working_directory=entry["working_directory"],
+                    options={
+                        flag: bool(entry.get(flag, False)) for flag in OPTION_FLAGS
+                    },
+                )
+            )
+    return jobs
+
+
+def finished_jobs(output: Path, include_errors: bool = True) -> Set[str]:
+    """Ids of the jobs that already have a result in ``output``
+
+    A line cut short by a crash is ignored, its job runs again.
+    """
+    finished: Set[str] = set()
+    if not output.exists():
+        return finished
+    with output.open() as results:
+        for line in results:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if include_errors or result.get("status") == "ok":
+                finished.add(result["id"])
+    return finished
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as file:
+        file.seek(-1, 2)
+        return file.read(1) == b"\n"
+
+
+class _TokenCounter(InstrumentationHook):
+    """Adds up the tokens of every completion an agent makes"""
+
+    def __init__(self):
+        self.tokens = {"prompt": 0, "completion": 0, "cached": 0}
+
+    def on_counter(self, name, value, attributes):
+        if name == "llm.tokens":
+            self.tokens[attributes["type"]] = self.tokens.get(
+                attributes["type"], 0
+            ) + int(value)
+
+
+def _refuse_permission(function_name: str, args: dict) -> bool:
+    # Nobody is there to answer, functions that need permission never run
+    return False
+
+
+def run_job(job: BatchJob, config_factory: ConfigFactory = default_config_factory):
+    """Run one job on a fresh agent and return its result record"""
+    counter = _TokenCounter()
+    start = time.monotonic()
+    result = {"id": job.id, "working_directory": job.working_directory}
+    try:
+        config = config_factory(job.working_directory, job.options)
+        config.hooks = [*config.hooks, counter]
+        config.permission_callback = _refuse_permission
+        response = Agent(config).generate_content(prompt=job.prompt)
+        result.update(status="ok", text=response.text)
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    result.update(
+        prompt_tokens=counter.tokens["prompt"],
+        completion_tokens=counter.tokens["completion"],
+        cached_tokens=counter.tokens["cached"],
+        seconds=round(time.monotonic() - start, 3),
+    )
+    return result
+
+
+def run_batch(
+    jobs: List[BatchJob],
+    output: Path,
+    workers: int = 4,
+    retry_errors: bool = False,
+    config_factory: ConfigFactory = default_config_factory,
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> BatchSummary:
+    """Run the jobs without a result in ``output`` yet, appending results as they finish
+
+    With ``retry_errors`` jobs whose earlier run failed are run again; their
+    new result is appended, so the last line for an id is the one that counts.
+    """
+    output = Path(output)
+    done = finished_jobs(output, include_errors=not retry_errors)
+    pending = [job for job in jobs if job.id not in done]
+    summary = BatchSummary(total=len(jobs), skipped=len(jobs) - len(pending))
+    start = time.monotonic()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # Results are written from this thread only, as their futures complete
+    with output.open("a") as results:
+        if results.tell() and not _ends_with_newline(output):
+            results.write("\n")  # The previous run died halfway through a line
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="proto-agent-batch"
+        )
+        try:
+            futures = [executor.submit(run_job, job, config_factory) for job in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                results.write(json.dumps(result) + "\n")
+                results.flush()
+                if result["status"] == "ok":
+                    summary.succeeded += 1
+                else:
+                    summary.failed += 1
+                summary.prompt_tokens += result["prompt_tokens"]
+                summary.completion_tokens += result["completion_tokens"]
+                summary.cached_tokens += result["cached_tokens"]
+                if on_result is not None:
+                    on_result(result)
+        finally:
+            # On Ctrl-C the queued jobs are dropped, the running ones have no
+            # result written and run again on resume
+            executor.shutdown(wait=True, cancel_futures=True)
+            summary.seconds = time.monotonic() - start
+    return summary
@@ -0,0 +1,146 @@
+"""
+History compaction run before each completion call.
+Compactors shrink old tool results so a long session stays within the
+model's context window, while the system prompt and recent turns are left
+untouched. Messages are only ever rewritten, never dropped, so every tool
+call keeps its matching tool result.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable
+
+from .conversation import ConversationStore
+
+DEFAULT_CONTEXT_WINDOW = 32_000  # Used when the model's window is unknown
+_TRUNCATED_MARKER = "characters truncated ...]"
+_ELIDED_MARKER = "[Earlier tool result elided"
+_SUMMARY_MARKER = "[Summary of earlier tool result]"
+
+
+@dataclass
+class CompactionResult:
+    """What a compaction pass did to the history"""
+
+    tokens_before: int
+    tokens_after: int
+    messages_compacted: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class HistoryCompactor(ABC):
+    """Abstract base class for history compaction strategies"""
+
+    @abstractmethod
+    def compact(self, conversation: ConversationStore, model: str) -> CompactionResult:
+        """Shrink the conversation in place. Must be implemented by subclasses."""
+        pass
+
+
+def _context_window(model: str) -> int:
+    try:
+        from litellm import get_model_info
+
+        info = get_model_info(model)
+        return info.get("max_input_tokens") or info.get("max_tokens") or 0
+    except Exception:
+        return 0
+
+
+class TokenBudgetCompactor(HistoryCompactor):
+    """
+    Keeps the history under a token budget by shortening old tool results.
+    Old results are first truncated to their head and tail, and if the history
+    is still over budget they are elided entirely, or summarized when a
+    summarizer is given.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int | None = None,
+        budget_ratio: float = 0.75,
+        keep_recent_messages: int = 6,
+        truncate_chars: int = 2_000,
+        summarizer: Callable[[str], str] | None = None,
+    ):
+        """
+        Args:
+            max_tokens: Token budget for the history, derived from the model's
+                context window times ``budget_ratio`` when not given
+            budget_ratio: Share of the context window the history may use
+            keep_recent_messages: Number of trailing messages never compacted
+            truncate_chars: Size old tool results are truncated down to
+            summarizer: Optional callable turning a tool result into a summary
+        """
+        self.max_tokens = max_tokens
+        self.budget_ratio = budget_ratio
+        self.keep_recent_messages = keep_recent_messages
+        self.truncate_chars = truncate_chars
+        self.summarizer = summarizer
+        self._budgets: dict[str, int] = {}
+
+    def budget_for(self, model: str) -> int:
+        if self.max_tokens is not None:
+            return self.max_tokens
+        if model not in self._budgets:
+            window = _context_window(model) or DEFAULT_CONTEXT_WINDOW
+            self._budgets[model] = int(window * self.budget_ratio)
+        return self._budgets[model]
+
+    def _candidates(self, conversation: ConversationStore) -> list[int]:
+        """Indexes of old tool results, oldest first"""
+        end = max(0, len(conversation) - self.keep_recent_messages)
+        return [
+            i
+            for i in range(end)
+            if conversation[i].role == "tool"
+            and isinstance(conversation[i].message.get("content"), str)
+        ]
+
+    def _truncate(self, content: str) -> str:
+        half = self.truncate_chars // 2
+        elided = len(content) - 2 * half
+        return f"{content[:half]}\n[... {elided} {_TRUNCATED_MARKER}\n{content[-half:]}"
+
+    def _shrink(self, content: str) -> str:
+        if self.summarizer is not None:
+            return f"{_SUMMARY_MARKER} {self.summarizer(content)}"
+        return f"{_ELIDED_MARKER}: {len(content)} characters]"
+
+    def compact(self, conversation: ConversationStore, model: str) -> CompactionResult:
+        budget = self.budget_for(model)
+        result = CompactionResult(
+            tokens_before=conversation.total_tokens,
+            tokens_after=conversation.total_tokens,
+        )
+        if conversation.total_tokens <= budget:
+            return result
+
+        compacted = set()
+        stages = (
+            (
+                lambda c: len(c) > self.truncate_chars and _TRUNCATED_MARKER not in c,
+                self._truncate,
+            ),
+            (
+                lambda c: not c.startswith((_ELIDED_MARKER, _SUMMARY_MARKER)),
+                self._shrink,
+            ),
+        )
+        for should_shrink, shrink in stages:
+            for index in self._candidates(conversation):
+                if conversation.total_tokens <= budget:
+                    break
+                message = conversation[index].message
+                content = message["content"]
+                if not should_shrink(content):
+                    continue
+                conversation.replace(index, {**message, "content": shrink(content)})
+                compacted.add(index)
+
+        result.tokens_after = conversation.total_tokens
+        result.messages_compacted = len(compacted)
+        return result
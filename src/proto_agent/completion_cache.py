@@ -0,0 +1,267 @@
+"""
+On-disk completion cache.
+Completions are stored in a SQLite file keyed on a hash of everything that
+decides the answer: the model, the canonical message list, the tool schemas,
+the response format and the temperature. Repeated prompts against unchanged
+inputs are then answered from disk without calling the provider, and a
+recorded cache doubles as an offline fixture for tests. Streamed completions
+are not cached.
+
+Modes:
+    ``record``       serve hits, call the provider on a miss and store the answer
+    ``replay``       serve hits, raise ``CompletionCacheMiss`` on a miss
+    ``passthrough``  always call the provider, the cache is neither read nor written
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional, Tuple
+
+from platformdirs import user_cache_dir
+
+SCHEMA_VERSION = 1
+MODES = ("record", "replay", "passthrough")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENVIRONMENT_VARIABLE = "PROTO_AGENT_COMPLETION_CACHE"
+# Arguments of the completion call that the answer depends on
+KEYED_ARGUMENTS = ("model", "messages", "tools", "response_format", "temperature")
+
+
+class CompletionCacheMiss(LookupError):
+    """A completion missing from a cache in replay mode"""
+
+
+def _json_default(value: Any):
+    # response_format is a pydantic model class, its schema is what is sent
+    schema = getattr(value, "model_json_schema", None)
+    if schema is not None:
+        return schema()
+    return str(value)
+
+
+def cache_key(completion_kwargs: dict) -> str:
+    """Content address of a completion request"""
+    keyed = {name: completion_kwargs.get(name) for name in KEYED_ARGUMENTS}
+    payload = json.dumps(
+        keyed,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=_json_default,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _to_data(value: Any) -> Any:
+    """Plain JSON data of a response object (litellm ModelResponse or a stand-in)"""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _to_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_data(item) for item in value]
+    model_dump = getattr(value, "model_dump", None)
+    if model_dump is not None:
+        return _to_data(model_dump())
+    if hasattr(value, "__dict__"):
+        return {
+            key: _to_data(item)
+            for key, item in vars(value).items()
+            if not key.startswith("_")
+        }
+    return str(value)
+
+
+def _to_namespace(value: Any) -> Any:
+    """Attribute-access view of stored data, read by the agent like a ModelResponse"""
+    if isinstance(value, dict):
+        return SimpleNamespace(
+            **{key: _to_namespace(item) for key, item in value.items()}
+        )
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+class CompletionCache:
+    """Content-addressed store of completion responses with size-based eviction
+
+    When the stored responses outgrow ``max_bytes`` (compressed), the least
+    recently used are deleted until 90% of it is left. Instances are safe to
+    share between agents and threads.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        mode: str = "record",
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown completion cache mode: {mode}")
+        self.path = Path(
+            path or Path(user_cache_dir("proto-agent")) / "completions.sqlite3"
+        )
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> last use, written with the next store instead of on every hit
+        self._touched: dict[str, float] = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = self._open(str(self.path))
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(db_path, check_same_thread=False)
+        if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            db.executescript(
+                """
+                DROP TABLE IF EXISTS completions;
+                CREATE TABLE completions (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    -- zlib-compressed JSON of the response
+                    response BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID;
+                CREATE INDEX completions_last_used ON completions (last_used);
+                """
+            )
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.commit()
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def lookup(self, completion_kwargs: dict) -> Tuple[Optional[str], Any]:
+        """Return the request's key and its cached response, or None for either
+
+        The key is None in passthrough mode, the response None on a miss in
+        record mode. A miss in replay mode raises ``CompletionCacheMiss``.
+        """
+        if self.mode == "passthrough":
+            return None, None
+        key = cache_key(completion_kwargs)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._touched[key] = time.time()
+        if row is not None:
+            return key, _to_namespace(json.loads(zlib.decompress(row[0])))
+        if self.mode == "replay":
+            raise CompletionCacheMiss(
+                f"No recorded completion for {completion_kwargs.get('model')} "
+                f"request {key[:16]}"
+            )
+        return key, None
+
+    def store(self, key: str, model: str, response: Any):
+        """Save the response to a request looked up under ``key``"""
+        blob = zlib.compress(json.dumps(_to_data(response)).encode())
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT size FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now),
+            )
+            self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            self._db.executemany(
+                "UPDATE completions SET last_used = ? WHERE key = ?",
+                [(used, touched) for touched, used in self._touched.items()],
+            )
+            self._touched.clear()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Other processes may have written too, start from the real size
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()[0]
+        target = self.max_bytes * 0.9
+        rows = self._db.execute(
+            "SELECT key, size FROM completions ORDER BY last_used"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM completions WHERE key = ?", evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM completions")
+            self._db.commit()
+            self._touched.clear()
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._touched:
+                self._db.executemany(
+                    "UPDATE completions SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in self._touched.items()],
+                )
+                self._db.commit()
+                self._touched.clear()
+            self._db.close()
+
+
+# Caches opened from the config, shared by the agents of a process
+_configured: dict[tuple, CompletionCache] = {}
+
+
+def configured_cache(config: dict) -> Optional[CompletionCache]:
+    """The cache set up by the config's ``completion_cache`` table, if any
+
+    The table takes ``mode``, ``path`` and ``max_megabytes``. The
+    ``PROTO_AGENT_COMPLETION_CACHE`` environment variable sets the mode, and
+    turns the cache on with the default location when the table is missing.
+    """
+    settings = dict(config.get("completion_cache") or {})
+    mode = os.environ.get(ENVIRONMENT_VARIABLE) or settings.get("mode")
+    if not mode:
+        if not settings:
+            return None
+        mode = "record"
+    path = settings.get("path")
+    max_bytes = int(settings.get("max_megabytes", DEFAULT_MAX_BYTES // 2**20) * 2**20)
+    key = (path, mode, max_bytes)
+    if key not in _configured:
+        _configured[key] = CompletionCache(
+            Path(path).expanduser() if path else None, mode, max_bytes
+        )
+    return _configured[key]
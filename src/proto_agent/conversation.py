@@ -0,0 +1,124 @@
+"""
+Conversation history storage.
+Messages are kept in the LiteLLM wire format alongside their JSON payload,
+which is encoded exactly once when a message is added, so the size of the
+history can be tracked without re-serializing it every turn.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List
+
+BYTES_PER_TOKEN = 4  # Rough average for English text and JSON
+
+
+def estimate_tokens(payload: bytes) -> int:
+    """Cheap token estimate used when no token counter is configured"""
+    return max(1, len(payload) // BYTES_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class StoredMessage:
+    """A message together with its encoded payload and size"""
+
+    message: dict
+    payload: bytes
+    token_count: int
+
+    @property
+    def byte_size(self) -> int:
+        return len(self.payload)
+
+    @property
+    def role(self) -> str:
+        return self.message.get("role", "")
+
+
+class ConversationStore:
+    """
+    Append-only message history shared by an Agent and its callers.
+    ``messages`` is the live list handed to LiteLLM, no copies are made.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str | None = None,
+        token_counter: Callable[[bytes], int] = estimate_tokens,
+    ):
+        self._token_counter = token_counter
+        self._entries: List[StoredMessage] = []
+        self._messages: List[dict] = []
+        self._total_bytes = 0
+        self._total_tokens = 0
+        self._system_prompt = system_prompt
+        if system_prompt:
+            self.append({"role": "system", "content": system_prompt})
+
+    def _encode(self, message: dict) -> StoredMessage:
+        payload = json.dumps(message, ensure_ascii=False).encode()
+        return StoredMessage(
+            message=message, payload=payload, token_count=self._token_counter(payload)
+        )
+
+    def append(self, message: dict) -> StoredMessage:
+        """Encode and append a single message"""
+        entry = self._encode(message)
+        self._entries.append(entry)
+        self._messages.append(message)
+        self._total_bytes += entry.byte_size
+        self._total_tokens += entry.token_count
+        return entry
+
+    def extend(self, messages: Iterable[dict]):
+        for message in messages:
+            self.append(message)
+
+    def replace(self, index: int, message: dict) -> StoredMessage:
+        """Swap the message at ``index`` for a new one, e.g. a shortened tool result"""
+        old = self._entries[index]
+        entry = self._encode(message)
+        self._entries[index] = entry
+        self._messages[index] = message
+        self._total_bytes += entry.byte_size - old.byte_size
+        self._total_tokens += entry.token_count - old.token_count
+        return entry
+
+    def clear(self, keep_system: bool = True):
+        """Drop the history, keeping the system prompt by default"""
+        self._entries.clear()
+        self._messages.clear()
+        self._total_bytes = 0
+        self._total_tokens = 0
+        if keep_system and self._system_prompt:
+            self.append({"role": "system", "content": self._system_prompt})
+
+    @property
+    def messages(self) -> List[dict]:
+        return self._messages
+
+    @property
+    def entries(self) -> List[StoredMessage]:
+        return self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[StoredMessage]:
+        return iter(self._entries)
+
+    def __getitem__(self, index: int) -> StoredMessage:
+        return self._entries[index]
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(messages={len(self)}, "
+            f"bytes={self._total_bytes}, tokens={self._total_tokens})"
+        )
@@ -0,0 +1,329 @@
+"""
+Long-running agent daemon.
+``proto-agent daemon start`` keeps one interpreter alive with litellm
+imported, toolkits built and agents warm, so provider HTTP connections are
+reused too. ``proto-agent`` sends its prompt here through
+``daemon_client.DaemonClient`` when the daemon is running; the protocol is
+described there.
+"""
+
+import json
+import os
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from platformdirs import user_state_dir
+
+from .Config import SYSTEM_PROMPT
+from .agent import Agent
+from .agent_settings import AgentConfig
+from .daemon_client import (
+    SOCKET_ENVIRONMENT_VARIABLE,
+    DaemonClient,
+    DaemonError,
+    encode_message,
+    socket_path,
+)
+
+START_TIMEOUT = 30  # Seconds `daemon start` waits for the socket to accept
+MAX_IDLE_AGENTS = 16
+MAX_IDLE_AGENTS_PER_KEY = 4
+IDLE_AGENT_TTL = 600.0  # Seconds an idle agent is kept for reuse
+
+
+class _Connection(socketserver.StreamRequestHandler):
+    """Serves one client connection"""
+
+    server: "AgentDaemon"
+
+    def setup(self):
+        super().setup()
+        self._write_lock = threading.Lock()
+
+    def send(self, message: dict):
+        # Tool calls may run on worker threads and report concurrently
+        with self._write_lock:
+            self.wfile.write(encode_message(message))
+            self.wfile.flush()
+
+    def receive(self) -> Optional[dict]:
+        line = self.rfile.readline()
+        return json.loads(line) if line else None
+
+    def ask_permission(self, name: str, args: dict) -> bool:
+        self.send({"type": "permission", "name": name, "args": args})
+        reply = self.receive()
+        return bool(reply and reply.get("granted"))
+
+    def handle(self):
+        try:
+            request = self.receive()
+            if request is None:
+                return
+            kind = request.get("type")
+            if kind == "prompt":
+                self.send(self.server.run_prompt(request, self))
+            elif kind == "status":
+                self.send(self.server.status())
+            elif kind == "shutdown":
+                self.send({"type": "ok"})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                self.send({"type": "error", "message": f"Unknown request: {kind}"})
+        except (OSError, ValueError):
+            pass  # The client went away or sent garbage, nothing to answer
+
+
+class RelayAgent(Agent):
+    """Agent that reports its tool calls to the client being served"""
+
+    relay: Optional[Callable[[dict], None]] = None
+
+    def call_function(self, function_call_part, verbose=False):
+        relay = self.relay
+        if relay is not None:
+            relay(
+                {
+                    "type": "tool_call",
+                    "name": function_call_part.name,
+                    "args": function_call_part.args or {},
+                }
+            )
+        result = super().call_function(function_call_part, verbose)
+        if relay is not None and result.parts:
+            function_response = result.parts[0].function_response
+            relay(
+                {
+                    "type": "tool_result",
+                    "name": function_call_part.name,
+                    "result": function_response.response if function_response else None,
+                }
+            )
+        return result
+
+
+ConfigFactory = Callable[[str, dict], AgentConfig]
+
+# Tools built per set of CLI options and shared by the agents using them
+_tool_sets: Dict[tuple, tuple] = {}
+
+
+def default_config_factory(working_directory: str, options: dict):
+    """Build an AgentConfig the way ``proto-agent run`` does, reusing built tools"""
+    from .completion_cache import configured_cache
+    from .main import build_tools, load_settings
+
+    api_key, config = load_settings()
+    key = tuple(sorted(options.items()))
+    if key not in _tool_sets:
+        _tool_sets[key] = build_tools(**options)
+    tools, permission_required = _tool_sets[key]
+    return AgentConfig(
+        api_key=api_key,
+        model=config.get("model", ""),
+        working_directory=working_directory,
+        tools=tools,
+        permission_required=set(permission_required),
+        system_prompt=config.get("system_prompt", SYSTEM_PROMPT),
+        completion_cache=configured_cache(config),
+    )
+
+
+class AgentDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server running prompts on a pool of warm agents
+
+    Idle agents are kept per (model, API key, system prompt, working
+    directory, tools); each prompt takes one and gives it back with its
+    history cleared afterwards, so concurrent clients never share an agent.
+    At most ``MAX_IDLE_AGENTS`` are kept, ``MAX_IDLE_AGENTS_PER_KEY`` per
+    key, each for ``IDLE_AGENT_TTL`` seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        config_factory: ConfigFactory = default_config_factory,
+    ):
+        self.path = Path(path or socket_path())
+        self.config_factory = config_factory
+        self.started = time.time()
+        self.prompts_served = 0
+        # Idle agents per key with the time they were released, oldest first
+        self._idle: Dict[tuple, List[Tuple[float, "RelayAgent"]]] = {}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        running = DaemonClient.connect(self.path)
+        if running is not None:
+            running.close()
+            raise DaemonError(f"A daemon is already listening on {self.path}")
+        self.path.unlink(missing_ok=True)  # Left behind by a daemon that died
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.path), _Connection)
+        finally:
+            os.umask(previous_umask)
+
+    def _acquire(self, working_directory: str, options: dict):
+        config = self.config_factory(working_directory, options)
+        key = (
+            config.model,
+            config.api_key,
+            config.system_prompt,
+            str(config.working_directory),
+            tuple(sorted(options.items())),
+        )
+        with self._lock:
+            idle = self._idle.get(key)
+            agent = idle.pop()[1] if idle else None
+        if agent is None:
+            agent = RelayAgent(config)
+        return key, agent
+
+    def _release(self, key: tuple, agent: "RelayAgent"):
+        agent.relay = None
+        agent.settings.permission_callback = None
+        # A finished session's history is not kept around while the agent idles
+        agent.clear_messages()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            idle.append((time.monotonic(), agent))
+            del idle[:-MAX_IDLE_AGENTS_PER_KEY]
+        self._expire_idle()
+
+    def _expire_idle(self):
+        """Drop idle agents past their TTL, then the oldest past ``MAX_IDLE_AGENTS``"""
+        expired_before = time.monotonic() - IDLE_AGENT_TTL
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                idle[:] = [entry for entry in idle if entry[0] >= expired_before]
+                if not idle:
+                    del self._idle[key]
+            released = sorted(
+                (entry[0], key) for key, idle in self._idle.items() for entry in idle
+            )
+            for _, key in released[: max(len(released) - MAX_IDLE_AGENTS, 0)]:
+                self._idle[key].pop(0)
+                if not self._idle[key]:
+                    del self._idle[key]
+
+    def service_actions(self):
+        # Called by serve_forever on every poll, so agents expire without traffic
+        self._expire_idle()
+
+    def run_prompt(self, request: dict, connection: _Connection) -> dict:
+        try:
+            key, agent = self._acquire(
+                request["working_directory"], request.get("options") or {}
+            )
+        except Exception as e:
+            return {"type": "error", "message": str(e)}
+        try:
+            agent.settings.permission_callback = connection.ask_permission
+            if request.get("verbose"):
+                agent.relay = connection.send
+            response = agent.generate_content(prompt=request["prompt"])
+        except Exception as e:
+            return {"type": "error", "message": str(e)}
+        finally:
+            self._release(key, agent)
+            with self._lock:
+                self.prompts_served += 1
+        usage = response.usage_metadata
+        return {
+            "type": "response",
+            "text": response.text,
+            "usage": {
+                "prompt_tokens": usage.prompt_token_count,
+                "completion_tokens": usage.candidates_token_count,
+                "total_tokens": usage.total_token_count,
+            }
+            if usage
+            else None,
+        }
+
+    def status(self) -> dict:
+        with self._lock:
+            warm_agents = sum(len(idle) for idle in self._idle.values())
+        return {
+            "type": "status",
+            "pid": os.getpid(),
+            "socket": str(self.path),
+            "uptime_seconds": time.time() - self.started,
+            "prompts_served": self.prompts_served,
+            "warm_agents": warm_agents,
+        }
+
+    def server_close(self):
+        super().server_close()
+        self.path.unlink(missing_ok=True)
+
+
+def _warm_up():
+    """Import litellm ahead of the first prompt"""
+    import litellm  # noqa: F401
+
+
+def serve(path: Optional[Path] = None):
+    """Run the daemon in this process until it is shut down or terminated"""
+    server = AgentDaemon(path)
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+    def terminate(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        server.serve_forever(poll_interval=0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def spawn(path: Optional[Path] = None) -> dict:
+    """Start a detached daemon and wait until it accepts connections"""
+    path = Path(path or socket_path())
+    running = DaemonClient.connect(path)
+    if running is not None:
+        running.close()
+        raise DaemonError(f"A daemon is already listening on {path}")
+    log_directory = Path(user_state_dir("proto-agent"))
+    log_directory.mkdir(parents=True, exist_ok=True)
+    environment = dict(os.environ, **{SOCKET_ENVIRONMENT_VARIABLE: str(path)})
+    with (log_directory / "daemon.log").open("ab") as log:
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "proto_agent.main",
+                "daemon",
+                "start",
+                "--foreground",
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            env=environment,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise DaemonError(
+                f"Daemon exited with code {process.returncode}, "
+                f"see {log_directory / 'daemon.log'}"
+            )
+        client = DaemonClient.connect(path)
+        if client is not None:
+            with client:
+                return client.request({"type": "status"})
+        time.sleep(0.05)
+    raise DaemonError(f"Daemon did not start within {START_TIMEOUT} seconds")
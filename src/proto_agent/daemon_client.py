@@ -0,0 +1,132 @@
+"""
+Client side of the agent daemon, see ``daemon``.
+``proto-agent daemon start`` keeps one interpreter alive with litellm
+imported, toolkits built and agents warm, so provider HTTP connections are
+reused too. ``proto-agent`` sends its prompt to the daemon when one is
+running. Requests go over a Unix socket as JSON lines:
+
+    client -> {"type": "prompt", "prompt": ..., "working_directory": ...,
+               "options": {...}, "verbose": false}
+    daemon -> {"type": "permission", "name": ..., "args": {...}}
+    client -> {"type": "permission", "granted": true}
+    daemon -> {"type": "tool_call", ...} / {"type": "tool_result", ...}  (verbose only)
+    daemon -> {"type": "response", "text": ..., "usage": {...}}
+              or {"type": "error", "message": ...}
+
+``{"type": "status"}`` and ``{"type": "shutdown"}`` are answered with a
+single message.
+"""
+
+import json
+import os
+import socket
+import warnings
+from pathlib import Path
+from typing import Callable, Optional
+
+from platformdirs import user_runtime_dir
+
+SOCKET_ENVIRONMENT_VARIABLE = "PROTO_AGENT_SOCKET"
+
+
+class DaemonError(Exception):
+    """The daemon could not be reached, or answered with an error"""
+
+
+def socket_path() -> Path:
+    """Where the daemon listens, ``$PROTO_AGENT_SOCKET`` or the user runtime directory"""
+    if os.environ.get(SOCKET_ENVIRONMENT_VARIABLE):
+        return Path(os.environ[SOCKET_ENVIRONMENT_VARIABLE])
+    with warnings.catch_warnings():
+        # platformdirs warns when it falls back to /tmp without XDG_RUNTIME_DIR
+        warnings.simplefilter("ignore")
+        return Path(user_runtime_dir("proto-agent")) / "daemon.sock"
+
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message, default=str).encode() + b"\n"
+
+
+class DaemonClient:
+    """One connection to the daemon"""
+
+    def __init__(self, connection: socket.socket):
+        self._socket = connection
+        self._reader = connection.makefile("rb")
+
+    @classmethod
+    def connect(cls, path: Optional[Path] = None) -> Optional["DaemonClient"]:
+        """Connect to the daemon, or return None when it isn't running"""
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(path or socket_path()))
+        except (FileNotFoundError, ConnectionRefusedError):
+            connection.close()
+            return None
+        return cls(connection)
+
+    def send(self, message: dict):
+        self._socket.sendall(encode_message(message))
+
+    def receive(self) -> dict:
+        line = self._reader.readline()
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        return json.loads(line)
+
+    def request(self, message: dict) -> dict:
+        """Send a single-answer request such as ``status``"""
+        self.send(message)
+        reply = self.receive()
+        if reply.get("type") == "error":
+            raise DaemonError(reply["message"])
+        return reply
+
+    def prompt(
+        self,
+        prompt: str,
+        working_directory: str,
+        options: dict,
+        verbose: bool = False,
+        permission_callback: Optional[Callable[[str, dict], bool]] = None,
+        on_event: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """Run a prompt in the daemon, answering its permission prompts locally
+
+        Returns the final ``response`` message. Permission requests are
+        refused when no ``permission_callback`` is given.
+        """
+        self.send(
+            {
+                "type": "prompt",
+                "prompt": prompt,
+                "working_directory": working_directory,
+                "options": options,
+                "verbose": verbose,
+            }
+        )
+        while True:
+            message = self.receive()
+            kind = message.get("type")
+            if kind == "response":
+                return message
+            if kind == "error":
+                raise DaemonError(message["message"])
+            if kind == "permission":
+                granted = bool(
+                    permission_callback
+                    and permission_callback(message["name"], message["args"])
+                )
+                self.send({"type": "permission", "granted": granted})
+            elif on_event is not None:
+                on_event(message)
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
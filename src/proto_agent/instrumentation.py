@@ -0,0 +1,322 @@
+"""
+Tracing and metrics hooks for the agent loop.
+An Agent reports spans (completion calls, tool calls, permission waits,
+message conversion) and counters (tokens, bytes) to the hooks configured in
+``AgentConfig(hooks=...)``. With no hooks, instrumentation costs a
+ContextVar lookup per span. ``OTLPJsonExporter`` writes everything as
+OpenTelemetry (OTLP/JSON) payloads.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+MAX_SPANS = 10_000  # Spans an exporter without a path keeps
+
+STATUS_UNSET = "UNSET"
+STATUS_OK = "OK"
+STATUS_ERROR = "ERROR"
+
+
+@dataclass
+class Span:
+    """A timed operation, nested under the span that was current when it started"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_time_ns: int = 0
+    end_time_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = STATUS_UNSET
+    status_message: str = ""
+
+    # Real spans record attributes, see _NoopSpan
+    recording = True
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_time_ns - self.start_time_ns) / 1e6
+
+
+class _NoopSpan:
+    """Stands in for a span when no hook is listening"""
+
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "proto_agent_current_span", default=None
+)
+
+
+class InstrumentationHook:
+    """Receives spans and counter updates, override the methods you need"""
+
+    def on_span_start(self, span: Span):
+        pass
+
+    def on_span_end(self, span: Span):
+        pass
+
+    def on_counter(self, name: str, value: float, attributes: Dict[str, Any]):
+        pass
+
+
+def args_hash(args: Optional[dict]) -> str:
+    """Short stable hash of tool call arguments, so calls can be correlated without logging them"""
+    canonical = json.dumps(
+        args or {}, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def result_bytes(result: Any) -> int:
+    """Size of a tool result as it will be sent to the model"""
+    if isinstance(result, bytes):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode())
+    return len(json.dumps(result, default=str).encode())
+
+
+class Instrumentation:
+    """Creates spans and counters and forwards them to hooks"""
+
+    def __init__(self, hooks: Optional[List[InstrumentationHook]] = None):
+        self.hooks: List[InstrumentationHook] = list(hooks or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.hooks)
+
+    def add_hook(self, hook: InstrumentationHook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: InstrumentationHook):
+        self.hooks.remove(hook)
+
+    def _notify(self, method: str, *args):
+        for hook in self.hooks:
+            try:
+                getattr(hook, method)(*args)
+            except Exception:
+                # A broken hook must never break the agent
+                pass
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | _NoopSpan]:
+        """Time the enclosed block as a span, marking it as an error if it raises"""
+        if not self.hooks:
+            yield _NOOP_SPAN
+            return
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_time_ns=time.time_ns(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        self._notify("on_span_start", span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = STATUS_ERROR
+            span.status_message = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time_ns = time.time_ns()
+            self._notify("on_span_end", span)
+
+    def count(self, name: str, value: float = 1, **attributes):
+        """Add to a counter"""
+        if self.hooks:
+            self._notify("on_counter", name, value, attributes)
+
+    @staticmethod
+    def bind(function: Callable) -> Callable:
+        """Bind a function to the current span, for running it on another thread
+
+        Bind once per submission, a context can only be entered by one
+        thread at a time.
+        """
+        context = contextvars.copy_context()
+        return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[dict]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+_OTLP_STATUS_CODES = {STATUS_UNSET: 0, STATUS_OK: 1, STATUS_ERROR: 2}
+
+
+class OTLPJsonExporter(InstrumentationHook):
+    """Collects spans and counters and exports them as OTLP/JSON
+
+    When ``path`` is given, a traces payload and a metrics payload are
+    appended to it as JSON lines every time a root span (e.g. one
+    ``generate_content`` call) ends, the format read by the OpenTelemetry
+    Collector's ``otlpjsonfile`` receiver. Otherwise only the latest
+    ``max_spans`` spans are kept, so that a long-running process doesn't
+    collect them forever.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        service_name: str = "proto-agent",
+        max_spans: int = MAX_SPANS,
+    ):
+        self.path = Path(path) if path is not None else None
+        self.service_name = service_name
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.counters: Dict[tuple, float] = {}
+        self._start_time_ns = time.time_ns()
+        self._lock = threading.Lock()
+        # Keeps the lines of concurrent flushes together
+        self._write_lock = threading.Lock()
+
+    def on_span_end(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            if len(self.spans) > self.max_spans:
+                del self.spans[: len(self.spans) - self.max_spans]
+        if span.parent_id is None and self.path is not None:
+            self.flush()
+
+    def on_counter(self, name: str, value: float, attributes: Dict[str, Any]):
+        key = (name, tuple(sorted(attributes.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def _resource(self) -> dict:
+        return {"attributes": _otlp_attributes({"service.name": self.service_name})}
+
+    def traces(self) -> dict:
+        """The collected spans as an OTLP ``ExportTraceServiceRequest``"""
+        with self._lock:
+            spans = list(self.spans)
+        return self._traces(spans)
+
+    def _traces(self, spans: List[Span]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": self._resource(),
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "proto_agent"},
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id or "",
+                                    "name": span.name,
+                                    "kind": 1,  # SPAN_KIND_INTERNAL
+                                    "startTimeUnixNano": str(span.start_time_ns),
+                                    "endTimeUnixNano": str(span.end_time_ns),
+                                    "attributes": _otlp_attributes(span.attributes),
+                                    "status": {
+                                        "code": _OTLP_STATUS_CODES[span.status],
+                                        "message": span.status_message,
+                                    },
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def metrics(self) -> dict:
+        """The counters as an OTLP ``ExportMetricsServiceRequest`` of cumulative sums"""
+        now = str(time.time_ns())
+        by_name: Dict[str, List[dict]] = {}
+        with self._lock:
+            counters = dict(self.counters)
+        for (name, attributes), value in counters.items():
+            point = {
+                "attributes": _otlp_attributes(dict(attributes)),
+                "startTimeUnixNano": str(self._start_time_ns),
+                "timeUnixNano": now,
+            }
+            if float(value).is_integer():
+                point["asInt"] = str(int(value))
+            else:
+                point["asDouble"] = value
+            by_name.setdefault(name, []).append(point)
+        return {
+            "resourceMetrics": [
+                {
+                    "resource": self._resource(),
+                    "scopeMetrics": [
+                        {
+                            "scope": {"name": "proto_agent"},
+                            "metrics": [
+                                {
+                                    "name": name,
+                                    "sum": {
+                                        "dataPoints": points,
+                                        "aggregationTemporality": 2,  # CUMULATIVE
+                                        "isMonotonic": True,
+                                    },
+                                }
+                                for name, points in sorted(by_name.items())
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def flush(self):
+        """Append the spans collected so far and the counters to ``path``"""
+        if self.path is None:
+            return
+        # Spans ending while this runs go to the next flush
+        with self._lock:
+            spans, self.spans = self.spans, []
+        traces = json.dumps(self._traces(spans))
+        metrics = json.dumps(self.metrics())
+        with self._write_lock:
+            with self.path.open("a") as f:
+                f.write(traces + "\n")
+                f.write(metrics + "\n")
@@ -1,12 +1,8 @@
-from dotenv import load_dotenv
 import os
 
 
 from proto_agent.Config import SYSTEM_PROMPT
-from .agent_settings import AgentConfig
-from .agent import Agent
 import click
-from .tool_kits import FileOperationToolkit, SystemInfoToolkit, GitToolkit
 import tomllib
 import tomli_w
 from pathlib import Path
@@ -22,41 +18,15 @@ def _get_user_confirmation(function_name: str, args: dict) -> bool:
     return choice in ("y", "yes")
 
 
-@click.command(
-    help=f"""Main CLI entry point for the Proto Agent 
-    Sets up the agent with specified toolkits and configurations, then processes the user prompt.
-    Configuration and API key are loaded from a user-specific config directory 
-    {str(Path(user_config_dir("proto-agent")))}
+def load_settings() -> tuple[str, dict]:
+    """Create the default config files if needed and return the API key and config
+
+    The config's ``rate_limits`` table (``[rate_limits."<model>"]`` with
+    ``requests_per_minute`` and ``tokens_per_minute``) is applied to the
+    process-wide request scheduler.
     """
-)
-@click.argument(
-    "prompt",
-)
-@click.argument(
-    "working-directory",
-)
-@click.option("-v", "--verbose", is_flag=True, help="Enable detailed logging")
-@click.option(
-    "--read-only", is_flag=True, help="Enable only read operations (no write/execute)"
-)
-@click.option(
-    "--no-system", is_flag=True, help="Disable system monitoring capabilities"
-)
-@click.option("--enable-git", is_flag=True, help="Enable git operations toolkit")
-@click.option(
-    "--git-read-only",
-    is_flag=True,
-    help="Enable only git read operations (status, log, diff, blame)",
-)
-def main_cli(
-    prompt: str,
-    working_directory: str,
-    verbose: bool,
-    read_only: bool,
-    no_system: bool,
-    enable_git: bool,
-    git_read_only: bool,
-):
+    from dotenv import load_dotenv
+
     config_dir = Path(user_config_dir("proto-agent"))
     config_dir.mkdir(parents=True, exist_ok=True)
     config_file = config_dir / "config.toml"
@@ -73,7 +43,28 @@ def main_cli(
     if api_key is None:
         raise Exception("Please provide an api key in your .env API_KEY")
     config = tomllib.loads(config_file.read_text())
+    if config.get("rate_limits"):
+        from .scheduler import default_scheduler
+
+        default_scheduler.configure(config["rate_limits"])
+    return api_key, config
+
+
+def build_tools(
+    read_only: bool = False,
+    no_system: bool = False,
+    enable_git: bool = False,
+    git_read_only: bool = False,
+) -> tuple[list, set]:
+    """Build the tools enabled by the CLI flags and the functions that need permission
+
+    Toolkits are imported here so that each one (and its dependencies) only
+    loads when it is enabled.
+    """
+    from .tool_kits.file_operation_toolkit import FileOperationToolkit
+
     tools = []
+    permission_required = {FileOperationToolkit.RUN_PYTHON_FILE}
     if read_only:
         file_toolkit = FileOperationToolkit(
             enable_read=True, enable_write=False, enable_list=True, enable_execute=False
@@ -86,6 +77,8 @@ def main_cli(
         tools.append(file_toolkit.tool)
 
     if not no_system:
+        from .tool_kits.system_info_toolkit import SystemInfoToolkit
+
         system_toolkit = SystemInfoToolkit(
             enable_basic=True,
             enable_memory=True,
@@ -97,6 +90,8 @@ def main_cli(
         tools.append(system_toolkit.tool)
 
     if enable_git:
+        from .tool_kits.git_toolkit import GitToolkit
+
         if git_read_only:
             git_toolkit = GitToolkit(
                 enable_read=True,
@@ -114,6 +109,159 @@ def main_cli(
                 enable_history=True,
             )
         tools.append(git_toolkit.tool)
+        permission_required |= {
+            GitToolkit.GIT_COMMIT,
+            GitToolkit.GIT_PUSH,
+            GitToolkit.GIT_BRANCH,
+        }
+    return tools, permission_required
+
+
+class DefaultCommandGroup(click.Group):
+    """A group that runs ``default_command`` unless the first argument names a subcommand"""
+
+    def __init__(self, *args, default_command: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        # The group's own options (--help) list the subcommands instead
+        handled_here = args and args[0] in self.get_help_option_names(ctx)
+        if not handled_here and (not args or args[0] not in self.commands):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+    def format_commands(self, ctx, formatter):
+        super().format_commands(ctx, formatter)
+        # The default command runs without being named, show how to call it
+        command = self.commands[self.default_command]
+        command_ctx = click.Context(command, info_name=ctx.info_name, parent=ctx)
+        help_option = command.get_help_option(command_ctx)
+        records = [
+            record
+            for param in command.get_params(command_ctx)
+            if param is not help_option
+            and (record := param.get_help_record(command_ctx)) is not None
+        ]
+        with formatter.section(f"Default command ({self.default_command})"):
+            formatter.write_usage(
+                ctx.command_path,
+                " ".join(command.collect_usage_pieces(command_ctx)),
+            )
+            formatter.write_dl(records)
+
+
+@click.group(cls=DefaultCommandGroup, default_command="run")
+def main_cli():
+    """Proto Agent command line"""
+
+
+def _print_usage(prompt: str, prompt_tokens, response_tokens):
+    print(f"User prompt: {prompt}")
+    print(f"Prompt tokens: {prompt_tokens}")
+    print(f"Response tokens: {response_tokens}")
+
+
+def _run_in_daemon(prompt: str, working_directory: str, options: dict, verbose: bool):
+    """Send the prompt to a running daemon, returning False when none is running"""
+    from .daemon_client import DaemonClient, DaemonError
+
+    client = DaemonClient.connect()
+    if client is None:
+        return False
+
+    def on_event(event: dict):
+        if not verbose:
+            return
+        if event["type"] == "tool_call":
+            print(f"Calling function: {event['name']}({event['args']})")
+        elif event["type"] == "tool_result" and event["result"]:
+            print(f"-> {event['result']}")
+
+    with client:
+        try:
+            response = client.prompt(
+                prompt,
+                str(Path(working_directory).resolve()),
+                options,
+                verbose=verbose,
+                permission_callback=_get_user_confirmation,
+                on_event=on_event,
+            )
+        except DaemonError as e:
+            raise click.ClickException(str(e))
+    print(response["text"])
+    usage = response.get("usage")
+    if verbose and usage:
+        _print_usage(prompt, usage["prompt_tokens"], usage["completion_tokens"])
+    return True
+
+
+@main_cli.command(
+    "run",
+    short_help="Send a prompt to the agent (the default command).",
+    help=f"""Main CLI entry point for the Proto Agent
+    Sets up the agent with specified toolkits and configurations, then processes the user prompt.
+    Configuration and API key are loaded from a user-specific config directory
+    {str(Path(user_config_dir("proto-agent")))}
+
+    The prompt is sent to the agent daemon when one is running
+    (see `proto-agent daemon --help`). `run` is the default command and
+    may be omitted.
+    """,
+)
+@click.argument(
+    "prompt",
+)
+@click.argument(
+    "working-directory",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Enable detailed logging")
+@click.option(
+    "--read-only", is_flag=True, help="Enable only read operations (no write/execute)"
+)
+@click.option(
+    "--no-system", is_flag=True, help="Disable system monitoring capabilities"
+)
+@click.option("--enable-git", is_flag=True, help="Enable git operations toolkit")
+@click.option(
+    "--git-read-only",
+    is_flag=True,
+    help="Enable only git read operations (status, log, diff, blame)",
+)
+@click.option(
+    "--no-daemon",
+    is_flag=True,
+    help="Run in this process even when the agent daemon is running",
+)
+def run_command(
+    prompt: str,
+    working_directory: str,
+    verbose: bool,
+    read_only: bool,
+    no_system: bool,
+    enable_git: bool,
+    git_read_only: bool,
+    no_daemon: bool,
+):
+    options = {
+        "read_only": read_only,
+        "no_system": no_system,
+        "enable_git": enable_git,
+        "git_read_only": git_read_only,
+    }
+    if not no_daemon and _run_in_daemon(prompt, working_directory, options, verbose):
+        return
+
+    # Imported here so --help, argument errors and daemon runs return without
+    # loading the agent
+    from .agent import Agent
+    from .agent_settings import AgentConfig
+
+    from .completion_cache import configured_cache
+
+    api_key, config = load_settings()
+    tools, permission_required = build_tools(**options)
     configuration = AgentConfig(
         api_key=api_key,
         model=config.get("model", ""),
@@ -121,13 +269,9 @@ def main_cli(
         tools=tools,
         verbose=verbose,
         permission_callback=_get_user_confirmation,
-        permission_required={
-            FileOperationToolkit.RUN_PYTHON_FILE,
-            GitToolkit.GIT_COMMIT,
-            GitToolkit.GIT_PUSH,
-            GitToolkit.GIT_BRANCH,
-        },
+        permission_required=permission_required,
         system_prompt=config.get(("system_prompt"), SYSTEM_PROMPT),
+        completion_cache=configured_cache(config),
     )
 
     agent = Agent(configuration)
@@ -139,9 +283,135 @@ def main_cli(
     print(response.text)
 
     if verbose and response.usage_metadata:
-        print(f"User prompt: {prompt}")
-        print(f"Prompt tokens: {response.usage_metadata.prompt_token_count}")
-        print(f"Response tokens: {response.usage_metadata.candidates_token_count}")
+        _print_usage(
+            prompt,
+            response.usage_metadata.prompt_token_count,
+            response.usage_metadata.candidates_token_count,
+        )
+
+
+@main_cli.command("batch")
+@click.argument(
+    "manifest", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.argument("output", type=click.Path(dir_okay=False, path_type=Path))
+@click.option(
+    "-j",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Number of jobs run at the same time",
+)
+@click.option(
+    "--retry-errors",
+    is_flag=True,
+    help="Run again the jobs whose last result is an error",
+)
+def batch_command(manifest: Path, output: Path, workers: int, retry_errors: bool):
+    """Run the jobs of a JSONL MANIFEST concurrently, appending results to OUTPUT
+
+    Each manifest line is a JSON object with a `prompt`, a
+    `working_directory`, an optional `id` (the line number by default) and
+    the toolkit flags of `proto-agent run` (`read_only`, `no_system`,
+    `enable_git`, `git_read_only`). Jobs with a result in OUTPUT are skipped,
+    so an interrupted batch resumes when the command is run again. Functions
+    that need permission are refused.
+    """
+    from .batch import load_manifest, run_batch
+
+    try:
+        jobs = load_manifest(manifest)
+    except ValueError as e:
+        raise click.ClickException(f"{manifest}: {e}")
+    load_settings()  # A missing API key fails here rather than in every job
+
+    def on_result(result: dict):
+        tokens = result["prompt_tokens"] + result["completion_tokens"]
+        detail = "" if result["status"] == "ok" else f": {result['error']}"
+        click.echo(
+            f"{result['id']}: {result['status']} in {result['seconds']:.1f}s, "
+            f"{tokens} tokens{detail}"
+        )
+
+    summary = run_batch(
+        jobs, output, workers=workers, retry_errors=retry_errors, on_result=on_result
+    )
+    click.echo(
+        f"Jobs: {summary.succeeded + summary.failed} run ({summary.succeeded} ok, "
+        f"{summary.failed} failed), {summary.skipped} already done\n"
+        f"Elapsed: {summary.seconds:.1f}s ({summary.jobs_per_minute:.1f} jobs/min)\n"
+        f"Tokens: {summary.prompt_tokens} prompt ({summary.cached_tokens} cached), "
+        f"{summary.completion_tokens} completion"
+    )
+    if summary.failed:
+        raise SystemExit(1)
+
+
+@main_cli.group("daemon")
+def daemon_cli():
+    """Manage the agent daemon, a long-running process that keeps agents,
+    toolkits and provider connections warm so each `proto-agent` call only
+    pays for its prompt. Requests go over a Unix socket
+    ($PROTO_AGENT_SOCKET, by default in the user runtime directory).
+    Restart the daemon after changing the API key in .env, config.toml
+    changes apply to the next prompt."""
+
+
+@daemon_cli.command("start")
+@click.option(
+    "--foreground", is_flag=True, help="Serve in this process instead of detaching"
+)
+def daemon_start(foreground: bool):
+    """Start the agent daemon"""
+    from .daemon import serve, spawn
+    from .daemon_client import DaemonError
+
+    try:
+        if foreground:
+            serve()
+        else:
+            status = spawn()
+            click.echo(f"Daemon started (pid {status['pid']}) on {status['socket']}")
+    except DaemonError as e:
+        raise click.ClickException(str(e))
+
+
+@daemon_cli.command("stop")
+def daemon_stop():
+    """Stop the agent daemon"""
+    import time
+
+    from .daemon_client import DaemonClient, socket_path
+
+    client = DaemonClient.connect()
+    if client is None:
+        raise click.ClickException("Daemon is not running")
+    with client:
+        client.request({"type": "shutdown"})
+    # The socket keeps accepting until the daemon has closed it
+    deadline = time.monotonic() + 10
+    while socket_path().exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    click.echo("Daemon stopped")
+
+
+@daemon_cli.command("status")
+def daemon_status():
+    """Show whether the agent daemon is running and what it keeps warm"""
+    from .daemon_client import DaemonClient
+
+    client = DaemonClient.connect()
+    if client is None:
+        raise click.ClickException("Daemon is not running")
+    with client:
+        status = client.request({"type": "status"})
+    click.echo(
+        f"Daemon running (pid {status['pid']}) on {status['socket']}\n"
+        f"Uptime: {status['uptime_seconds']:.0f}s\n"
+        f"Prompts served: {status['prompts_served']}\n"
+        f"Warm agents: {status['warm_agents']}"
+    )
 
 
 if __name__ == "__main__":
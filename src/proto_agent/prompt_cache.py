@@ -0,0 +1,70 @@
+"""
+Provider prompt caching.
+Every completion re-sends the tool schemas, the system prompt and the
+history. Providers that cache prompt prefixes only serve the repeated part
+from cache when it is byte-for-byte identical, so the agent keeps it stable:
+stored messages are encoded once and never rewritten for a request, and
+tools are converted once per ``Tool``. OpenAI, DeepSeek or Gemini models
+then cache the prefix on their own. Anthropic models also need
+``cache_control`` breakpoints, which are added to per-request copies here.
+"""
+
+from typing import List, Optional, Tuple
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def uses_cache_breakpoints(model: str) -> bool:
+    """Whether the model only caches prompt prefixes ending at a ``cache_control`` breakpoint
+
+    Decided from the model name alone (Anthropic models, also when served
+    through Bedrock or Vertex AI), so that it is free to call before every
+    request. ``AgentConfig(prompt_caching=...)`` covers any other model.
+    """
+    name = model.lower()
+    return name.startswith("anthropic/") or "claude" in name
+
+
+def with_cache_breakpoint(message: dict) -> dict:
+    """Copy of ``message`` whose last content block carries a cache breakpoint"""
+    content = message.get("content")
+    if isinstance(content, str) and content:
+        blocks = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        blocks = list(content)
+    else:
+        return message
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return {**message, "content": blocks}
+
+
+def add_cache_breakpoints(
+    messages: List[dict], tools: Optional[List[dict]]
+) -> Tuple[List[dict], Optional[List[dict]]]:
+    """Copies of the request's messages and tools with cache breakpoints
+
+    The static prefix (tools, then the system prompt) ends at one
+    breakpoint and the last message at another, so each turn reads the
+    cache written by the turn before it and extends it. The stored history
+    is left as it is.
+    """
+    request = list(messages)
+    if request and request[0].get("role") == "system":
+        request[0] = with_cache_breakpoint(request[0])
+    elif tools:
+        tools = [*tools[:-1], {**tools[-1], "cache_control": CACHE_CONTROL}]
+    if request and request[-1].get("role") != "system":
+        request[-1] = with_cache_breakpoint(request[-1])
+    return request, tools
+
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens the provider served from its cache"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        cached = details.get("cached_tokens")
+    else:
+        cached = getattr(details, "cached_tokens", None)
+    if cached is None:
+        cached = getattr(usage, "cache_read_input_tokens", None)
+    return cached if isinstance(cached, int) else 0
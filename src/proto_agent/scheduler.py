@@ -0,0 +1,338 @@
+"""
+Request scheduling for completion calls.
+Every agent sends its completions through a ``RequestScheduler``, by default
+the process-wide ``default_scheduler``. Requests to one model with one API
+key share a lane: token buckets hold the lane to its requests-per-minute and
+tokens-per-minute limits, waiting requests are admitted by priority, and
+rate-limit, timeout, overload and network errors are retried with jittered
+backoff that pauses the whole lane, so waiting agents don't all retry at
+once. Errors raised before a request was sent, like a missing API key, are
+not retried.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+POLL_INTERVAL = 0.05  # Longest a queued request sleeps before checking again
+RETRYABLE_STATUS_CODES = {408, 429, 502, 503, 504}
+# litellm exception types worth retrying, matched by name so that checking
+# an error doesn't import litellm
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "BadGatewayError",
+    "Timeout",
+    "APITimeoutError",
+}
+# Causes of an APIConnectionError showing the request failed on the network,
+# rather than before it was sent (missing API key, bad provider config)
+NETWORK_ERRORS = {"ConnectionError", "TimeoutError", "TransportError"}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Per-minute quota of a model, either limit may be left unset"""
+
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+class TokenBucket:
+    """Holds up to one minute of quota and refills continuously
+
+    The level may go negative when a request used more tokens than
+    estimated; later requests then wait until the debt is paid back.
+    """
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken"""
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Lane:
+    """Buckets, queue and backoff state of one (model, API key) pair"""
+
+    def __init__(self, limit: Optional[RateLimit], now: float):
+        self.queue: List[Tuple[int, int]] = []
+        self.blocked_until = 0.0
+        self.set_limit(limit, now)
+
+    def set_limit(self, limit: Optional[RateLimit], now: float):
+        self.limit = limit
+        self.requests = self.tokens = None
+        if limit is not None and limit.requests_per_minute:
+            self.requests = TokenBucket(limit.requests_per_minute, now)
+        if limit is not None and limit.tokens_per_minute:
+            self.tokens = TokenBucket(limit.tokens_per_minute, now)
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        wait = self.blocked_until - now
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def take(self, tokens: int, now: float):
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error, as litellm's exceptions report it"""
+    code = getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _type_names(error: BaseException) -> set[str]:
+    return {cls.__name__ for cls in type(error).__mro__}
+
+
+def is_retryable(error: BaseException) -> bool:
+    names = _type_names(error)
+    if names & RETRYABLE_ERRORS:
+        return True
+    if "APIConnectionError" in names:
+        # litellm reports its own setup errors as connection errors with
+        # status 500, only retry the ones caused by the network
+        cause = error.__cause__ or error.__context__
+        while cause is not None:
+            if _type_names(cause) & NETWORK_ERRORS:
+                return True
+            cause = cause.__cause__ or cause.__context__
+        return False
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def _retry_after(error: BaseException) -> float:
+    """The provider's Retry-After delay in seconds, or 0 if it sent none"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+class RequestScheduler:
+    """Admits completion calls within per-model rate limits and retries transient errors
+
+    Limits are set per model, optionally per API key (``set_limit``), or
+    for every model (``default_limit``); each API key gets its own buckets.
+    Higher ``priority`` requests are admitted first, equal priorities in
+    arrival order. Token use is estimated before sending and corrected with
+    the usage the provider reports.
+    """
+
+    def __init__(
+        self,
+        default_limit: Optional[RateLimit] = None,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.default_limit = default_limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._limits: Dict[Tuple[str, Optional[str]], RateLimit] = {}
+        self._lanes: Dict[Tuple[str, Optional[str]], _Lane] = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+
+    def set_limit(self, model: str, limit: RateLimit, api_key: Optional[str] = None):
+        """Limit requests to ``model``, only those made with ``api_key`` if given"""
+        with self._condition:
+            self._limits[(model, api_key)] = limit
+            for key, lane in self._lanes.items():
+                if key[0] == model and lane.limit != self._limit_for(*key):
+                    lane.set_limit(self._limit_for(*key), time.monotonic())
+
+    def configure(self, limits: Dict[str, dict]):
+        """Set limits from a ``{model: {"requests_per_minute": ..., "tokens_per_minute": ...}}`` mapping"""
+        for model, values in limits.items():
+            limit = RateLimit(
+                requests_per_minute=values.get("requests_per_minute"),
+                tokens_per_minute=values.get("tokens_per_minute"),
+            )
+            if self._limits.get((model, None)) != limit:
+                self.set_limit(model, limit)
+
+    def _limit_for(self, model: str, api_key: Optional[str]) -> Optional[RateLimit]:
+        return self._limits.get(
+            (model, api_key), self._limits.get((model, None), self.default_limit)
+        )
+
+    def _lane(self, model: str, api_key: Optional[str]) -> _Lane:
+        lane = self._lanes.get((model, api_key))
+        if lane is None:
+            lane = self._lanes[(model, api_key)] = _Lane(
+                self._limit_for(model, api_key), time.monotonic()
+            )
+        return lane
+
+    def _enqueue(self, lane: _Lane, priority: int) -> Tuple[int, int]:
+        ticket = (-priority, next(self._sequence))
+        heapq.heappush(lane.queue, ticket)
+        return ticket
+
+    def _dequeue(self, lane: _Lane, ticket: Tuple[int, int]):
+        if ticket in lane.queue:
+            lane.queue.remove(ticket)
+            heapq.heapify(lane.queue)
+        self._condition.notify_all()
+
+    def _try_admit(self, lane: _Lane, ticket: Tuple[int, int], tokens: int) -> float:
+        """Admit the ticket if it is first in line and the quota allows, else return how long to wait"""
+        if lane.queue[0] != ticket:
+            return POLL_INTERVAL
+        now = time.monotonic()
+        wait = lane.wait_time(tokens, now)
+        if wait > 0:
+            return wait
+        lane.take(tokens, now)
+        self._dequeue(lane, ticket)
+        return 0.0
+
+    def acquire(
+        self, model: str, api_key: Optional[str], tokens: int, priority: int = 0
+    ):
+        """Block until a request of ``tokens`` estimated tokens may be sent"""
+        start = time.monotonic()
+        with self._condition:
+            lane = self._lane(model, api_key)
+            ticket = self._enqueue(lane, priority)
+            try:
+                while (wait := self._try_admit(lane, ticket, tokens)) > 0:
+                    self._condition.wait(wait)
+            finally:
+                self._dequeue(lane, ticket)
+            self.throttled_seconds += time.monotonic() - start
+
+    async def aacquire(
+        self, model: str, api_key: Optional[str], tokens: int, priority: int = 0
+    ):
+        """Async version of ``acquire``, waiting without blocking the event loop"""
+        import asyncio  # Only async agents pay for loading it
+
+        start = time.monotonic()
+        with self._condition:
+            lane = self._lane(model, api_key)
+            ticket = self._enqueue(lane, priority)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_admit(lane, ticket, tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        finally:
+            with self._condition:
+                self._dequeue(lane, ticket)
+                self.throttled_seconds += time.monotonic() - start
+
+    def settle(self, model: str, api_key: Optional[str], estimated: int, actual: int):
+        """Correct a lane's token bucket once a request's real usage is known"""
+        with self._condition:
+            lane = self._lane(model, api_key)
+            if lane.tokens is not None:
+                lane.tokens.give(estimated - actual)
+            self._condition.notify_all()
+
+    def settle_usage(self, model: str, api_key: Optional[str], estimated: int, usage):
+        """``settle`` with the usage object of a completion, if it has a total"""
+        total = getattr(usage, "total_tokens", None)
+        if isinstance(total, int):
+            self.settle(model, api_key, estimated, total)
+
+    def _backoff(
+        self, model: str, api_key: Optional[str], attempt: int, error: BaseException
+    ) -> float:
+        """Delay before retry ``attempt`` (full jitter), pausing the lane on rate limits"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        delay = max(delay, _retry_after(error))
+        with self._condition:
+            self.retries += 1
+            if status_code(error) == 429:
+                lane = self._lane(model, api_key)
+                lane.blocked_until = max(lane.blocked_until, time.monotonic() + delay)
+        return delay
+
+    def call(
+        self, function: Callable, kwargs: dict, tokens: int, priority: int = 0
+    ) -> Any:
+        """Call ``function(**kwargs)`` once admitted, retrying transient errors"""
+        model, api_key = kwargs["model"], kwargs.get("api_key")
+        for attempt in itertools.count():
+            self.acquire(model, api_key, tokens, priority)
+            try:
+                response = function(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                # The provider did not serve the request, give back its tokens
+                self.settle(model, api_key, tokens, 0)
+                self.sleep(self._backoff(model, api_key, attempt, e))
+                continue
+            if not kwargs.get("stream"):
+                # Streams report their usage at the end, the caller settles it
+                self.settle_usage(
+                    model, api_key, tokens, getattr(response, "usage", None)
+                )
+            return response
+
+    async def acall(
+        self, function: Callable, kwargs: dict, tokens: int, priority: int = 0
+    ) -> Any:
+        """Async version of ``call`` for coroutine functions"""
+        import asyncio
+
+        model, api_key = kwargs["model"], kwargs.get("api_key")
+        for attempt in itertools.count():
+            await self.aacquire(model, api_key, tokens, priority)
+            try:
+                response = await function(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                self.settle(model, api_key, tokens, 0)
+                await asyncio.sleep(self._backoff(model, api_key, attempt, e))
+                continue
+            if not kwargs.get("stream"):
+                self.settle_usage(
+                    model, api_key, tokens, getattr(response, "usage", None)
+                )
+            return response
+
+
+# Shared by every agent that is not given a scheduler of its own
+default_scheduler = RequestScheduler()
@@ -0,0 +1,132 @@
+"""
+Helpers for assembling streamed completions.
+Tool-call arguments arrive as JSON fragments spread across chunks, the
+assembler stitches them back together and reports each call as soon as its
+arguments are complete.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from litellm.types.utils import ChatCompletionMessageToolCall
+
+
+@dataclass
+class _PendingToolCall:
+    index: int
+    id: str | None = None
+    name: str = ""
+    arguments: List[str] = field(default_factory=list)
+    complete: bool = False
+    # Scanner state over the arguments so far, so that each fragment is only
+    # read once and they are parsed only when their brackets balance
+    _depth: int = 0
+    _in_string: bool = False
+    _escaped: bool = False
+    _balanced: bool = False
+
+    @property
+    def arguments_text(self) -> str:
+        return "".join(self.arguments)
+
+    def add_arguments(self, fragment: str):
+        self.arguments.append(fragment)
+        for char in fragment:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                self._balanced = False
+            elif char in "}]":
+                self._depth -= 1
+                self._balanced = self._depth == 0
+
+    def arguments_are_complete(self) -> bool:
+        """A JSON object that already parses can't be extended any further"""
+        if not self._balanced:
+            return False
+        try:
+            return isinstance(json.loads(self.arguments_text), dict)
+        except ValueError:
+            return False
+
+
+class ToolCallAssembler:
+    """Collects streamed tool-call deltas into complete tool calls"""
+
+    def __init__(self):
+        self._calls: dict[int, _PendingToolCall] = {}
+
+    def add(self, tool_call_deltas) -> List[int]:
+        """Feed the tool-call deltas of one chunk, returning indexes of calls that completed"""
+        completed = []
+        for position, delta in enumerate(tool_call_deltas or []):
+            index = getattr(delta, "index", None)
+            if index is None:
+                index = position
+            # A new call starting means every earlier call is done streaming
+            for pending in self._calls.values():
+                if pending.index < index and not pending.complete:
+                    pending.complete = True
+                    completed.append(pending.index)
+
+            pending = self._calls.setdefault(index, _PendingToolCall(index=index))
+            if getattr(delta, "id", None):
+                pending.id = delta.id
+            function = getattr(delta, "function", None)
+            if function is not None:
+                if getattr(function, "name", None):
+                    pending.name += function.name
+                if getattr(function, "arguments", None):
+                    pending.add_arguments(function.arguments)
+            if (
+                not pending.complete
+                and pending.name
+                and pending.arguments
+                and pending.arguments_are_complete()
+            ):
+                pending.complete = True
+                completed.append(index)
+        return completed
+
+    def finish(self) -> List[int]:
+        """Mark every remaining call complete once the stream has ended"""
+        completed = []
+        for pending in self._calls.values():
+            if not pending.complete:
+                pending.complete = True
+                completed.append(pending.index)
+        return completed
+
+    def function_call_args(self, index: int) -> tuple[str, dict]:
+        pending = self._calls[index]
+        text = pending.arguments_text
+        return pending.name, json.loads(text) if text else {}
+
+    @property
+    def indexes(self) -> List[int]:
+        return sorted(self._calls)
+
+    @property
+    def tool_calls(self) -> List["ChatCompletionMessageToolCall"]:
+        """The assembled calls in the same shape as a non-streamed response"""
+        from litellm.types.utils import ChatCompletionMessageToolCall, Function
+
+        return [
+            ChatCompletionMessageToolCall(
+                id=pending.id or f"call_{pending.index}",
+                function=Function(
+                    name=pending.name, arguments=pending.arguments_text or "{}"
+                ),
+            )
+            for pending in sorted(self._calls.values(), key=lambda p: p.index)
+        ]
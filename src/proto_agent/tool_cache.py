@@ -0,0 +1,253 @@
+"""
+Result cache for read-only toolkit functions.
+Entries are keyed on the function name, working directory and canonicalized
+arguments, expire after a per-function TTL and are evicted least recently
+used first. A fingerprint (file mtime/size, git HEAD and index state) is
+stored with each entry so results are dropped as soon as what they were read
+from changes, and mutating functions evict the entries they affect.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+FILES = "files"
+GIT = "git"
+
+MAX_CACHED_RESULT_BYTES = 64 * 1024
+MISS = object()  # Returned by ToolResultCache.get when there is no valid entry
+
+
+def _stat_fingerprint(path: Path) -> Hashable:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _argument_path(working_directory: str, args: dict, argument: str) -> Path:
+    return (Path(working_directory) / (args.get(argument) or ".")).resolve()
+
+
+def file_fingerprint(argument: str) -> Callable[[str, dict], Hashable]:
+    """Fingerprint the file or directory named by ``argument`` via its mtime and size"""
+
+    def fingerprint(working_directory: str, args: dict) -> Hashable:
+        return _stat_fingerprint(_argument_path(working_directory, args, argument))
+
+    return fingerprint
+
+
+def directory_fingerprint(argument: str) -> Callable[[str, dict], Hashable]:
+    """Fingerprint the directory named by ``argument`` via the name, mtime and size of each entry
+
+    A directory's own mtime misses files rewritten in place.
+    """
+
+    def fingerprint(working_directory: str, args: dict) -> Hashable:
+        try:
+            with os.scandir(_argument_path(working_directory, args, argument)) as it:
+                entries = []
+                for entry in it:
+                    stat = entry.stat(follow_symlinks=False)
+                    entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            return None
+        return hash(tuple(sorted(entries)))
+
+    return fingerprint
+
+
+def _find_git_dir(working_directory: str) -> Path | None:
+    path = Path(working_directory).resolve()
+    for candidate in (path, *path.parents):
+        dot_git = candidate / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            content = dot_git.read_text().strip()
+            if content.startswith("gitdir:"):
+                return (candidate / content[len("gitdir:") :].strip()).resolve()
+    return None
+
+
+def git_fingerprint(working_directory: str, args: dict) -> Hashable:
+    """Fingerprint the repository state via HEAD, the ref it points to and the index"""
+    git_dir = _find_git_dir(working_directory)
+    if git_dir is None:
+        return None
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+    except OSError:
+        return None
+    ref_state = None
+    if head.startswith("ref:"):
+        ref = head[len("ref:") :].strip()
+        ref_state = _stat_fingerprint(git_dir / ref) or _stat_fingerprint(
+            git_dir / "packed-refs"
+        )
+    return (head, ref_state, _stat_fingerprint(git_dir / "index"))
+
+
+def combine_fingerprints(
+    *fingerprints: Callable[[str, dict], Hashable],
+) -> Callable[[str, dict], Hashable]:
+    def fingerprint(working_directory: str, args: dict) -> Hashable:
+        return tuple(f(working_directory, args) for f in fingerprints)
+
+    return fingerprint
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How results of one function are cached
+
+    Args:
+        group: Invalidation group the entries belong to (``FILES`` or ``GIT``)
+        ttl: Seconds an entry stays valid
+        fingerprint: Computes the state an entry was read from, a mismatch drops it
+        path_argument: Argument naming the path an entry was read from, used to
+            evict only the entries affected by a write
+        max_result_bytes: Results longer than this are returned but not cached
+        bypass: Given the call's arguments, whether it skips the cache
+    """
+
+    group: str
+    ttl: float = 60.0
+    fingerprint: Callable[[str, dict], Hashable] | None = None
+    path_argument: str | None = None
+    max_result_bytes: int = MAX_CACHED_RESULT_BYTES
+    bypass: Callable[[dict], bool] | None = None
+
+    def fingerprint_for(self, working_directory: str, args: dict) -> Hashable:
+        if self.fingerprint is None:
+            return None
+        return self.fingerprint(working_directory, args)
+
+
+@dataclass(frozen=True)
+class Invalidation:
+    """Which cached entries a mutating function evicts
+
+    Args:
+        groups: Groups whose entries are evicted
+        path_argument: When set, entries of the ``FILES`` group are only evicted
+            if they were read from that path or one of its parent directories
+    """
+
+    groups: frozenset = frozenset({FILES, GIT})
+    path_argument: str | None = None
+
+
+@dataclass
+class _CacheEntry:
+    result: Any
+    expires_at: float
+    fingerprint: Hashable
+    group: str
+    path: Path | None = None
+    hits: int = 0
+
+
+class ToolResultCache:
+    """Thread-safe LRU cache of toolkit function results"""
+
+    def __init__(self, max_entries: int = 256, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name: str, working_directory: str, args: dict) -> tuple:
+        canonical_args = json.dumps(args, sort_keys=True, separators=(",", ":"))
+        return (name, os.fspath(working_directory), canonical_args)
+
+    def get(self, key: tuple, fingerprint: Hashable) -> Any:
+        """Return the cached result, or ``MISS`` if there is no valid entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISS
+        if entry.expires_at < time.monotonic() or entry.fingerprint != fingerprint:
+            with self._lock:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return MISS
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        entry.hits += 1
+        self.hits += 1
+        return entry.result
+
+    def put(
+        self,
+        key: tuple,
+        policy: CachePolicy,
+        args: dict,
+        result: Any,
+        fingerprint: Hashable,
+    ):
+        """Store a result along with the fingerprint taken before it was computed"""
+        if isinstance(result, (str, bytes)) and len(result) > policy.max_result_bytes:
+            return
+        working_directory = key[1]
+        entry = _CacheEntry(
+            result=result,
+            expires_at=time.monotonic() + policy.ttl,
+            fingerprint=fingerprint,
+            group=policy.group,
+            path=_argument_path(working_directory, args, policy.path_argument)
+            if policy.path_argument
+            else None,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(
+        self, working_directory: str, invalidation: Invalidation, args: dict
+    ) -> int:
+        """Evict the entries a mutating call affects, returning how many were dropped"""
+        written = (
+            _argument_path(working_directory, args, invalidation.path_argument)
+            if invalidation.path_argument
+            else None
+        )
+        working_directory = os.fspath(working_directory)
+        with self._lock:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if key[1] == working_directory
+                and entry.group in invalidation.groups
+                and (
+                    written is None
+                    or entry.group != FILES
+                    or entry.path is None
+                    or entry.path == written
+                    or entry.path in written.parents
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,18 +1,154 @@
-from .types_llm import FunctionDeclaration
-from typing import Callable
+import inspect
+import warnings
+from types import MethodType
+
+from .tool_cache import MISS, CachePolicy, Invalidation, ToolResultCache
+from .types_llm import FunctionDeclaration, Tool
+from typing import Callable, Iterable
+
+
+class _DeprecatedOnClass:
+    """Method that, called on ``ToolKitRegistery`` itself, runs on ``global_registry``
+
+    Keeps ``ToolKitRegistery.register(...)`` working for toolkits written
+    before registries became per-instance.
+    """
+
+    def __init__(self, function: Callable):
+        self.function = function
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            warnings.warn(
+                f"ToolKitRegistery.{self.name}() on the class is deprecated, call it "
+                f"on a toolkit's registry or on tool_kit_registry.global_registry",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            instance = global_registry
+        return MethodType(self.function, instance)
 
 
 class ToolKitRegistery:
-    _functions: dict[str, Callable] = {}
-    _schemas: list[FunctionDeclaration] = []
+    """Maps tool names to the functions that run them
 
-    @classmethod
-    def register(cls, name: str, function: Callable, schema: FunctionDeclaration):
-        if name in cls._functions:
+    Every toolkit registers its functions in its own registry, and every
+    agent merges those of its tools into one with ``for_tools``, so agents
+    with different capability sets share a process and each call resolves
+    with a single dict lookup. Functions of plain ``Tool``s are registered
+    in the module-level ``global_registry``. The result cache is shared by
+    all registries unless one is given.
+    """
+
+    cache = ToolResultCache()
+
+    def __init__(self, cache: ToolResultCache | None = None):
+        self._functions = {}
+        self._schemas = []
+        self._cache_policies = {}
+        self._invalidations = {}
+        if cache is not None:
+            self.cache = cache
+
+    @_DeprecatedOnClass
+    def register(
+        self,
+        name: str,
+        function: Callable,
+        schema: FunctionDeclaration,
+        cache_policy: CachePolicy | None = None,
+        invalidates: Invalidation | None = None,
+    ):
+        if name in self._functions:
             raise ValueError(f"Function '{name}' is already registered.")
-        cls._functions[name] = function
-        cls._schemas.append(schema)
+        self._functions[name] = function
+        self._schemas.append(schema)
+        if cache_policy is not None:
+            self._cache_policies[name] = cache_policy
+        if invalidates is not None:
+            self._invalidations[name] = invalidates
+
+    @_DeprecatedOnClass
+    def get_function(self, name: str):
+        return self._functions.get(name)
+
+    def _cached(self, name: str, working_directory, args: dict):
+        """Cache key, fingerprint and cached result of a call, None when it is not cached"""
+        policy = self._cache_policies.get(name)
+        if (
+            policy is None
+            or not self.cache.enabled
+            or (policy.bypass and policy.bypass(args))
+        ):
+            return None
+        # Toolkits configured differently register different functions
+        # under the same name, their results must not be mixed up
+        key = self.cache.make_key(name, working_directory, args) + (
+            self._functions[name],
+        )
+        fingerprint = policy.fingerprint_for(working_directory, args)
+        return key, fingerprint, self.cache.get(key, fingerprint)
+
+    def _store(self, name: str, working_directory, args: dict, cached, result):
+        """Cache a result looked up with ``_cached`` and apply the call's invalidation"""
+        if cached is not None:
+            key, fingerprint, _ = cached
+            self.cache.put(key, self._cache_policies[name], args, result, fingerprint)
+        invalidation = self._invalidations.get(name)
+        if invalidation is not None:
+            self.cache.invalidate(working_directory, invalidation, args)
+
+    def dispatch(self, name: str, working_directory, args: dict):
+        """Call a registered function, serving read-only results from the cache"""
+        cached = self._cached(name, working_directory, args)
+        if cached is not None and cached[2] is not MISS:
+            return cached[2]
+        result = self._functions[name](working_directory=working_directory, **args)
+        self._store(name, working_directory, args, cached, result)
+        return result
+
+    async def adispatch(self, name: str, working_directory, args: dict):
+        """``dispatch`` for coroutine functions, awaiting their result"""
+        cached = self._cached(name, working_directory, args)
+        if cached is not None and cached[2] is not MISS:
+            return cached[2]
+        result = self._functions[name](working_directory=working_directory, **args)
+        if inspect.isawaitable(result):
+            result = await result
+        self._store(name, working_directory, args, cached, result)
+        return result
 
     @classmethod
-    def get_function(cls, name: str):
-        return cls._functions.get(name)
+    def for_tools(cls, tools: Iterable[Tool]) -> "ToolKitRegistery":
+        """Build the registry serving ``tools``
+
+        Declarations of a toolkit's tool resolve to that toolkit's functions,
+        those of a plain ``Tool`` to the functions in the global registry when
+        the registry is built.
+        """
+        registry = cls()
+        for tool in tools:
+            source = tool.registry if tool.registry is not None else global_registry
+            for schema in tool.function_declarations:
+                name = schema.name
+                if name in registry._functions:
+                    raise ValueError(f"Function '{name}' is provided by two tools.")
+                function = source._functions.get(name)
+                if function is None:
+                    raise ValueError(
+                        f"Function '{name}' is declared but not registered."
+                    )
+                registry._functions[name] = function
+                registry._schemas.append(schema)
+                if name in source._cache_policies:
+                    registry._cache_policies[name] = source._cache_policies[name]
+                if name in source._invalidations:
+                    registry._invalidations[name] = source._invalidations[name]
+        return registry
+
+
+# Registry of the functions behind plain ``Tool``s
+global_registry = ToolKitRegistery()
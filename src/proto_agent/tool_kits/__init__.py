@@ -1,6 +1,26 @@
-from .file_operation_toolkit import FileOperationToolkit
-from .system_info_toolkit import SystemInfoToolkit
-from .git_toolkit import GitToolkit
-from .base_toolkit import ToolKit
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .file_operation_toolkit import FileOperationToolkit
+    from .system_info_toolkit import SystemInfoToolkit
+    from .git_toolkit import GitToolkit
+    from .base_toolkit import ToolKit
 
 __all__ = ["ToolKit", "FileOperationToolkit", "SystemInfoToolkit", "GitToolkit"]
+
+# Toolkits are imported on first access, so psutil only loads with the system toolkit
+_EXPORTS = {
+    "FileOperationToolkit": ".file_operation_toolkit",
+    "SystemInfoToolkit": ".system_info_toolkit",
+    "GitToolkit": ".git_toolkit",
+    "ToolKit": ".base_toolkit",
+}
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
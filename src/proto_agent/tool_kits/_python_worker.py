@@ -0,0 +1,74 @@
+"""
+Bootstrap of a warm ``run_python_file`` worker.
+Started ahead of time by the runner pool. It imports the modules listed in
+``argv[1]`` (a JSON list), then blocks until a single job arrives as one JSON
+line on stdin, applies the resource limits, runs the script as ``__main__``
+and exits. A worker is never reused, so every run starts from a clean module
+state. Only the standard library is imported since the worker may run in a
+different environment than the agent.
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import os
+import runpy
+import sys
+import traceback
+
+
+def _preload(modules):
+    # Anything printed while importing would otherwise end up in the run's output
+    with (
+        contextlib.redirect_stdout(io.StringIO()),
+        contextlib.redirect_stderr(io.StringIO()),
+    ):
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except BaseException:
+                # A module that can't be imported up front fails in the script itself
+                pass
+
+
+def _set_limits(cpu_seconds, memory_bytes):
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if memory_bytes and hasattr(resource, "RLIMIT_AS"):
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def _print_script_traceback(error, path):
+    # Drop the frames of this bootstrap and runpy, like a direct ``python script.py``
+    tb = error.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != path:
+        tb = tb.tb_next
+    traceback.print_exception(type(error), error, tb or error.__traceback__)
+
+
+def main():
+    _preload(json.loads(sys.argv[1]) if len(sys.argv) > 1 else [])
+    line = sys.stdin.readline()
+    if not line:
+        return
+    job = json.loads(line)
+    path = job["path"]
+    _set_limits(job.get("cpu_seconds"), job.get("memory_bytes"))
+    sys.argv = [path] + job.get("args", [])
+    sys.path[0] = os.path.dirname(path)
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        _print_script_traceback(e, path)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Provides common interface and functionality for all toolkits.
 """
 
 from abc import ABC, abstractmethod
+from ..tool_kit_registry import ToolKitRegistery
 from ..types_llm import Tool
 
 
@@ -11,12 +12,13 @@ class ToolKit(ABC):
     """Abstract base class for all toolkits"""
 
     def __init__(self):
-        """Initialize toolkit with empty schemas list"""
+        """Initialize toolkit with empty schemas list and its own registry"""
         self.schemas = []
+        self.registry = ToolKitRegistery()
 
     @abstractmethod
     def _register_functions(self):
-        """Register functions with the global registry. Must be implemented by subclasses."""
+        """Register functions with the toolkit's registry. Must be implemented by subclasses."""
         pass
 
     @property
@@ -1,9 +1,32 @@
+import math
+import os
+import re
+import signal
+import tempfile
 from pathlib import Path
-from subprocess import run
-from ..tool_kit_registry import ToolKitRegistery
+from ..tool_cache import (
+    FILES,
+    CachePolicy,
+    Invalidation,
+    directory_fingerprint,
+    file_fingerprint,
+)
 from ..types_llm import FunctionDeclaration, Tool
 from .base_toolkit import ToolKit
-from ..Config import MAX_BYTES
+from .file_reader import read_range
+from .patching import PatchError, apply_patch, changed_hunks
+from .path_filters import GitIgnore, walk_entries
+from .python_runner import PythonRunner
+from .search_index import SearchIndex
+from ..Config import (
+    EXECUTION_MEMORY_LIMIT,
+    EXECUTION_TIMEOUT,
+    MAX_BYTES,
+    MAX_LIST_ENTRIES,
+    MAX_OUTPUT_BYTES,
+    MAX_SEARCH_LINE_CHARS,
+    MAX_SEARCH_RESULTS,
+)
 
 
 def _is_in_boundary(working_directory: Path, path: Path) -> bool:
@@ -15,58 +38,195 @@ def _is_in_boundary(working_directory: Path, path: Path) -> bool:
 
 
 def get_file_content(
-    working_directory: str, file_path: str, max_bytes: int = MAX_BYTES
+    working_directory: str,
+    file_path: str,
+    max_bytes: int = MAX_BYTES,
+    offset: int = 0,
+    length: int | None = None,
+    start_line: int | None = None,
+    end_line: int | None = None,
 ) -> str:
-    """Read the contents of a file and return them"""
+    """Read the contents of a file, or a byte or line range of it, and return them"""
     path = (Path(working_directory) / file_path).resolve()
     if not _is_in_boundary(Path(working_directory), path):
         return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
     try:
         if not path.is_file():
             return f'Error: File not found or is not a regular file: "{file_path}"'
-        with open(path) as f:
-            content = f.read(max_bytes)
-        metadata = path.stat()
-        if metadata.st_size > max_bytes:
-            content += f'[...File "{file_path}" truncated at {max_bytes} characters]'
-        return content
+        return read_range(path, max_bytes, offset, length, start_line, end_line)
     except Exception as e:
         return f"Error: {e}"
 
 
-def get_files_info(working_directory: str, directory: str = ".") -> str:
-    """List files and directories with metadata"""
-    path = (Path(working_directory) / directory).resolve()
+def get_files_info(
+    working_directory: str,
+    directory: str = ".",
+    recursive: bool = False,
+    max_depth: int = 10,
+    pattern: str | None = None,
+    respect_gitignore: bool = True,
+    offset: int = 0,
+    limit: int = MAX_LIST_ENTRIES,
+) -> str:
+    """List files and directories with metadata, optionally recursing into subdirectories"""
+    root = Path(working_directory).resolve()
+    path = (root / directory).resolve()
     try:
         if not _is_in_boundary(Path(working_directory), path):
             return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
         if not path.is_dir():
             return f'Error: "{directory}" is not a directory'
-        files_data = ""
-        for file in path.iterdir():
-            files_data += f"- {file.name}: file_size={file.stat().st_size} bytes, is_dir={file.is_dir()}\n"
-        return files_data
+        gitignore = GitIgnore(root) if respect_gitignore and recursive else None
+        if gitignore is not None:
+            # Rules from the directories above the listed one still apply
+            for parent in reversed(path.relative_to(root).parents):
+                gitignore.load_directory(
+                    "" if parent == Path(".") else parent.as_posix()
+                )
+
+        lines = []
+        has_more = False
+        entries = walk_entries(root, path, recursive, max_depth, pattern, gitignore)
+        for index, (relative_path, entry) in enumerate(entries):
+            if index < offset:
+                continue
+            if len(lines) == limit:
+                has_more = True
+                break
+            name = relative_path if recursive else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            # Only files need a stat call, the directory flag comes from the dirent
+            size = 0 if is_dir else entry.stat(follow_symlinks=False).st_size
+            lines.append(f"- {name}: file_size={size} bytes, is_dir={is_dir}")
+
+        if has_more:
+            lines.append(
+                f"[... more entries, call again with offset={offset + limit} to continue]"
+            )
+        return "\n".join(lines) + "\n" if lines else ""
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def search_files(
+    working_directory: str,
+    pattern: str,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    directory: str = ".",
+    glob: str | None = None,
+    max_results: int = MAX_SEARCH_RESULTS,
+) -> str:
+    """Search file contents for a literal string or regular expression"""
+    root = Path(working_directory).resolve()
+    path = (root / directory).resolve()
+    if not _is_in_boundary(Path(working_directory), path):
+        return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+    try:
+        if not path.is_dir():
+            return f'Error: "{directory}" is not a directory'
+        relative_directory = path.relative_to(root).as_posix()
+        matches, has_more = SearchIndex.for_directory(working_directory).search(
+            pattern,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            directory="" if relative_directory == "." else relative_directory,
+            glob=glob,
+            max_results=max_results,
+        )
+        if not matches:
+            return f'No matches found for "{pattern}"'
+        lines = [
+            f"{file}:{line_number}: {line[:MAX_SEARCH_LINE_CHARS]}"
+            for file, line_number, line in matches
+        ]
+        if has_more:
+            lines.append(
+                f"[... more than {max_results} matches, narrow the search with directory or glob]"
+            )
+        return "\n".join(lines) + "\n"
+    except re.error as e:
+        return f"Error: Invalid regular expression: {e}"
     except Exception as e:
         return f"Error: {e}"
 
 
+def _atomic_write(path: Path, data: bytes):
+    """Write a file through a temporary file and a rename, so readers never see it half-written"""
+    fd, temporary = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            os.chmod(temporary, path.stat().st_mode & 0o7777)
+        else:
+            # mkstemp creates files readable only by the owner
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temporary, 0o666 & ~umask)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+
 def write_file(working_directory: str, file_path: str, content: str) -> str:
     """Write content to a file, creating it if it doesn't exist"""
     path = (Path(working_directory) / file_path).resolve()
     if not _is_in_boundary(Path(working_directory).resolve(), path):
         return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
     try:
-        with open(path, "w+") as f:
-            f.write(content)
-            return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+        _atomic_write(path, content.encode())
+        SearchIndex.notify_changed(working_directory, file_path)
+        return (
+            f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+        )
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def edit_file(working_directory: str, file_path: str, patch: str) -> str:
+    """Apply a unified diff or search/replace blocks to a file and return the changed hunks"""
+    path = (Path(working_directory) / file_path).resolve()
+    if not _is_in_boundary(Path(working_directory).resolve(), path):
+        return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+    try:
+        if path.exists() and not path.is_file():
+            return f'Error: Not a regular file: "{file_path}"'
+        try:
+            old = path.read_bytes().decode() if path.exists() else ""
+        except UnicodeDecodeError:
+            return f'Error: "{file_path}" is not a UTF-8 text file'
+        new = apply_patch(old, patch)
+        if new == old:
+            return f'No changes made to "{file_path}"'
+        _atomic_write(path, new.encode())
+        SearchIndex.notify_changed(working_directory, file_path)
+        diff = changed_hunks(old, new, file_path)
+        if len(diff) > MAX_BYTES:
+            diff = diff[:MAX_BYTES] + "[...diff truncated]\n"
+        return f'Successfully edited "{file_path}"\n{diff}'
+    except PatchError as e:
+        return f'Error: Patch does not apply to "{file_path}": {e}'
     except Exception as e:
         return f"Error: {e}"
 
 
 def run_python_file(
-    working_directory: str, file_path: str, args: list[str] | None = None
+    working_directory: str,
+    file_path: str,
+    args: list[str] | None = None,
+    timeout: float = EXECUTION_TIMEOUT,
+    cpu_time_limit: int | None = None,
+    memory_limit: int | None = EXECUTION_MEMORY_LIMIT,
+    max_output_bytes: int = MAX_OUTPUT_BYTES,
 ) -> str:
-    """Execute a Python file and return its output"""
+    """Execute a Python file in a warm worker interpreter and return its output"""
     if args is None:
         args = []
     path = (Path(working_directory) / file_path).resolve()
@@ -76,37 +236,68 @@ def run_python_file(
         if not path.is_file():
             return f'Error: File not found or is not a regular file: "{file_path}"'
 
-        cmd = ["python", str(path)] + args
-        result = run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=working_directory,
-            timeout=30,
+        result = PythonRunner.for_directory(working_directory).run(
+            path,
+            args,
+            timeout=timeout,
+            cpu_seconds=cpu_time_limit or math.ceil(timeout),
+            memory_bytes=memory_limit,
+            max_output_bytes=max_output_bytes,
         )
+        # The script may have written anywhere in the tree
+        SearchIndex.notify_changed(working_directory)
 
-        res = f"Exit code: {result.returncode}\n"
-        if result.stdout:
-            res += f"STDOUT:\n{result.stdout}\n"
-        if result.stderr:
-            res += f"STDERR:\n{result.stderr}\n"
-        if len(result.stdout) == 0 and len(result.stderr) == 0:
+        if result.timed_out:
+            res = f"Execution timed out after {timeout} seconds\n"
+        elif result.exit_code is not None and result.exit_code < 0:
+            signal_name = _signal_name(-result.exit_code)
+            res = f"Exit code: {result.exit_code} (killed by {signal_name})\n"
+        else:
+            res = f"Exit code: {result.exit_code}\n"
+        for name in ("stdout", "stderr"):
+            output = getattr(result, name)
+            if output.total_bytes:
+                res += f"{name.upper()}:\n{output.text()}\n"
+        if not result.stdout.total_bytes and not result.stderr.total_bytes:
             res += "No output produced."
         return res
     except Exception as e:
         return f"Error: {e}"
 
 
+def _signal_name(number: int) -> str:
+    try:
+        return signal.Signals(number).name
+    except ValueError:
+        return f"signal {number}"
+
+
 schema_get_file_content = FunctionDeclaration(
     name="get_file_content",
-    description="Read the contents of a file and return them. Returns the full file content on success.",
+    description="Read the contents of a file and return them. Large files are truncated; read further with offset/length (bytes) or start_line/end_line. Binary files are summarized instead of decoded.",
     parameters={
         "type": "object",
         "properties": {
             "file_path": {
                 "type": "string",
                 "description": "path for file to be read",
-            }
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Byte offset to start reading at (default: 0)",
+            },
+            "length": {
+                "type": "integer",
+                "description": "Number of bytes to read, capped at the toolkit's read limit",
+            },
+            "start_line": {
+                "type": "integer",
+                "description": "First line to read, 1-based (takes precedence over offset)",
+            },
+            "end_line": {
+                "type": "integer",
+                "description": "Last line to read, inclusive (default: end of file)",
+            },
         },
         "required": ["file_path"],
     },
@@ -114,15 +305,74 @@ schema_get_file_content = FunctionDeclaration(
 
 schema_get_files_info = FunctionDeclaration(
     name="get_files_info",
-    description="List files and directories with metadata. The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
+    description="List files and directories with metadata. The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself. Set recursive to map a whole tree in one call; files ignored by .gitignore are skipped and long listings are paginated.",
     parameters={
         "type": "object",
         "properties": {
             "directory": {
                 "type": "string",
                 "description": "Directory to list the files for",
-            }
+            },
+            "recursive": {
+                "type": "boolean",
+                "description": "Also list the contents of subdirectories (default: false)",
+            },
+            "max_depth": {
+                "type": "integer",
+                "description": "How many directory levels to descend when recursive (default: 10)",
+            },
+            "pattern": {
+                "type": "string",
+                "description": "Only list files whose name or relative path matches this glob, e.g. '*.py' (optional)",
+            },
+            "respect_gitignore": {
+                "type": "boolean",
+                "description": "Skip files ignored by .gitignore when recursive (default: true)",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Number of entries to skip, to continue a truncated listing",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum number of entries to return (default: {MAX_LIST_ENTRIES})",
+            },
+        },
+    },
+)
+
+schema_search_files = FunctionDeclaration(
+    name="search_files",
+    description="Search the contents of the files in the working directory for a literal string or a regular expression. Returns matching lines as path:line: text. Much cheaper than reading files one by one to find code.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "pattern": {
+                "type": "string",
+                "description": "Text to search for, or a Python regular expression when regex is true",
+            },
+            "regex": {
+                "type": "boolean",
+                "description": "Treat pattern as a regular expression (default: false)",
+            },
+            "case_sensitive": {
+                "type": "boolean",
+                "description": "Match case exactly (default: true)",
+            },
+            "directory": {
+                "type": "string",
+                "description": "Only search below this directory, relative to the working directory",
+            },
+            "glob": {
+                "type": "string",
+                "description": "Only search files whose name or relative path matches this glob, e.g. '*.py'",
+            },
+            "max_results": {
+                "type": "integer",
+                "description": f"Maximum number of matching lines to return (default: {MAX_SEARCH_RESULTS})",
+            },
         },
+        "required": ["pattern"],
     },
 )
 
@@ -145,6 +395,25 @@ schema_write_file = FunctionDeclaration(
     },
 )
 
+schema_edit_file = FunctionDeclaration(
+    name="edit_file",
+    description="Edit part of a file without sending the whole file back. The patch is either a unified diff (with @@ hunk headers) or one or more search/replace blocks of the form '<<<<<<< SEARCH\\n<exact old lines>\\n=======\\n<new lines>\\n>>>>>>> REPLACE'. Each search block must match exactly once. Returns the changed hunks.",
+    parameters={
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "path to the file to be edited",
+            },
+            "patch": {
+                "type": "string",
+                "description": "Unified diff or search/replace blocks to apply",
+            },
+        },
+        "required": ["file_path", "patch"],
+    },
+)
+
 schema_run_python_file = FunctionDeclaration(
     name="run_python_file",
     description="Execute a Python file located in the calculator directory. Returns the program output or an error.",
@@ -166,6 +435,28 @@ schema_run_python_file = FunctionDeclaration(
 )
 
 
+cache_get_file_content = CachePolicy(
+    group=FILES,
+    ttl=60,
+    fingerprint=file_fingerprint("file_path"),
+    path_argument="file_path",
+)
+# Fingerprinting a whole tree costs as much as listing it, so recursive
+# listings are not cached
+cache_get_files_info = CachePolicy(
+    group=FILES,
+    ttl=60,
+    fingerprint=directory_fingerprint("directory"),
+    path_argument="directory",
+    bypass=lambda args: bool(args.get("recursive")),
+)
+# Writes only affect cached reads of the written file and its parent directories,
+# running a script could touch anything
+invalidates_write_file = Invalidation(path_argument="file_path")
+invalidates_edit_file = Invalidation(path_argument="file_path")
+invalidates_run_python_file = Invalidation()
+
+
 class FileOperationToolkit(ToolKit):
     """
     File operations toolkit with configurable capabilities.
@@ -174,7 +465,9 @@ class FileOperationToolkit(ToolKit):
 
     GET_FILE_CONTENT = "get_file_content"
     GET_FILES_INFO = "get_files_info"
+    SEARCH_FILES = "search_files"
     WRITE_FILE = "write_file"
+    EDIT_FILE = "edit_file"
     RUN_PYTHON_FILE = "run_python_file"
 
     def __init__(
@@ -184,6 +477,8 @@ class FileOperationToolkit(ToolKit):
         enable_list: bool = True,
         enable_execute: bool = True,
         max_bytes: int = MAX_BYTES,
+        execution_timeout: float = EXECUTION_TIMEOUT,
+        memory_limit: int | None = EXECUTION_MEMORY_LIMIT,
     ):
         """
         Initialize FileOperationToolkit with capability flags.
@@ -194,6 +489,8 @@ class FileOperationToolkit(ToolKit):
             enable_list: Allow listing files and directories
             enable_execute: Allow executing Python files
             max_bytes: Maximum bytes to read from files
+            execution_timeout: Seconds an executed Python file may run
+            memory_limit: Address space limit in bytes for executed Python files
             requires_permissions: Set of function names that require user confirmation
         """
         super().__init__()
@@ -202,38 +499,67 @@ class FileOperationToolkit(ToolKit):
         self.enable_list = enable_list
         self.enable_execute = enable_execute
         self.max_bytes = max_bytes
+        self.execution_timeout = execution_timeout
+        self.memory_limit = memory_limit
         self._register_functions()
 
     def _register_functions(self):
-        """Register enabled functions with the global registry"""
+        """Register enabled functions with the toolkit's registry"""
 
         if self.enable_read:
             self.schemas.append(schema_get_file_content)
-            ToolKitRegistery.register(
+            self.registry.register(
                 "get_file_content",
-                lambda working_directory, file_path: get_file_content(
-                    working_directory, file_path, self.max_bytes
+                lambda working_directory, file_path, **kwargs: get_file_content(
+                    working_directory, file_path, self.max_bytes, **kwargs
                 ),
                 schema_get_file_content,
+                cache_policy=cache_get_file_content,
             )
+            self.schemas.append(schema_search_files)
+            self.registry.register("search_files", search_files, schema_search_files)
 
         if self.enable_list:
             self.schemas.append(schema_get_files_info)
-            ToolKitRegistery.register(
-                "get_files_info", get_files_info, schema_get_files_info
+            self.registry.register(
+                "get_files_info",
+                get_files_info,
+                schema_get_files_info,
+                cache_policy=cache_get_files_info,
             )
 
         if self.enable_write:
             self.schemas.append(schema_write_file)
-            ToolKitRegistery.register("write_file", write_file, schema_write_file)
+            self.registry.register(
+                "write_file",
+                write_file,
+                schema_write_file,
+                invalidates=invalidates_write_file,
+            )
+            self.schemas.append(schema_edit_file)
+            self.registry.register(
+                "edit_file",
+                edit_file,
+                schema_edit_file,
+                invalidates=invalidates_edit_file,
+            )
 
         if self.enable_execute:
             self.schemas.append(schema_run_python_file)
-            ToolKitRegistery.register(
-                "run_python_file", run_python_file, schema_run_python_file
+            self.registry.register(
+                "run_python_file",
+                lambda working_directory, file_path, args=None: run_python_file(
+                    working_directory,
+                    file_path,
+                    args,
+                    timeout=self.execution_timeout,
+                    memory_limit=self.memory_limit,
+                ),
+                schema_run_python_file,
+                invalidates=invalidates_run_python_file,
             )
 
     @property
     def tool(self) -> Tool:
         """Get the Tool instance for this toolkit"""
-        return Tool(function_declarations=self.schemas)
+        return Tool(function_declarations=self.schemas, registry=self.registry)
@@ -0,0 +1,183 @@
+"""
+Ranged file reading for the file toolkit.
+Files are memory-mapped so any byte range can be read without touching the
+rest of the file, and a line-offset index is cached per file (keyed on its
+mtime and size) so jumping to line N costs a single lookup.
+"""
+
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+BINARY_SNIFF_BYTES = 8192
+MAX_INDEXED_FILES = 32
+
+_MAGIC_NUMBERS = (
+    (b"\x89PNG\r\n\x1a\n", "PNG image"),
+    (b"\xff\xd8\xff", "JPEG image"),
+    (b"GIF8", "GIF image"),
+    (b"%PDF", "PDF document"),
+    (b"PK\x03\x04", "ZIP archive"),
+    (b"\x1f\x8b", "gzip archive"),
+    (b"\x7fELF", "ELF executable"),
+    (b"MZ", "Windows executable"),
+    (b"SQLite format 3\x00", "SQLite database"),
+)
+
+
+def is_binary(head: bytes) -> bool:
+    """Guess whether content is binary from its first bytes"""
+    if b"\x00" in head:
+        return True
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        return e.start < len(head) - 3
+    return False
+
+
+def describe_binary(path: Path, head: bytes, size: int) -> str:
+    """A short summary of a binary file instead of its decoded content"""
+    kind = next(
+        (name for magic, name in _MAGIC_NUMBERS if head.startswith(magic)),
+        "binary data",
+    )
+    preview = head[:32].hex(" ")
+    return f'Binary file "{path.name}": {kind}, {size} bytes. First bytes: {preview}'
+
+
+class _LineIndex:
+    """Start offset of every line of one version of a file"""
+
+    def __init__(self, data: mmap.mmap):
+        offsets = array("Q", [0])
+        position = data.find(b"\n")
+        while position != -1:
+            offsets.append(position + 1)
+            position = data.find(b"\n", position + 1)
+        if offsets[-1] == len(data) and len(offsets) > 1:
+            offsets.pop()  # No empty line after a trailing newline
+        self.offsets = offsets
+        self.size = len(data)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) if self.size else 0
+
+    def span(self, start_line: int, end_line: int) -> tuple[int, int]:
+        """Byte range covering 1-based lines ``start_line`` to ``end_line`` inclusive"""
+        start = self.offsets[start_line - 1]
+        end = self.offsets[end_line] if end_line < len(self.offsets) else self.size
+        return start, end
+
+
+class LineIndexCache:
+    """LRU cache of line indexes keyed on path, mtime and size"""
+
+    def __init__(self, max_files: int = MAX_INDEXED_FILES):
+        self.max_files = max_files
+        self._indexes: OrderedDict[tuple, _LineIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, stat: os.stat_result, data: mmap.mmap) -> _LineIndex:
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = _LineIndex(data)
+        with self._lock:
+            # Older versions of the same file are useless now
+            for stale in [k for k in self._indexes if k[0] == key[0]]:
+                del self._indexes[stale]
+            self._indexes[key] = index
+            while len(self._indexes) > self.max_files:
+                self._indexes.popitem(last=False)
+        return index
+
+
+line_indexes = LineIndexCache()
+
+
+def decode_range(data: bytes) -> str:
+    """Decode a byte range of UTF-8 text, skipping a partial character at its start"""
+    start = 0
+    while start < min(len(data), 3) and data[start] & 0xC0 == 0x80:
+        start += 1
+    return data[start:].decode("utf-8", errors="replace")
+
+
+def character_end(data, start: int, end: int) -> int:
+    """Move ``end`` to a UTF-8 character boundary so no character is split
+
+    It moves back to the start of a character cut in half, or past its end
+    when that character starts at ``start``, so a range always makes progress.
+    """
+    boundary = end
+    while start < boundary < len(data) and data[boundary] & 0xC0 == 0x80:
+        boundary -= 1
+    if boundary > start:
+        return boundary
+    while end < len(data) and data[end] & 0xC0 == 0x80:
+        end += 1
+    return end
+
+
+def read_range(
+    path: Path,
+    max_bytes: int,
+    offset: int = 0,
+    length: int | None = None,
+    start_line: int | None = None,
+    end_line: int | None = None,
+) -> str:
+    """Read a byte or line range of a file, returning text or a binary summary"""
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            head = data[:BINARY_SNIFF_BYTES]
+            if is_binary(head):
+                return describe_binary(path, head, stat.st_size)
+
+            if start_line is not None or end_line is not None:
+                index = line_indexes.get(path, stat, data)
+                total = index.line_count
+                first = max(start_line or 1, 1)
+                last = min(end_line or total, total)
+                if first > total or first > last:
+                    return f"[File has {total} lines, requested lines {first}-{end_line or total}]"
+                start, end = index.span(first, last)
+                cut = character_end(data, start, min(end, start + max_bytes))
+                text = decode_range(data[start:cut])
+                if cut < end:
+                    shown = first + text.count("\n") - 1
+                    # Without one whole line shown, continue inside the line
+                    continuation = (
+                        f"start_line={shown + 1}" if shown >= first else f"offset={cut}"
+                    )
+                    return (
+                        text
+                        + f"\n[...Lines {first}-{last} of {total} truncated at {max_bytes} bytes, "
+                        + f"continue with {continuation}]"
+                    )
+                if last < total or first > 1:
+                    return text + f"\n[Lines {first}-{last} of {total}]"
+                return text
+
+            offset = min(max(offset, 0), stat.st_size)
+            length = max_bytes if length is None else min(max(length, 0), max_bytes)
+            end = character_end(data, offset, min(offset + length, stat.st_size))
+            text = decode_range(data[offset:end])
+            if end < stat.st_size:
+                text += (
+                    f'[...File "{path.name}" truncated at {end} of {stat.st_size} bytes, '
+                    f"continue with offset={end}]"
+                )
+            return text
@@ -0,0 +1,238 @@
+"""
+Repository sessions for the git toolkit.
+A GitRepository is created once per working directory and remembers that the
+directory is a repository, so each tool call forks git only once. Object
+reads go through a long-lived ``git cat-file --batch`` process.
+"""
+
+import atexit
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from ..Config import MAX_OUTPUT_BYTES
+from . import subprocess_executor
+
+MAX_STATUS_BYTES = 16 * 1024 * 1024
+
+
+class GitError(Exception):
+    """Raised when a streamed git command fails"""
+
+
+class GitRepository:
+    """A git repository session bound to one working directory"""
+
+    _sessions: dict[str, "GitRepository"] = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, working_directory: str):
+        self.working_directory = str(working_directory)
+        self.git_dir: Optional[Path] = None
+        self.top_level: Optional[Path] = None
+        self._cat_file: Optional[subprocess.Popen] = None
+        self._cat_file_lock = threading.Lock()
+
+    @classmethod
+    def for_directory(cls, working_directory: str) -> "GitRepository":
+        """Get the shared session for a working directory"""
+        key = str(Path(working_directory).resolve())
+        with cls._sessions_lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                session = cls._sessions[key] = cls(key)
+            return session
+
+    @classmethod
+    def close_all(cls):
+        with cls._sessions_lock:
+            sessions = list(cls._sessions.values())
+            cls._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def check(self) -> Optional[str]:
+        """Verify this is a git repository, returning an error message if not
+
+        A positive answer is remembered for as long as the git directory
+        exists, negative answers are re-checked since a repository may be
+        created later.
+        """
+        if self.git_dir is not None and self.git_dir.exists():
+            return None
+        if not Path(self.working_directory).is_dir():
+            return f"Directory '{self.working_directory}' does not exist"
+
+        result = subprocess_executor.run(
+            ["git", "rev-parse", "--absolute-git-dir", "--show-toplevel"],
+            cwd=self.working_directory,
+            timeout=10,
+        )
+        if result.exit_code != 0:
+            self.git_dir = None
+            return "Not a git repository"
+        lines = result.stdout.text().splitlines()
+        self.git_dir = Path(lines[0])
+        self.top_level = Path(lines[1]) if len(lines) > 1 else None
+        return None
+
+    def run(
+        self,
+        args: List[str],
+        timeout: int = 30,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+    ) -> dict:
+        """Run a git command and return structured output
+
+        Only the head and tail of each output stream are kept beyond
+        ``max_output_bytes``, ``truncated_bytes`` says how much was dropped.
+        """
+        try:
+            error = self.check()
+            if error:
+                return {"error": error}
+
+            result = subprocess_executor.run(
+                ["git"] + args,
+                cwd=self.working_directory,
+                timeout=timeout,
+                max_output_bytes=max_output_bytes,
+            )
+            if result.timed_out:
+                return {"error": "Git command timed out"}
+
+            return {
+                "exit_code": result.exit_code,
+                "stdout": result.stdout.text().strip(),
+                "stderr": result.stderr.text().strip(),
+                "success": result.exit_code == 0,
+                "truncated_bytes": result.stdout.truncated_bytes
+                + result.stderr.truncated_bytes,
+            }
+        except Exception as e:
+            return {"error": f"Failed to run git command: {str(e)}"}
+
+    def iter_lines(self, args: List[str], timeout: int = 30) -> Iterator[str]:
+        """Run a git command and yield its output line by line as it is produced
+
+        The process is killed if the caller stops iterating early or the
+        timeout expires, so only what is consumed is ever read.
+        """
+        error = self.check()
+        if error:
+            raise GitError(error)
+
+        # stderr goes to a file so a chatty command can't block on a full pipe
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                ["git"] + args,
+                cwd=self.working_directory,
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                errors="replace",
+            )
+            timer = threading.Timer(timeout, process.kill)
+            timer.start()
+            try:
+                for line in process.stdout:
+                    yield line.rstrip("\n")
+                returncode = process.wait()
+                if not timer.is_alive():
+                    raise GitError("Git command timed out")
+                if returncode != 0:
+                    stderr.seek(0)
+                    message = stderr.read().decode(errors="replace").strip()
+                    raise GitError(message or f"git exited with code {returncode}")
+            finally:
+                timer.cancel()
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+
+    def status(self) -> dict:
+        """Branch, upstream, ahead/behind and file states from a single git call"""
+        # Parsed rather than shown, so the output must not be cut
+        result = self.run(
+            ["status", "--porcelain=v2", "--branch"],
+            max_output_bytes=MAX_STATUS_BYTES,
+        )
+        if "error" in result or not result["success"]:
+            return result
+
+        status_info = {
+            "branch": "unknown",
+            "upstream": None,
+            "ahead": 0,
+            "behind": 0,
+            "staged": [],
+            "modified": [],
+            "untracked": [],
+            "deleted": [],
+        }
+        for line in result["stdout"].split("\n") if result["stdout"] else []:
+            if line.startswith("# branch.head "):
+                status_info["branch"] = line[len("# branch.head ") :]
+            elif line.startswith("# branch.upstream "):
+                status_info["upstream"] = line[len("# branch.upstream ") :]
+            elif line.startswith("# branch.ab "):
+                ahead, behind = line[len("# branch.ab ") :].split()
+                status_info["ahead"] = int(ahead.lstrip("+"))
+                status_info["behind"] = int(behind.lstrip("-"))
+            elif line.startswith("? "):
+                status_info["untracked"].append(line[2:])
+            elif line[:2] in ("1 ", "2 ", "u "):
+                # Ordinary, renamed and unmerged entries have 9, 10 and 11 fields
+                fields = line.split(" ", {"1": 8, "2": 9, "u": 10}[line[0]])
+                state = fields[1]
+                filename = fields[-1].split("\t")[0]
+                if state[0] not in ".?":
+                    status_info["staged"].append(filename)
+                if state[1] == "M":
+                    status_info["modified"].append(filename)
+                elif state[1] == "D":
+                    status_info["deleted"].append(filename)
+        return {**result, "status": status_info}
+
+    def _cat_file_process(self) -> subprocess.Popen:
+        if self._cat_file is None or self._cat_file.poll() is not None:
+            self._cat_file = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.working_directory,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._cat_file
+
+    def read_object(self, name: str) -> Optional[tuple[str, bytes]]:
+        """Read an object (e.g. ``HEAD:path/to/file``) as ``(type, content)``
+
+        Returns None if the object does not exist.
+        """
+        if self.check() or "\n" in name:
+            return None
+        with self._cat_file_lock:
+            process = self._cat_file_process()
+            process.stdin.write(name.encode() + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().decode().split()
+            if len(header) != 3:
+                return None
+            _, object_type, size = header
+            content = process.stdout.read(int(size))
+            process.stdout.read(1)  # Trailing newline after the object
+            return object_type, content
+
+    def close(self):
+        with self._cat_file_lock:
+            if self._cat_file is not None and self._cat_file.poll() is None:
+                self._cat_file.stdin.close()
+                self._cat_file.wait(timeout=5)
+            self._cat_file = None
+
+
+atexit.register(GitRepository.close_all)
@@ -1,52 +1,38 @@
-import subprocess
+from datetime import datetime, timezone
 from pathlib import Path
+from string import hexdigits
 from typing import Optional, List
 import json
-from ..tool_kit_registry import ToolKitRegistery
+from ..tool_cache import (
+    FILES,
+    GIT,
+    CachePolicy,
+    Invalidation,
+    combine_fingerprints,
+    file_fingerprint,
+    git_fingerprint,
+)
+from ..Config import MAX_BYTES
 from ..types_llm import FunctionDeclaration, Tool
 from .base_toolkit import ToolKit
+from .file_reader import (
+    BINARY_SNIFF_BYTES,
+    character_end,
+    decode_range,
+    describe_binary,
+    is_binary,
+)
+from .git_session import GitError, GitRepository
 
 
 def _run_git_command(working_directory: str, args: List[str]) -> dict:
-    """Run a git command and return structured output"""
-    try:
-        if not Path(working_directory).is_dir():
-            return {"error": f"Directory '{working_directory}' does not exist"}
-
-        git_check = subprocess.run(
-            ["git", "rev-parse", "--git-dir"],
-            cwd=working_directory,
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-
-        if git_check.returncode != 0:
-            return {"error": "Not a git repository"}
-
-        result = subprocess.run(
-            ["git"] + args,
-            cwd=working_directory,
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-
-        return {
-            "exit_code": result.returncode,
-            "stdout": result.stdout.strip(),
-            "stderr": result.stderr.strip(),
-            "success": result.returncode == 0,
-        }
-    except subprocess.TimeoutExpired:
-        return {"error": "Git command timed out"}
-    except Exception as e:
-        return {"error": f"Failed to run git command: {str(e)}"}
+    """Run a git command through the working directory's repository session"""
+    return GitRepository.for_directory(working_directory).run(args)
 
 
 def git_status(working_directory: str) -> str:
     """Get git status with file details"""
-    result = _run_git_command(working_directory, ["status", "--porcelain", "-b"])
+    result = GitRepository.for_directory(working_directory).status()
 
     if "error" in result:
         return f"Error: {result['error']}"
@@ -54,87 +40,75 @@ def git_status(working_directory: str) -> str:
     if not result["success"]:
         return f"Git status failed: {result['stderr']}"
 
-    lines = result["stdout"].split("\n") if result["stdout"] else []
-    status_info = {
-        "branch": "unknown",
-        "ahead": 0,
-        "behind": 0,
-        "staged": [],
-        "modified": [],
-        "untracked": [],
-        "deleted": [],
-    }
-
-    for line in lines:
-        if not line:
-            continue
+    return json.dumps(result["status"], indent=2)
 
-        if line.startswith("##"):
-            # Branch info line
-            branch_info = line[3:]
-            if "..." in branch_info:
-                local, remote_info = branch_info.split("...")
-                status_info["branch"] = local.strip()
-                if "[ahead" in remote_info:
-                    # Parse ahead/behind info
-                    if "ahead" in remote_info:
-                        ahead_part = (
-                            remote_info.split("ahead ")[1].split("]")[0].split(",")[0]
-                        )
-                        status_info["ahead"] = int(ahead_part)
-                    if "behind" in remote_info:
-                        behind_part = remote_info.split("behind ")[1].split("]")[0]
-                        status_info["behind"] = int(behind_part)
-            else:
-                status_info["branch"] = branch_info.strip()
-        else:
-            # File status line
-            status_code = line[:2]
-            filename = line[3:]
 
-            if status_code[0] in "AM":
-                status_info["staged"].append(filename)
-            if status_code[1] == "M":
-                status_info["modified"].append(filename)
-            elif status_code[1] == "D":
-                status_info["deleted"].append(filename)
-            elif status_code == "??":
-                status_info["untracked"].append(filename)
-
-    return json.dumps(status_info, indent=2)
+_LOG_FIELDS = ("hash", "author", "email", "date", "message")
+_LOG_FORMAT = "%x1f".join(("%H", "%an", "%ae", "%ad", "%s"))
 
 
 def git_log(
-    working_directory: str, limit: int = 10, branch: Optional[str] = None
+    working_directory: str,
+    limit: int = 10,
+    branch: Optional[str] = None,
+    offset: int = 0,
+    after: Optional[str] = None,
+    paths: Optional[List[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
 ) -> str:
-    """Get git commit history"""
-    args = ["log", f"-{limit}", "--pretty=format:%H|%an|%ae|%ad|%s", "--date=iso"]
+    """Get a page of git commit history
+
+    Pages are selected either by ``offset`` or by ``after``, the hash of the
+    last commit of the previous page (returned as ``next_cursor``).
+    """
+    repository = GitRepository.for_directory(working_directory)
+    error = repository.check()
+    if error:
+        return f"Error: {error}"
+
+    args = ["log", f"--pretty=format:{_LOG_FORMAT}", "--date=iso"]
+    if after is None:
+        # One extra commit tells whether there is another page
+        args.extend([f"--skip={max(offset, 0)}", f"--max-count={limit + 1}"])
+    if since:
+        args.append(f"--since={since}")
+    if until:
+        args.append(f"--until={until}")
     if branch:
         args.append(branch)
-
-    result = _run_git_command(working_directory, args)
-
-    if "error" in result:
-        return f"Error: {result['error']}"
-
-    if not result["success"]:
-        return f"Git log failed: {result['stderr']}"
+    args.append("--")
+    args.extend(paths or [])
 
     commits = []
-    for line in result["stdout"].split("\n") if result["stdout"] else []:
-        if "|" in line:
-            hash_val, author, email, date, message = line.split("|", 4)
-            commits.append(
-                {
-                    "hash": hash_val,
-                    "author": author,
-                    "email": email,
-                    "date": date,
-                    "message": message,
-                }
-            )
-
-    return json.dumps({"commits": commits, "total_shown": len(commits)}, indent=2)
+    has_more = False
+    found_cursor = after is None
+    try:
+        for line in repository.iter_lines(args):
+            values = line.split("\x1f", len(_LOG_FIELDS) - 1)
+            if len(values) != len(_LOG_FIELDS):
+                continue
+            if not found_cursor:
+                found_cursor = values[0].startswith(after)
+                continue
+            if len(commits) == limit:
+                has_more = True
+                break
+            commits.append(dict(zip(_LOG_FIELDS, values)))
+    except GitError as e:
+        return f"Git log failed: {e}"
+
+    if not found_cursor:
+        return f'Error: Commit "{after}" is not part of this history'
+
+    return json.dumps(
+        {
+            "commits": commits,
+            "total_shown": len(commits),
+            "next_cursor": commits[-1]["hash"] if has_more and commits else None,
+        },
+        separators=(",", ":"),
+    )
 
 
 def git_diff(
@@ -296,27 +270,113 @@ def git_pull(
         return f"Pull failed: {result['stderr']}"
 
 
+def _is_blame_header(fields: List[str]) -> bool:
+    """``<sha> <original line> <final line> [<lines in group>]``"""
+    return (
+        len(fields) >= 3
+        and len(fields[0]) == 40
+        and all(c in hexdigits for c in fields[0])
+        and fields[2].isdigit()
+    )
+
+
+def _parse_blame(lines, include_content: bool) -> dict:
+    """Group ``git blame --porcelain`` output into per-commit line ranges"""
+    commits = {}
+    ranges = []
+    current = None
+    for line in lines:
+        if line.startswith("\t"):
+            if include_content and ranges:
+                ranges[-1].setdefault("lines", []).append(line[1:])
+            continue
+        fields = line.split(" ")
+        if _is_blame_header(fields):
+            current = fields[0][:12]
+            final_line = int(fields[2])
+            last = ranges[-1] if ranges else None
+            if last and last["commit"] == current and last["end"] == final_line - 1:
+                last["end"] = final_line
+            else:
+                ranges.append(
+                    {"commit": current, "start": final_line, "end": final_line}
+                )
+            commits.setdefault(current, {})
+        elif current is not None and fields[0] in ("author", "author-time", "summary"):
+            commits[current].setdefault(fields[0], line[len(fields[0]) + 1 :])
+    for info in commits.values():
+        if "author-time" in info:
+            info["date"] = datetime.fromtimestamp(
+                int(info.pop("author-time")), tz=timezone.utc
+            ).strftime("%Y-%m-%d")
+    return {"commits": commits, "ranges": ranges}
+
+
 def git_blame(
-    working_directory: str, file_path: str, line_range: Optional[str] = None
+    working_directory: str,
+    file_path: str,
+    line_range: Optional[str] = None,
+    include_content: bool = False,
 ) -> str:
-    """Show git blame for a file"""
+    """Show who last modified each line of a file, grouped into ranges per commit"""
     if not file_path:
         return "Error: File path is required"
 
-    args = ["blame", "--line-porcelain"]
+    repository = GitRepository.for_directory(working_directory)
+    error = repository.check()
+    if error:
+        return f"Error: {error}"
+
+    args = ["blame", "--porcelain"]
     if line_range:
         args.extend(["-L", line_range])
-    args.append(file_path)
+    args.extend(["--", file_path])
 
-    result = _run_git_command(working_directory, args)
+    try:
+        blame = _parse_blame(repository.iter_lines(args), include_content)
+    except GitError as e:
+        return f"Git blame failed: {e}"
 
-    if "error" in result:
-        return f"Error: {result['error']}"
+    if not blame["ranges"]:
+        return "No blame information available"
+    return json.dumps({"file": file_path, **blame}, separators=(",", ":"))
 
-    if not result["success"]:
-        return f"Git blame failed: {result['stderr']}"
 
-    return result["stdout"] if result["stdout"] else "No blame information available"
+def git_show_file(
+    working_directory: str,
+    file_path: str,
+    revision: str = "HEAD",
+    offset: int = 0,
+    max_bytes: int = MAX_BYTES,
+) -> str:
+    """Show the content of a file as of a given revision, up to ``max_bytes`` from ``offset``"""
+    if not file_path:
+        return "Error: File path is required"
+
+    repository = GitRepository.for_directory(working_directory)
+    error = repository.check()
+    if error:
+        return f"Error: {error}"
+
+    # Object names are relative to the top level, "./" makes them relative to the cwd
+    obj = repository.read_object(f"{revision}:./{file_path}")
+    if obj is None:
+        return f'Error: "{file_path}" does not exist at revision "{revision}"'
+    object_type, content = obj
+    if object_type != "blob":
+        return f'Error: "{file_path}" is a {object_type}, not a file'
+    head = content[:BINARY_SNIFF_BYTES]
+    if is_binary(head):
+        return describe_binary(Path(file_path), head, len(content))
+    offset = min(max(offset, 0), len(content))
+    end = character_end(content, offset, min(offset + max_bytes, len(content)))
+    text = decode_range(content[offset:end])
+    if end < len(content):
+        text += (
+            f'[...File "{file_path}" at "{revision}" truncated at {end} of '
+            f"{len(content)} bytes, continue with offset={end}]"
+        )
+    return text
 
 
 # Schema definitions
@@ -328,7 +388,7 @@ schema_git_status = FunctionDeclaration(
 
 schema_git_log = FunctionDeclaration(
     name="git_log",
-    description="Show git commit history with author, date, and commit messages",
+    description="Show a page of git commit history with author, date, and commit messages. When more commits exist, next_cursor can be passed as 'after' to get the next page",
     parameters={
         "type": "object",
         "properties": {
@@ -340,6 +400,27 @@ schema_git_log = FunctionDeclaration(
                 "type": "string",
                 "description": "Specific branch to show history for (optional)",
             },
+            "offset": {
+                "type": "integer",
+                "description": "Number of commits to skip (optional)",
+            },
+            "after": {
+                "type": "string",
+                "description": "Show commits after this commit hash, the next_cursor of the previous page (optional)",
+            },
+            "paths": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Only show commits touching these paths (optional)",
+            },
+            "since": {
+                "type": "string",
+                "description": "Only show commits more recent than this date, e.g. '2024-01-31' or '2 weeks ago' (optional)",
+            },
+            "until": {
+                "type": "string",
+                "description": "Only show commits older than this date (optional)",
+            },
         },
     },
 )
@@ -474,7 +555,7 @@ schema_git_pull = FunctionDeclaration(
 
 schema_git_blame = FunctionDeclaration(
     name="git_blame",
-    description="Show who last modified each line of a file",
+    description="Show who last modified each line of a file, as line ranges grouped per commit",
     parameters={
         "type": "object",
         "properties": {
@@ -486,11 +567,55 @@ schema_git_blame = FunctionDeclaration(
                 "type": "string",
                 "description": "Line range to show (e.g., '10,20')",
             },
+            "include_content": {
+                "type": "boolean",
+                "description": "Include the text of each line (default: false)",
+            },
         },
         "required": ["file_path"],
     },
 )
 
+schema_git_show_file = FunctionDeclaration(
+    name="git_show_file",
+    description="Show the content of a file as it was at a given commit, branch or tag",
+    parameters={
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "Path to the file to show",
+            },
+            "revision": {
+                "type": "string",
+                "description": "Commit, branch or tag to read the file from (default: HEAD)",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Byte offset to start reading from, for continuing a truncated file (default: 0)",
+            },
+        },
+        "required": ["file_path"],
+    },
+)
+
+
+# git_status also depends on the working tree, so it only gets a short TTL
+cache_git_status = CachePolicy(group=GIT, ttl=5, fingerprint=git_fingerprint)
+cache_git_log = CachePolicy(group=GIT, ttl=300, fingerprint=git_fingerprint)
+cache_git_show_file = CachePolicy(
+    group=GIT, ttl=300, fingerprint=git_fingerprint, max_result_bytes=MAX_BYTES * 2
+)
+cache_git_blame = CachePolicy(
+    group=GIT,
+    ttl=300,
+    fingerprint=combine_fingerprints(git_fingerprint, file_fingerprint("file_path")),
+    path_argument="file_path",
+)
+invalidates_git_state = Invalidation(groups=frozenset({GIT}))
+# Switching branches or pulling rewrites the working tree as well
+invalidates_git_worktree = Invalidation(groups=frozenset({FILES, GIT}))
+
 
 class GitToolkit(ToolKit):
     """
@@ -508,6 +633,7 @@ class GitToolkit(ToolKit):
     GIT_PUSH = "git_push"
     GIT_PULL = "git_pull"
     GIT_BLAME = "git_blame"
+    GIT_SHOW_FILE = "git_show_file"
 
     def __init__(
         self,
@@ -536,44 +662,88 @@ class GitToolkit(ToolKit):
         self._register_functions()
 
     def _register_functions(self):
-        """Register enabled functions with the global registry"""
+        """Register enabled functions with the toolkit's registry"""
 
         if self.enable_read:
             self.schemas.append(schema_git_status)
-            ToolKitRegistery.register("git_status", git_status, schema_git_status)
+            self.registry.register(
+                "git_status",
+                git_status,
+                schema_git_status,
+                cache_policy=cache_git_status,
+            )
 
             self.schemas.append(schema_git_diff)
-            ToolKitRegistery.register("git_diff", git_diff, schema_git_diff)
+            self.registry.register("git_diff", git_diff, schema_git_diff)
 
         if self.enable_history:
             self.schemas.append(schema_git_log)
-            ToolKitRegistery.register("git_log", git_log, schema_git_log)
+            self.registry.register(
+                "git_log", git_log, schema_git_log, cache_policy=cache_git_log
+            )
 
             self.schemas.append(schema_git_blame)
-            ToolKitRegistery.register("git_blame", git_blame, schema_git_blame)
+            self.registry.register(
+                "git_blame",
+                git_blame,
+                schema_git_blame,
+                cache_policy=cache_git_blame,
+            )
+
+            self.schemas.append(schema_git_show_file)
+            self.registry.register(
+                "git_show_file",
+                git_show_file,
+                schema_git_show_file,
+                cache_policy=cache_git_show_file,
+            )
 
         if self.enable_write:
             self.schemas.append(schema_git_add)
-            ToolKitRegistery.register("git_add", git_add, schema_git_add)
+            self.registry.register(
+                "git_add", git_add, schema_git_add, invalidates=invalidates_git_state
+            )
 
             self.schemas.append(schema_git_commit)
-            ToolKitRegistery.register("git_commit", git_commit, schema_git_commit)
+            self.registry.register(
+                "git_commit",
+                git_commit,
+                schema_git_commit,
+                invalidates=invalidates_git_state,
+            )
 
         if self.enable_branch:
             self.schemas.append(schema_git_branch)
-            ToolKitRegistery.register("git_branch", git_branch, schema_git_branch)
+            self.registry.register(
+                "git_branch",
+                git_branch,
+                schema_git_branch,
+                invalidates=invalidates_git_worktree,
+            )
 
         if self.enable_remote:
             self.schemas.append(schema_git_remote)
-            ToolKitRegistery.register("git_remote", git_remote, schema_git_remote)
+            self.registry.register(
+                "git_remote",
+                git_remote,
+                schema_git_remote,
+                invalidates=invalidates_git_state,
+            )
 
             self.schemas.append(schema_git_push)
-            ToolKitRegistery.register("git_push", git_push, schema_git_push)
+            self.registry.register(
+                "git_push", git_push, schema_git_push, invalidates=invalidates_git_state
+            )
 
             self.schemas.append(schema_git_pull)
-            ToolKitRegistery.register("git_pull", git_pull, schema_git_pull)
+            self.registry.register(
+                "git_pull",
+                git_pull,
+                schema_git_pull,
+                invalidates=invalidates_git_worktree,
+            )
 
     @property
     def tool(self) -> Tool:
         """Get the Tool instance for this toolkit"""
-        return Tool(function_declarations=self.schemas)
+        return Tool(function_declarations=self.schemas, registry=self.registry)
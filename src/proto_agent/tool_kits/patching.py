@@ -0,0 +1,180 @@
+"""
+Text patching for the ``edit_file`` tool.
+Accepts either a unified diff or search/replace blocks::
+
+    <<<<<<< SEARCH
+    old lines
+    =======
+    new lines
+    >>>>>>> REPLACE
+
+Hunks are located by their content rather than trusted line numbers, so a
+diff written against a slightly stale view of the file still applies.
+"""
+
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_SEARCH_REPLACE = re.compile(
+    r"^<{5,} SEARCH[^\n]*\n(.*?)^={5,}[ \t]*\n(.*?)^>{5,} REPLACE[^\n]*$",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+class PatchError(Exception):
+    """Raised when a patch is malformed or does not match the file"""
+
+
+@dataclass
+class _Hunk:
+    old_start: int
+    old: List[str] = field(default_factory=list)
+    new: List[str] = field(default_factory=list)
+
+
+def is_search_replace(patch: str) -> bool:
+    return _SEARCH_REPLACE.search(patch) is not None
+
+
+def _parse_unified_diff(patch: str) -> List[_Hunk]:
+    hunks: List[_Hunk] = []
+    # Lines the current hunk still has to cover according to its header
+    old_left = new_left = 0
+    for line in patch.splitlines():
+        if line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        # Hunk lines start with " ", "-" or "+", so a header always starts a
+        # new hunk, even when the previous one was shorter than announced
+        header = _HUNK_HEADER.match(line)
+        if header:
+            hunks.append(_Hunk(old_start=int(header.group(1))))
+            old_left = int(header.group(2) or 1)
+            new_left = int(header.group(4) or 1)
+            continue
+        in_body = old_left > 0 or new_left > 0
+        if not hunks or (not in_body and line.startswith(("--- ", "+++ "))):
+            # File headers and anything before the first hunk. Inside a hunk
+            # they are removed "-- " or added "++ " lines
+            continue
+        hunk = hunks[-1]
+        tag, text = (line[0], line[1:]) if line else (" ", "")
+        if tag == " ":
+            hunk.old.append(text)
+            hunk.new.append(text)
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            hunk.old.append(text)
+            old_left -= 1
+        elif tag == "+":
+            hunk.new.append(text)
+            new_left -= 1
+        elif in_body:
+            raise PatchError(f"Unexpected line in hunk {len(hunks)}: {line!r}")
+        else:
+            # Between files of a multi-file diff ("diff --git", "index ...")
+            continue
+    if not hunks:
+        raise PatchError("No hunks found, expected a unified diff with @@ headers")
+    return hunks
+
+
+def _find(lines: List[str], block: List[str], expected: int, start: int) -> int:
+    """Position of ``block`` in ``lines`` at or after ``start``, closest to ``expected``"""
+    if not block:
+        return min(max(expected, start), len(lines))
+    if lines[expected : expected + len(block)] == block and expected >= start:
+        return expected
+    candidates = sorted(
+        range(start, len(lines) - len(block) + 1),
+        key=lambda position: abs(position - expected),
+    )
+    for normalize in (lambda s: s, str.rstrip):
+        wanted = [normalize(line) for line in block]
+        for position in candidates:
+            if [
+                normalize(line) for line in lines[position : position + len(block)]
+            ] == wanted:
+                return position
+    return -1
+
+
+def _split(text: str) -> tuple[List[str], str, bool]:
+    newline = "\r\n" if "\r\n" in text.split("\n", 1)[0] + "\n" else "\n"
+    lines = text.split(newline)
+    trailing_newline = text.endswith(newline)
+    if trailing_newline:
+        lines.pop()
+    return (lines if text else []), newline, trailing_newline
+
+
+def apply_unified_diff(text: str, patch: str) -> str:
+    """Apply the hunks of a unified diff to ``text``"""
+    lines, newline, trailing_newline = _split(text)
+    delta = 0
+    start = 0
+    for number, hunk in enumerate(_parse_unified_diff(patch), start=1):
+        expected = max(hunk.old_start - 1, 0) + delta
+        position = _find(lines, hunk.old, expected, start)
+        if position == -1:
+            first = next((line for line in hunk.old if line.strip()), "")
+            raise PatchError(
+                f"Hunk {number} does not match the file (starting near line "
+                f"{hunk.old_start}: {first.strip()!r})"
+            )
+        lines[position : position + len(hunk.old)] = hunk.new
+        delta += len(hunk.new) - len(hunk.old)
+        start = position + len(hunk.new)
+    if not lines:
+        return ""
+    return newline.join(lines) + (newline if trailing_newline or not text else "")
+
+
+def apply_search_replace(text: str, patch: str) -> str:
+    """Apply search/replace blocks to ``text``, each search must match exactly once"""
+    newline = "\r\n" if "\r\n" in text else "\n"
+    blocks = _SEARCH_REPLACE.findall(patch)
+    if not blocks:
+        raise PatchError("No SEARCH/REPLACE blocks found")
+    for number, (search, replace) in enumerate(blocks, start=1):
+        search = search.replace("\r\n", "\n").replace("\n", newline)
+        replace = replace.replace("\r\n", "\n").replace("\n", newline)
+        if not search:
+            # An empty search block appends to the file
+            text += replace
+            continue
+        count = text.count(search)
+        if count == 0:
+            raise PatchError(f"Search block {number} was not found in the file")
+        if count > 1:
+            raise PatchError(
+                f"Search block {number} matches {count} times, "
+                "include more surrounding lines to make it unique"
+            )
+        text = text.replace(search, replace, 1)
+    return text
+
+
+def apply_patch(text: str, patch: str) -> str:
+    """Apply a unified diff or search/replace blocks to ``text``"""
+    if is_search_replace(patch):
+        return apply_search_replace(text, patch)
+    return apply_unified_diff(text, patch)
+
+
+def changed_hunks(old: str, new: str, file_path: str, context: int = 2) -> str:
+    """A compact unified diff of what changed, for reporting back to the model"""
+    diff = difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile=f"a/{file_path}",
+        tofile=f"b/{file_path}",
+        n=context,
+    )
+    return "".join(
+        line if line.endswith("\n") else line + "\n\\ No newline at end of file\n"
+        for line in diff
+    )
@@ -0,0 +1,181 @@
+"""
+Path filtering helpers for the file toolkit.
+Implements the commonly used subset of .gitignore semantics: comments,
+negation, directory-only and anchored patterns, and ``*``, ``?``, ``[...]``
+and ``**`` wildcards, and the directory walk that applies them.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from fnmatch import fnmatch
+from typing import Iterator, List, Optional
+
+ALWAYS_IGNORED = {".git"}
+
+
+@dataclass(frozen=True)
+class _Rule:
+    # Directory of the .gitignore file relative to the root, "" for the root itself
+    base: str
+    regex: re.Pattern
+    negate: bool
+    directory_only: bool
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression"""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1 : end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def _parse_rule(line: str, base: str) -> Optional[_Rule]:
+    line = line.rstrip("\n")
+    if not line.strip() or line.startswith("#"):
+        return None
+    line = line.rstrip(" ") if not line.endswith("\\ ") else line
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    directory_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    prefix = "" if anchored else "(?:.*/)?"
+    return _Rule(
+        base=base,
+        regex=re.compile(f"^{prefix}{_translate(line)}$"),
+        negate=negate,
+        directory_only=directory_only,
+    )
+
+
+class GitIgnore:
+    """Accumulates .gitignore rules while a directory tree is walked"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._rules: List[_Rule] = []
+        self._loaded: set[str] = set()
+        exclude = root / ".git" / "info" / "exclude"
+        if exclude.is_file():
+            self._add_file(exclude, "")
+
+    def _add_file(self, path: Path, base: str):
+        try:
+            lines = path.read_text(errors="replace").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            rule = _parse_rule(line, base)
+            if rule is not None:
+                self._rules.append(rule)
+
+    def load_directory(self, relative_directory: str):
+        """Read the .gitignore of a directory (relative to the root) once"""
+        if relative_directory in self._loaded:
+            return
+        self._loaded.add(relative_directory)
+        gitignore = self.root / relative_directory / ".gitignore"
+        if gitignore.is_file():
+            self._add_file(gitignore, relative_directory)
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """Whether a path relative to the root is ignored, last matching rule wins"""
+        if relative_path.rsplit("/", 1)[-1] in ALWAYS_IGNORED:
+            return True
+        ignored = False
+        for rule in self._rules:
+            if rule.directory_only and not is_dir:
+                continue
+            if rule.base:
+                if not relative_path.startswith(rule.base + "/"):
+                    continue
+                candidate = relative_path[len(rule.base) + 1 :]
+            else:
+                candidate = relative_path
+            if rule.regex.match(candidate):
+                ignored = not rule.negate
+        return ignored
+
+
+def walk_entries(
+    root: Path,
+    directory: Path,
+    recursive: bool,
+    max_depth: int,
+    pattern: str | None,
+    gitignore: GitIgnore | None,
+    depth: int = 0,
+) -> Iterator[tuple[str, os.DirEntry]]:
+    """Depth-first walk yielding ``(relative path, entry)`` pairs in sorted order
+
+    Relies on the entry types cached by ``os.scandir`` and never follows
+    symlinked directories, so it cannot leave the listed tree.
+    """
+    relative_directory = directory.relative_to(root).as_posix()
+    relative_directory = "" if relative_directory == "." else relative_directory
+    if gitignore is not None:
+        gitignore.load_directory(relative_directory)
+    with os.scandir(directory) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        relative_path = (
+            f"{relative_directory}/{entry.name}" if relative_directory else entry.name
+        )
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if gitignore is not None and gitignore.is_ignored(relative_path, is_dir):
+            continue
+        if not pattern or (
+            not is_dir
+            and (fnmatch(entry.name, pattern) or fnmatch(relative_path, pattern))
+        ):
+            yield relative_path, entry
+        if is_dir and recursive and depth + 1 < max_depth:
+            yield from walk_entries(
+                root,
+                Path(entry.path),
+                recursive,
+                max_depth,
+                pattern,
+                gitignore,
+                depth + 1,
+            )
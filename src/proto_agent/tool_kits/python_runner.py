@@ -0,0 +1,219 @@
+"""
+Warm interpreter pool for ``run_python_file``.
+Each working directory keeps worker interpreters started ahead of time
+(see ``_python_worker.py``) with the third-party and standard library
+modules its scripts import already loaded, so a run only pays for the script
+itself. Workers are single-use: every run gets a fresh process with a clean
+module state, CPU and memory rlimits, and bounded output through the shared
+subprocess executor. Idle workers are stopped after ``IDLE_TIMEOUT`` seconds
+without runs, and only the ``MAX_RUNNERS`` most recently used directories
+keep runners, so a long-lived process serving many directories does not
+collect idle interpreters.
+"""
+
+import ast
+import atexit
+import json
+import subprocess
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from ..Config import MAX_OUTPUT_BYTES
+from .subprocess_executor import ProcessResult, collect
+
+WORKER_SCRIPT = Path(__file__).with_name("_python_worker.py")
+MAX_PRELOADED_MODULES = 64
+MAX_RUNNERS = 8
+IDLE_TIMEOUT = 300.0
+
+
+def script_imports(path: Path) -> set[str]:
+    """Top-level names of the absolute imports of a script"""
+    try:
+        tree = ast.parse(path.read_bytes(), filename=str(path))
+    except (OSError, SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    names.discard("__future__")
+    return names
+
+
+class PythonRunner:
+    """Pool of warm, single-use worker interpreters for one working directory"""
+
+    _runners: OrderedDict[tuple[str, str], "PythonRunner"] = OrderedDict()
+    _runners_lock = threading.Lock()
+
+    def __init__(
+        self,
+        working_directory: str,
+        interpreter: str = "python",
+        warm_workers: int = 1,
+        idle_timeout: float = IDLE_TIMEOUT,
+    ):
+        """
+        Args:
+            working_directory: Directory scripts run in
+            interpreter: Python executable used for the workers
+            warm_workers: Number of idle workers kept ready
+            idle_timeout: Seconds without runs after which idle workers are stopped
+        """
+        self.working_directory = str(working_directory)
+        self.interpreter = interpreter
+        self.warm_workers = warm_workers
+        self.idle_timeout = idle_timeout
+        self.preload: set[str] = set()
+        self._idle: List[subprocess.Popen] = []
+        self._expiry: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_directory(
+        cls, working_directory: str, interpreter: str = "python"
+    ) -> "PythonRunner":
+        """Get the shared runner for a working directory, closing the least recently used one past ``MAX_RUNNERS``"""
+        key = (str(Path(working_directory).resolve()), interpreter)
+        evicted = []
+        with cls._runners_lock:
+            runner = cls._runners.get(key)
+            if runner is None:
+                runner = cls._runners[key] = cls(key[0], interpreter)
+            cls._runners.move_to_end(key)
+            while len(cls._runners) > MAX_RUNNERS:
+                evicted.append(cls._runners.popitem(last=False)[1])
+        for stale in evicted:
+            stale.close()
+        return runner
+
+    @classmethod
+    def close_all(cls):
+        with cls._runners_lock:
+            runners = list(cls._runners.values())
+            cls._runners.clear()
+        for runner in runners:
+            runner.close()
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            [
+                self.interpreter,
+                "-u",
+                str(WORKER_SCRIPT),
+                json.dumps(sorted(self.preload)),
+            ],
+            cwd=self.working_directory,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def _take(self) -> subprocess.Popen:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop(0)
+                if worker.poll() is None:
+                    return worker
+                self._discard(worker)
+        return self._spawn()
+
+    def _replenish(self):
+        with self._lock:
+            while len(self._idle) < self.warm_workers:
+                self._idle.append(self._spawn())
+            # Restart the idle countdown
+            if self._expiry is not None:
+                self._expiry.cancel()
+            self._expiry = threading.Timer(self.idle_timeout, self.close)
+            self._expiry.daemon = True
+            self._expiry.start()
+
+    def warm_up(self):
+        """Start the idle workers now instead of on the first run"""
+        self._replenish()
+
+    def learn_imports(self, path: Path):
+        """Preload the non-local modules a script imports in future workers"""
+        local = Path(self.working_directory)
+        for name in script_imports(path):
+            if len(self.preload) >= MAX_PRELOADED_MODULES:
+                break
+            # Local modules change between runs, so they are never preloaded
+            if any(
+                (directory / f"{name}.py").exists() or (directory / name).is_dir()
+                for directory in (local, path.parent)
+            ):
+                continue
+            self.preload.add(name)
+
+    @staticmethod
+    def _discard(worker: subprocess.Popen):
+        if worker.poll() is None:
+            worker.kill()
+        worker.wait()
+        for stream in (worker.stdin, worker.stdout, worker.stderr):
+            if stream is not None:
+                stream.close()
+
+    def run(
+        self,
+        path: Path,
+        args: Optional[List[str]] = None,
+        timeout: float = 30,
+        cpu_seconds: Optional[int] = None,
+        memory_bytes: Optional[int] = None,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+        cancel: Optional[threading.Event] = None,
+        on_output: Optional[Callable[[str, bytes], None]] = None,
+    ) -> ProcessResult:
+        """Run a script in a warm worker
+
+        Args:
+            path: Absolute path of the script
+            args: Command-line arguments for the script
+            timeout: Wall-clock seconds before the worker is killed
+            cpu_seconds: RLIMIT_CPU for the run
+            memory_bytes: RLIMIT_AS for the run
+            max_output_bytes: Bytes kept per output stream, split between head and tail
+            cancel: Kills the run early once this event is set
+            on_output: Called with ``(stream name, chunk)`` as output arrives
+        """
+        worker = self._take()
+        self._replenish()
+        job = {
+            "path": str(path),
+            "args": list(args or []),
+            "cpu_seconds": cpu_seconds,
+            "memory_bytes": memory_bytes,
+        }
+        try:
+            return collect(
+                worker,
+                timeout=timeout,
+                max_output_bytes=max_output_bytes,
+                input=json.dumps(job).encode() + b"\n",
+                cancel=cancel,
+                on_output=on_output,
+            )
+        finally:
+            self._discard(worker)
+            self.learn_imports(path)
+
+    def close(self):
+        """Stop the idle workers, the next run starts new ones"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            if self._expiry is not None:
+                self._expiry.cancel()
+                self._expiry = None
+        for worker in idle:
+            self._discard(worker)
+
+
+atexit.register(PythonRunner.close_all)
@@ -0,0 +1,361 @@
+"""
+Persistent trigram index backing the ``search_files`` tool.
+Each working directory gets a SQLite database under the user cache directory
+mapping every three-byte sequence (lowercased) to the files containing it.
+A search only opens the files containing all trigrams of the literal parts of
+the query. The index is refreshed from file mtimes and sizes, so only files
+that changed since the last search are read again.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from platformdirs import user_cache_dir
+
+from .file_reader import BINARY_SNIFF_BYTES, is_binary
+from .path_filters import GitIgnore, walk_entries
+
+try:
+    import re._parser as _regex_parser
+    from re._constants import LITERAL
+except ImportError:  # Python 3.10
+    import sre_parse as _regex_parser
+    from sre_constants import LITERAL
+
+SCHEMA_VERSION = 1
+MAX_INDEXED_FILE_BYTES = 1_000_000  # Larger files are scanned on every search
+MAX_WALK_DEPTH = 64
+
+# File kinds stored in the index
+TEXT = "text"
+LARGE = "large"
+BINARY = "binary"
+
+
+def _trigrams(data: bytes) -> set[int]:
+    data = data.lower()
+    # Deduplicating the byte triples first keeps the per-trigram work small
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def _query_trigrams(literals: List[str], case_sensitive: bool) -> set[int]:
+    trigrams: set[int] = set()
+    for literal in literals:
+        data = literal.encode()
+        if not case_sensitive and not data.isascii():
+            # bytes.lower only folds ASCII, other letters could differ in case
+            continue
+        trigrams |= _trigrams(data)
+    return trigrams
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Literal runs every match of a regular expression must contain
+
+    Only top-level literals are considered; anything else (classes,
+    repetitions, groups, alternations) ends a run. An empty list means the
+    pattern can't narrow down candidate files.
+    """
+    try:
+        parsed = _regex_parser.parse(pattern)
+    except Exception:
+        return []
+    literals, run = [], ""
+    for op, argument in parsed:
+        if op is LITERAL:
+            run += chr(argument)
+            continue
+        literals.append(run)
+        run = ""
+    literals.append(run)
+    return [literal for literal in literals if len(literal.encode()) >= 3]
+
+
+class SearchIndex:
+    """Trigram index of the text files below one working directory"""
+
+    _indexes: dict[str, "SearchIndex"] = {}
+    _indexes_lock = threading.Lock()
+
+    # Overrides the user cache directory, mostly for tests
+    cache_dir: Optional[Path] = None
+
+    def __init__(self, root: Path, db_path: str, refresh_interval: float = 2.0):
+        """
+        Args:
+            root: Directory being indexed
+            db_path: SQLite database file, or ``:memory:``
+            refresh_interval: Seconds during which a search trusts the last walk
+                of the tree and only re-reads files reported as changed
+        """
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._pending: set[str] = set()
+        try:
+            self._db = self._open(db_path)
+        except sqlite3.Error:
+            # An unwritable or corrupt cache only costs us persistence
+            self._db = self._open(":memory:")
+        # path -> (file id, mtime_ns, size, kind), a copy of the files table
+        self._files: dict[str, tuple[int, int, int, str]] = {}
+        self._data_version = None
+        self._sync_files()
+
+    @classmethod
+    def for_directory(cls, working_directory: str) -> "SearchIndex":
+        """Get the shared index for a working directory"""
+        root = Path(working_directory).resolve()
+        key = str(root)
+        with cls._indexes_lock:
+            index = cls._indexes.get(key)
+            if index is None:
+                cache_dir = cls.cache_dir or Path(user_cache_dir("proto-agent"))
+                db_path = (
+                    cache_dir
+                    / "search"
+                    / (hashlib.sha1(key.encode()).hexdigest() + ".sqlite3")
+                )
+                try:
+                    db_path.parent.mkdir(parents=True, exist_ok=True)
+                except OSError:
+                    db_path = Path(":memory:")
+                index = cls._indexes[key] = cls(root, str(db_path))
+            return index
+
+    @classmethod
+    def notify_changed(cls, working_directory: str, file_path: Optional[str] = None):
+        """Tell an existing index that a file, or anything when no path is given, changed"""
+        with cls._indexes_lock:
+            index = cls._indexes.get(str(Path(working_directory).resolve()))
+        if index is not None:
+            index.mark_stale(file_path)
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(db_path, check_same_thread=False)
+        if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            db.executescript(
+                """
+                DROP TABLE IF EXISTS postings;
+                DROP TABLE IF EXISTS files;
+                CREATE TABLE files (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    -- Sorted trigrams of the file, so its postings can be
+                    -- deleted without a second index on postings
+                    trigrams BLOB
+                );
+                CREATE TABLE postings (
+                    trigram INTEGER NOT NULL,
+                    file_id INTEGER NOT NULL,
+                    PRIMARY KEY (trigram, file_id)
+                ) WITHOUT ROWID;
+                """
+            )
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.commit()
+        if db_path != ":memory:":
+            db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        return db
+
+    def _sync_files(self):
+        """Reload ``_files`` if another connection wrote to the database since"""
+        data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        self._files = {
+            path: (file_id, mtime_ns, size, kind)
+            for file_id, path, mtime_ns, size, kind in self._db.execute(
+                "SELECT id, path, mtime_ns, size, kind FROM files"
+            )
+        }
+
+    def mark_stale(self, file_path: Optional[str] = None):
+        with self._lock:
+            if file_path is None:
+                self._last_refresh = 0.0
+                return
+            path = (self.root / file_path).resolve()
+            if self.root in path.parents:
+                self._pending.add(path.relative_to(self.root).as_posix())
+
+    def _walk(self) -> Iterator[tuple[str, int, int]]:
+        entries = walk_entries(
+            self.root, self.root, True, MAX_WALK_DEPTH, None, GitIgnore(self.root)
+        )
+        for relative_path, entry in entries:
+            # Symlinks are skipped so nothing outside the tree gets indexed
+            if entry.is_symlink() or not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            yield relative_path, stat.st_mtime_ns, stat.st_size
+
+    def _stat(self, relative_path: str) -> Optional[tuple[str, int, int]]:
+        path = self.root / relative_path
+        try:
+            if path.is_symlink() or not path.is_file():
+                return None
+            stat = path.stat()
+        except OSError:
+            return None
+        return relative_path, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> int:
+        """Bring the index up to date, returning how many files were (re)indexed"""
+        with self._lock:
+            self._sync_files()
+            now = time.monotonic()
+            if now - self._last_refresh >= self.refresh_interval:
+                current = list(self._walk())
+                removed = set(self._files) - {path for path, _, _ in current}
+                self._last_refresh = now
+            else:
+                current = [
+                    stat for stat in map(self._stat, self._pending) if stat is not None
+                ]
+                removed = {path for path in self._pending if path in self._files} - {
+                    path for path, _, _ in current
+                }
+            self._pending.clear()
+
+            changed = [
+                (path, mtime_ns, size)
+                for path, mtime_ns, size in current
+                if self._files.get(path, (None, None, None, None))[1:3]
+                != (mtime_ns, size)
+            ]
+            if not changed and not removed:
+                return 0
+            with self._db:
+                for path in removed:
+                    self._remove(path)
+                for path, mtime_ns, size in changed:
+                    self._index_file(path, mtime_ns, size)
+            return len(changed)
+
+    def _remove(self, path: str):
+        self._files.pop(path, None)
+        # The database may be shared, the row is looked up in this transaction
+        row = self._db.execute(
+            "SELECT id, trigrams FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return
+        file_id, trigrams = row
+        if trigrams:
+            self._db.executemany(
+                "DELETE FROM postings WHERE trigram = ? AND file_id = ?",
+                ((trigram, file_id) for trigram in array("I", trigrams)),
+            )
+        self._db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _index_file(self, path: str, mtime_ns: int, size: int):
+        self._remove(path)
+        try:
+            with open(self.root / path, "rb") as f:
+                data = f.read(MAX_INDEXED_FILE_BYTES + 1)
+        except OSError:
+            return
+        if is_binary(data[:BINARY_SNIFF_BYTES]):
+            kind = BINARY
+        elif len(data) > MAX_INDEXED_FILE_BYTES:
+            kind = LARGE
+        else:
+            kind = TEXT
+        trigrams = array("I", sorted(_trigrams(data))) if kind == TEXT else None
+        file_id = self._db.execute(
+            "INSERT INTO files (path, mtime_ns, size, kind, trigrams) VALUES (?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, kind, trigrams.tobytes() if trigrams else None),
+        ).lastrowid
+        if trigrams:
+            # Sorted keys turn B-tree inserts into mostly sequential writes
+            self._db.executemany(
+                "INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+                ((trigram, file_id) for trigram in trigrams),
+            )
+        self._files[path] = (file_id, mtime_ns, size, kind)
+
+    def candidates(self, trigrams: set[int]) -> List[str]:
+        """Sorted paths of the files that may contain all the given trigrams"""
+        with self._lock:
+            self._sync_files()
+            if not trigrams:
+                return sorted(
+                    path for path, info in self._files.items() if info[3] != BINARY
+                )
+            placeholders = ",".join("?" * len(trigrams))
+            rows = self._db.execute(
+                f"""
+                SELECT files.path FROM postings JOIN files ON files.id = postings.file_id
+                WHERE postings.trigram IN ({placeholders})
+                GROUP BY postings.file_id HAVING COUNT(*) = ?
+                """,
+                (*trigrams, len(trigrams)),
+            ).fetchall()
+            large = [path for path, info in self._files.items() if info[3] == LARGE]
+        return sorted({row[0] for row in rows} | set(large))
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        directory: str = "",
+        glob: Optional[str] = None,
+        max_results: int = 100,
+    ) -> tuple[List[tuple[str, int, str]], bool]:
+        """Find matching lines as ``(path, line number, line)``
+
+        Returns the matches and whether more were left out.
+        """
+        flags = 0 if case_sensitive else re.IGNORECASE
+        compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+        literals = required_literals(pattern) if regex else [pattern]
+        self.refresh()
+
+        prefix = f"{directory}/" if directory else ""
+        matches: List[tuple[str, int, str]] = []
+        for path in self.candidates(_query_trigrams(literals, case_sensitive)):
+            if not path.startswith(prefix):
+                continue
+            if glob and not (
+                fnmatch(path.rsplit("/", 1)[-1], glob) or fnmatch(path, glob)
+            ):
+                continue
+            try:
+                text = (self.root / path).read_bytes().decode("utf-8", errors="replace")
+            except OSError:
+                continue
+            line_number, position, last_line = 1, 0, 0
+            for match in compiled.finditer(text):
+                line_number += text.count("\n", position, match.start())
+                position = match.start()
+                if line_number == last_line:
+                    continue
+                last_line = line_number
+                if len(matches) == max_results:
+                    return matches, True
+                start = text.rfind("\n", 0, match.start()) + 1
+                end = text.find("\n", match.start())
+                line = text[start : end if end != -1 else len(text)]
+                matches.append((path, line_number, line))
+        return matches, False
+
+    def close(self):
+        with self._lock:
+            self._db.close()
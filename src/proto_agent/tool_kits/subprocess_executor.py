@@ -0,0 +1,189 @@
+"""
+Bounded subprocess execution shared by the toolkits.
+Pipes are drained incrementally by reader threads into ``OutputBuffer``s
+that keep only the first and last bytes of each stream, so a noisy command
+costs a fixed amount of memory and context no matter how much it prints.
+Runs honour a wall-clock timeout and can be cancelled through an event.
+"""
+
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from ..Config import MAX_OUTPUT_BYTES
+
+_READ_CHUNK = 65536
+_POLL_INTERVAL = 0.05
+
+
+class OutputBuffer:
+    """Keeps the head and tail of a byte stream within ``max_bytes``
+
+    The first half of the budget holds the start of the stream, the second
+    half is a ring buffer holding its end; everything between is only counted.
+    """
+
+    def __init__(self, max_bytes: int = MAX_OUTPUT_BYTES):
+        self.max_bytes = max_bytes
+        self._head_limit = max_bytes - max_bytes // 2
+        self._tail_limit = max_bytes // 2
+        self._head = bytearray()
+        self._tail: deque[bytes] = deque()
+        self._tail_size = 0
+        self.total_bytes = 0
+
+    def write(self, chunk: bytes):
+        self.total_bytes += len(chunk)
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk or not self._tail_limit:
+            return
+        self._tail.append(chunk)
+        self._tail_size += len(chunk)
+        while self._tail_size - len(self._tail[0]) >= self._tail_limit:
+            self._tail_size -= len(self._tail.popleft())
+
+    @property
+    def truncated_bytes(self) -> int:
+        """Bytes of the stream that were dropped"""
+        return (
+            self.total_bytes - len(self._head) - min(self._tail_size, self._tail_limit)
+        )
+
+    @property
+    def head(self) -> bytes:
+        return bytes(self._head)
+
+    @property
+    def tail(self) -> bytes:
+        tail = b"".join(self._tail)
+        return tail[-self._tail_limit :] if len(tail) > self._tail_limit else tail
+
+    def getvalue(self) -> bytes:
+        """The kept bytes, with a marker where the middle of the stream was dropped"""
+        if not self.truncated_bytes:
+            return self.head + self.tail
+        marker = f"\n[... {self.truncated_bytes} bytes truncated ...]\n".encode()
+        return self.head + marker + self.tail
+
+    def text(self) -> str:
+        return self.getvalue().decode(errors="replace")
+
+    def __len__(self) -> int:
+        return self.total_bytes
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a bounded subprocess run"""
+
+    exit_code: Optional[int]
+    stdout: OutputBuffer
+    stderr: OutputBuffer
+    timed_out: bool = False
+    cancelled: bool = False
+
+
+def collect(
+    process: subprocess.Popen,
+    timeout: Optional[float] = None,
+    max_output_bytes: int = MAX_OUTPUT_BYTES,
+    input: Optional[bytes] = None,
+    cancel: Optional[threading.Event] = None,
+    on_output: Optional[Callable[[str, bytes], None]] = None,
+) -> ProcessResult:
+    """Drain a started process with piped stdout/stderr until it exits
+
+    Args:
+        process: Process started with ``stdout``/``stderr`` (and ``stdin`` when
+            ``input`` is given) set to ``subprocess.PIPE`` in binary mode
+        timeout: Wall-clock seconds before the process is killed
+        max_output_bytes: Bytes kept per stream, split between head and tail
+        input: Bytes written to stdin, which is then closed
+        cancel: Kills the process early once this event is set
+        on_output: Called with ``(stream name, chunk)`` as output arrives
+    """
+    result = ProcessResult(
+        exit_code=None,
+        stdout=OutputBuffer(max_output_bytes),
+        stderr=OutputBuffer(max_output_bytes),
+    )
+
+    def read(name: str, stream, buffer: OutputBuffer):
+        try:
+            while chunk := stream.read1(_READ_CHUNK):
+                if on_output is not None:
+                    on_output(name, chunk)
+                buffer.write(chunk)
+        except (OSError, ValueError):
+            pass  # The pipe was closed under us
+
+    readers = [
+        threading.Thread(target=read, args=(name, stream, buffer), daemon=True)
+        for name, stream, buffer in (
+            ("stdout", process.stdout, result.stdout),
+            ("stderr", process.stderr, result.stderr),
+        )
+        if stream is not None
+    ]
+    for reader in readers:
+        reader.start()
+    if process.stdin is not None:
+        try:
+            if input:
+                process.stdin.write(input)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass  # The process exited early, its output says why
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            result.exit_code = process.wait(timeout=_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        if cancel is not None and cancel.is_set():
+            result.cancelled = True
+        elif deadline is not None and time.monotonic() >= deadline:
+            result.timed_out = True
+        else:
+            continue
+        process.kill()
+        result.exit_code = process.wait()
+        break
+
+    for reader in readers:
+        # Processes started by the child may still hold the pipes open
+        reader.join(timeout=5)
+    for stream in (process.stdout, process.stderr):
+        if stream is not None:
+            stream.close()
+    return result
+
+
+def run(
+    args: List[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    max_output_bytes: int = MAX_OUTPUT_BYTES,
+    input: Optional[bytes] = None,
+    cancel: Optional[threading.Event] = None,
+    on_output: Optional[Callable[[str, bytes], None]] = None,
+    env: Optional[dict] = None,
+) -> ProcessResult:
+    """Start a command and collect its bounded output, see ``collect``"""
+    process = subprocess.Popen(
+        args,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    return collect(process, timeout, max_output_bytes, input, cancel, on_output)
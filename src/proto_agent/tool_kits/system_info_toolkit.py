@@ -2,10 +2,26 @@ import psutil
 import platform
 import json
 from datetime import datetime
-from ..tool_kit_registry import ToolKitRegistery
 from ..types_llm import FunctionDeclaration, Tool
 
 from .base_toolkit import ToolKit
+from .system_sampler import sampler
+
+
+def _percent_stats(field: str) -> dict:
+    stats = sampler.window_stats(field)
+    return {
+        key: f"{value:.1f}%" if key != "samples" else value
+        for key, value in stats.items()
+    }
+
+
+def _rate_stats(field: str) -> dict:
+    stats = sampler.window_stats(field)
+    return {
+        key: f"{value / 1024:.1f} KB/s" if key != "samples" else value
+        for key, value in stats.items()
+    }
 
 
 def get_system_info(working_directory: str) -> str:
@@ -44,6 +60,7 @@ def get_memory_usage(working_directory: str) -> str:
                 "used": f"{swap.used / (1024**3):.2f} GB",
                 "percentage": f"{swap.percent}%",
             },
+            "recent_usage": _percent_stats("memory_percent"),
         }
         return json.dumps(info, indent=2)
     except Exception as e:
@@ -68,6 +85,10 @@ def get_disk_usage(working_directory: str, path: str = "/") -> str:
                 {"device": p.device, "mountpoint": p.mountpoint, "fstype": p.fstype}
                 for p in partitions
             ],
+            "recent_io": {
+                "read": _rate_stats("disk_read_rate"),
+                "write": _rate_stats("disk_write_rate"),
+            },
         }
         return json.dumps(info, indent=2)
     except Exception as e:
@@ -77,7 +98,7 @@ def get_disk_usage(working_directory: str, path: str = "/") -> str:
 def get_cpu_info(working_directory: str) -> str:
     """Get CPU information and current usage"""
     try:
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
+        sample = sampler.latest()
         cpu_freq = psutil.cpu_freq()
 
         info = {
@@ -86,9 +107,12 @@ def get_cpu_info(working_directory: str) -> str:
                 "physical": psutil.cpu_count(logical=False),
             },
             "current_usage": {
-                "overall": f"{psutil.cpu_percent(interval=1):.1f}%",
-                "per_core": [f"{usage:.1f}%" for usage in cpu_percent],
+                "overall": f"{sample.cpu_percent:.1f}%" if sample else "N/A",
+                "per_core": [f"{usage:.1f}%" for usage in sample.per_core]
+                if sample
+                else [],
             },
+            "recent_usage": _percent_stats("cpu_percent"),
             "frequency": {
                 "current": f"{cpu_freq.current:.0f} MHz" if cpu_freq else "N/A",
                 "min": f"{cpu_freq.min:.0f} MHz" if cpu_freq else "N/A",
@@ -141,6 +165,10 @@ def get_network_info(working_directory: str) -> str:
 
             info["interfaces"][interface_name] = interface_info
 
+        info["recent_traffic"] = {
+            "sent": _rate_stats("net_sent_rate"),
+            "received": _rate_stats("net_recv_rate"),
+        }
         return json.dumps(info, indent=2)
     except Exception as e:
         return f"Error: Failed to get network info: {e}"
@@ -276,45 +304,57 @@ class SystemInfoToolkit(ToolKit):
         self.enable_processes = enable_processes
         self.requires_permissions = requires_permissions or set()
         self._register_functions()
+        self._holds_sampler = (
+            enable_cpu or enable_memory or enable_disk or enable_network
+        )
+        if self._holds_sampler:
+            # Warm up the sampler so the first tool call already has data
+            sampler.acquire()
+
+    def close(self):
+        """Stop background sampling right away, unless another toolkit still uses it"""
+        if self._holds_sampler:
+            self._holds_sampler = False
+            sampler.release()
 
     def _register_functions(self):
-        """Register system information functions with the global registry based on enabled capabilities"""
+        """Register system information functions with the toolkit's registry based on enabled capabilities"""
 
         if self.enable_basic:
             self.schemas.append(schema_get_system_info)
-            ToolKitRegistery.register(
+            self.registry.register(
                 "get_system_info", get_system_info, schema_get_system_info
             )
 
         if self.enable_memory:
             self.schemas.append(schema_get_memory_usage)
-            ToolKitRegistery.register(
+            self.registry.register(
                 "get_memory_usage", get_memory_usage, schema_get_memory_usage
             )
 
         if self.enable_disk:
             self.schemas.append(schema_get_disk_usage)
-            ToolKitRegistery.register(
+            self.registry.register(
                 "get_disk_usage", get_disk_usage, schema_get_disk_usage
             )
 
         if self.enable_cpu:
             self.schemas.append(schema_get_cpu_info)
-            ToolKitRegistery.register("get_cpu_info", get_cpu_info, schema_get_cpu_info)
+            self.registry.register("get_cpu_info", get_cpu_info, schema_get_cpu_info)
 
         if self.enable_network:
             self.schemas.append(schema_get_network_info)
-            ToolKitRegistery.register(
+            self.registry.register(
                 "get_network_info", get_network_info, schema_get_network_info
             )
 
         if self.enable_processes:
             self.schemas.append(schema_list_processes)
-            ToolKitRegistery.register(
+            self.registry.register(
                 "list_processes", list_processes, schema_list_processes
             )
 
     @property
     def tool(self) -> Tool:
         """Get the Tool instance for this toolkit"""
-        return Tool(function_declarations=self.schemas)
+        return Tool(function_declarations=self.schemas, registry=self.registry)
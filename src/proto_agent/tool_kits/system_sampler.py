@@ -0,0 +1,161 @@
+"""
+Background sampler for the system info toolkit.
+Keeps a rolling window of CPU, memory, disk I/O and network counters so tool
+calls can return instantly instead of blocking on ``psutil.cpu_percent``.
+The sampling thread starts on first use and stops by itself once no tool
+has read from it for ``idle_timeout`` seconds, or as soon as the last
+toolkit holding it is closed.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One measurement of the system counters"""
+
+    timestamp: float
+    cpu_percent: float
+    per_core: tuple
+    memory_percent: float
+    swap_percent: float
+    disk_read_rate: float = 0.0
+    disk_write_rate: float = 0.0
+    net_sent_rate: float = 0.0
+    net_recv_rate: float = 0.0
+
+
+class SystemSampler:
+    """Samples system counters at a fixed rate on a daemon thread"""
+
+    def __init__(
+        self, interval: float = 1.0, window: int = 60, idle_timeout: float = 300.0
+    ):
+        """
+        Args:
+            interval: Seconds between samples
+            window: Number of samples kept for min/avg/max
+            idle_timeout: Seconds without reads after which sampling stops
+        """
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._samples: deque[Sample] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._first_sample = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_used = time.monotonic()
+        self._holders = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start sampling if it isn't running yet"""
+        with self._lock:
+            self._last_used = time.monotonic()
+            if self.running:
+                return
+            self._samples.clear()
+            self._stop.clear()
+            self._first_sample.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="proto-agent-system-sampler", daemon=True
+            )
+            self._thread.start()
+
+    def acquire(self):
+        """Start sampling and keep it going until a matching ``release``"""
+        with self._lock:
+            self._holders += 1
+        self.start()
+
+    def release(self):
+        """Stop sampling once every ``acquire`` has been released"""
+        with self._lock:
+            self._holders = max(0, self._holders - 1)
+            if self._holders:
+                return
+        self.stop()
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        # The first cpu_percent(None) call only primes psutil's counters
+        psutil.cpu_percent(interval=None, percpu=True)
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        last = time.monotonic()
+        delay = min(0.1, self.interval)
+        while not self._stop.wait(delay):
+            delay = self.interval
+            now = time.monotonic()
+            elapsed = max(now - last, 1e-6)
+            per_core = psutil.cpu_percent(interval=None, percpu=True)
+            memory = psutil.virtual_memory()
+            swap = psutil.swap_memory()
+            new_disk = psutil.disk_io_counters()
+            new_net = psutil.net_io_counters()
+            sample = Sample(
+                timestamp=time.time(),
+                cpu_percent=sum(per_core) / len(per_core) if per_core else 0.0,
+                per_core=tuple(per_core),
+                memory_percent=memory.percent,
+                swap_percent=swap.percent,
+                disk_read_rate=(new_disk.read_bytes - disk.read_bytes) / elapsed
+                if disk and new_disk
+                else 0.0,
+                disk_write_rate=(new_disk.write_bytes - disk.write_bytes) / elapsed
+                if disk and new_disk
+                else 0.0,
+                net_sent_rate=(new_net.bytes_sent - net.bytes_sent) / elapsed
+                if net and new_net
+                else 0.0,
+                net_recv_rate=(new_net.bytes_recv - net.bytes_recv) / elapsed
+                if net and new_net
+                else 0.0,
+            )
+            disk, net, last = new_disk, new_net, now
+            with self._lock:
+                self._samples.append(sample)
+                idle = time.monotonic() - self._last_used > self.idle_timeout
+                if idle:
+                    self._thread = None
+            self._first_sample.set()
+            if idle:
+                return
+
+    def latest(self, timeout: float = 1.0) -> Optional[Sample]:
+        """The most recent sample, starting the sampler if needed"""
+        self.start()
+        self._first_sample.wait(timeout)
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def window_stats(self, field: str) -> dict:
+        """min/avg/max of a sample field over the current window"""
+        self.start()
+        with self._lock:
+            values = [getattr(sample, field) for sample in self._samples]
+        if not values:
+            return {}
+        return {
+            "min": min(values),
+            "avg": sum(values) / len(values),
+            "max": max(values),
+            "samples": len(values),
+        }
+
+
+sampler = SystemSampler()
@@ -0,0 +1,168 @@
+"""
+Per-turn tool selection.
+Every enabled tool's schema is sent with every completion. A router picks
+the subset worth offering for the next turn from the conversation, so a
+session with many toolkits enabled pays for a handful of schemas per call
+instead of all of them.
+
+Selection trades against provider prompt caching: the tools come first in
+the cached prefix, so whenever the offered subset changes the rest of the
+prompt is no longer served from cache. Selected tools keep their original
+order and recently used tools stay offered so the subset changes as little
+as possible, but routing only pays off when the schemas saved outweigh the
+cache misses, which is why it is off by default.
+"""
+
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on "
+    "or please the this to what which with you".split()
+)
+
+
+def _terms(text: str) -> List[str]:
+    """Lowercased words of ``text`` with a plural ``s`` dropped, minus stopwords"""
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _tool_text(tool: dict) -> str:
+    """Name, description and parameter names and descriptions of a tool schema"""
+    function = tool.get("function", {})
+    parts = [
+        function.get("name", "").replace("_", " "),
+        function.get("description", ""),
+    ]
+    properties = (function.get("parameters") or {}).get("properties") or {}
+    for name, schema in properties.items():
+        parts.append(name.replace("_", " "))
+        if isinstance(schema, dict):
+            parts.append(schema.get("description", ""))
+    return " ".join(parts)
+
+
+class BM25Index:
+    """Okapi BM25 scoring of a query against a fixed set of documents"""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0
+        document_frequency = Counter(
+            term for frequencies in self.frequencies for term in frequencies
+        )
+        count = len(documents)
+        self.idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: List[str]) -> List[float]:
+        terms = [term for term in set(query) if term in self.idf]
+        scores = []
+        for frequencies, length in zip(self.frequencies, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            score = 0.0
+            for term in terms:
+                frequency = frequencies.get(term, 0)
+                if frequency:
+                    score += (
+                        self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+                    )
+            scores.append(score)
+        return scores
+
+
+class ToolRouter(ABC):
+    """Abstract base class for per-turn tool selection strategies"""
+
+    @abstractmethod
+    def select(self, tools: List[dict], messages: List[dict]) -> List[dict]:
+        """Return the tool schemas to offer for the next completion. Must be implemented by subclasses."""
+        pass
+
+
+class BM25ToolRouter(ToolRouter):
+    """
+    Offers the tools whose schemas best match the latest user prompt, plus the
+    tools called in the last few turns. All tools are offered when nothing
+    matches the prompt, or when the model's last call was to a tool that does
+    not exist, as it may have been guessing at one it was not offered.
+    """
+
+    def __init__(self, max_tools: int = 6, keep_recent_turns: int = 3):
+        """
+        Args:
+            max_tools: Number of best-matching tools offered, on top of the
+                recently used ones
+            keep_recent_turns: Number of trailing tool-calling turns whose
+                tools stay offered
+        """
+        self.max_tools = max_tools
+        self.keep_recent_turns = keep_recent_turns
+        # Indexes per tool set, agents send the same schemas every turn
+        self._indexes: dict[tuple, BM25Index] = {}
+
+    def _index(self, tools: List[dict]) -> BM25Index:
+        texts = tuple(_tool_text(tool) for tool in tools)
+        if texts not in self._indexes:
+            self._indexes[texts] = BM25Index([_terms(text) for text in texts])
+        return self._indexes[texts]
+
+    def _query(self, messages: List[dict]) -> str:
+        """The latest user prompt and what the assistant said since"""
+        texts = []
+        for message in reversed(messages):
+            content = message.get("content")
+            if message.get("role") in ("user", "assistant") and isinstance(
+                content, str
+            ):
+                texts.append(content)
+            if message.get("role") == "user":
+                break
+        return " ".join(reversed(texts))
+
+    def _recent_calls(self, messages: List[dict]) -> List[List[str]]:
+        """Names called by the last ``keep_recent_turns`` tool-calling turns, latest first"""
+        turns = []
+        for message in reversed(messages):
+            if len(turns) >= self.keep_recent_turns:
+                break
+            if message.get("role") == "assistant" and message.get("tool_calls"):
+                turns.append(
+                    [call["function"]["name"] for call in message["tool_calls"]]
+                )
+        return turns
+
+    def select(self, tools: List[dict], messages: List[dict]) -> List[dict]:
+        if len(tools) <= self.max_tools:
+            return tools
+        names = [tool["function"]["name"] for tool in tools]
+        recent_turns = self._recent_calls(messages)
+        # The model guessed at a tool name, show it everything it can call
+        if recent_turns and not set(recent_turns[0]) <= set(names):
+            return tools
+        scores = self._index(tools).scores(_terms(self._query(messages)))
+        ranked = sorted(
+            (index for index, score in enumerate(scores) if score > 0),
+            key=lambda index: -scores[index],
+        )
+        if not ranked:
+            return tools
+        selected = set(ranked[: self.max_tools])
+        recent = {name for turn in recent_turns for name in turn}
+        selected.update(index for index, name in enumerate(names) if name in recent)
+        return [tool for index, tool in enumerate(tools) if index in selected]
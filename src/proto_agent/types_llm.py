@@ -2,13 +2,15 @@
 LLM types module - defines standard types for LLM interactions using LiteLLM
 """
 
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Generic, TypeVar
 
-from openai import BaseModel
-from pydantic import Field
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    from .tool_kit_registry import ToolKitRegistery
 
 T = TypeVar("T")
 
@@ -96,6 +98,8 @@ class UsageMetadata:
     prompt_token_count: int
     candidates_token_count: int
     total_token_count: int
+    # Part of prompt_token_count the provider served from its prompt cache
+    cached_content_token_count: int = 0
 
 
 class ExctractedWrapper(BaseModel, Generic[T]):
@@ -131,6 +135,22 @@ class GenerateContentResponse(Generic[T]):
         self.response_object = response_object
 
 
+@dataclass
+class StreamEvent:
+    """A single event yielded while streaming a response
+
+    ``type`` is one of ``"text"`` (a text delta), ``"tool_call"`` (a complete
+    function call), ``"tool_result"`` (the function's response) or ``"done"``
+    (the final response).
+    """
+
+    type: str
+    text: Optional[str] = None
+    function_call: Optional[FunctionCall] = None
+    function_response: Optional[FunctionResponse] = None
+    response: Optional[GenerateContentResponse] = None
+
+
 @dataclass
 class FunctionParameter:
     """Function parameter definition"""
@@ -156,12 +176,50 @@ class FunctionDeclaration:
 
 @dataclass
 class Tool:
-    """Tool definition"""
+    """Tool definition
+
+    ``registry`` holds the functions behind the declarations when the tool
+    comes from a toolkit, otherwise they are looked up in
+    ``tool_kit_registry.global_registry``.
+    """
 
     function_declarations: List[FunctionDeclaration]
+    registry: Optional["ToolKitRegistery"] = field(
+        default=None, repr=False, compare=False
+    )
 
-    def __init__(self, function_declarations: List[FunctionDeclaration]):
+    def __init__(
+        self,
+        function_declarations: List[FunctionDeclaration],
+        registry: Optional["ToolKitRegistery"] = None,
+    ):
         self.function_declarations = function_declarations
+        self.registry = registry
+        self._litellm_tools: Optional[tuple] = None
+
+    def litellm_tools(self) -> tuple:
+        """The declarations in LiteLLM's tools format
+
+        Converted once and shared by every agent built with this tool, so
+        the dicts must not be modified.
+        """
+        declarations = tuple(self.function_declarations)
+        identities = tuple(map(id, declarations))
+        cached = self._litellm_tools
+        if cached is None or cached[0] != identities:
+            converted = tuple(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": declaration.name,
+                        "description": declaration.description,
+                        "parameters": declaration.parameters,
+                    },
+                }
+                for declaration in declarations
+            )
+            cached = self._litellm_tools = (identities, converted)
+        return cached[1]
 
 
 @dataclass
@@ -1,16 +1,11 @@
 import unittest
 import tempfile
 from proto_agent.tool_kits import FileOperationToolkit, SystemInfoToolkit
-from proto_agent.tool_kit_registry import ToolKitRegistery
 
 
 class TestToolkits(unittest.TestCase):
     """Test toolkit creation and basic functionality"""
 
-    def setUp(self):
-        ToolKitRegistery._functions.clear()
-        ToolKitRegistery._schemas.clear()
-
     def test_file_toolkit_creation(self):
         toolkit = FileOperationToolkit()
         self.assertIsNotNone(toolkit)
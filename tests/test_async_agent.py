@@ -0,0 +1,117 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from proto_agent import AgentConfig, AsyncAgent
+from proto_agent.tool_cache import FILES, CachePolicy, ToolResultCache
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _tool_call(call_id: str, name: str, arguments: dict):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+async def _async_echo(working_directory, value: str) -> str:
+    await asyncio.sleep(0)
+    return f"async:{value}"
+
+
+def _sync_echo(working_directory, value: str) -> str:
+    return f"sync:{value}"
+
+
+class TestAsyncAgent(unittest.TestCase):
+    """Test the asyncio agent loop"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        declarations = []
+        for name, function in (("async_echo", _async_echo), ("sync_echo", _sync_echo)):
+            schema = FunctionDeclaration(
+                name=name,
+                description="Echo the value",
+                parameters={
+                    "type": "object",
+                    "properties": {"value": {"type": "string"}},
+                },
+            )
+            self.registry.register(name, function, schema)
+            declarations.append(schema)
+        self.tool = Tool(function_declarations=declarations, registry=self.registry)
+
+    def _agent(self):
+        return AsyncAgent(
+            AgentConfig(
+                api_key="test_key",
+                working_directory=".",
+                model="test/model",
+                tools=[self.tool],
+                parallel_tool_calls=True,
+            )
+        )
+
+    def test_agenerate_content_runs_sync_and_async_tools(self):
+        responses = [
+            _response(
+                tool_calls=[
+                    _tool_call("call_0", "async_echo", {"value": "a"}),
+                    _tool_call("call_1", "sync_echo", {"value": "b"}),
+                ]
+            ),
+            _response(content="done"),
+        ]
+        agent = self._agent()
+        with patch(
+            "proto_agent.async_agent.acompletion", AsyncMock(side_effect=responses)
+        ):
+            response = asyncio.run(agent.agenerate_content("go"))
+
+        self.assertEqual(response.text, "done")
+        results = [
+            json.loads(m["content"])["result"]
+            for m in agent._litellm_messages
+            if m["role"] == "tool"
+        ]
+        self.assertEqual(results, ["async:a", "sync:b"])
+
+    def test_async_tools_use_the_result_cache(self):
+        calls = []
+
+        async def lookup(working_directory, key: str) -> str:
+            calls.append(key)
+            return key * 2
+
+        schema = FunctionDeclaration(
+            name="lookup",
+            description="Look a key up",
+            parameters={"type": "object", "properties": {"key": {"type": "string"}}},
+        )
+        registry = ToolKitRegistery(cache=ToolResultCache())
+        registry.register("lookup", lookup, schema, cache_policy=CachePolicy(FILES))
+        for _ in range(2):
+            result = asyncio.run(registry.adispatch("lookup", ".", {"key": "a"}))
+            self.assertEqual(result, "aa")
+        self.assertEqual(calls, ["a"])
+
+    def test_many_agents_share_one_loop(self):
+        async def run_all():
+            agents = [self._agent() for _ in range(50)]
+            return await asyncio.gather(*(a.agenerate_content("hi") for a in agents))
+
+        with patch(
+            "proto_agent.async_agent.acompletion",
+            AsyncMock(return_value=_response(content="hello")),
+        ):
+            responses = asyncio.run(run_all())
+        self.assertEqual({r.text for r in responses}, {"hello"})
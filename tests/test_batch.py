@@ -0,0 +1,168 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from proto_agent import AgentConfig
+from proto_agent.batch import BatchJob, load_manifest, run_batch
+from proto_agent.main import main_cli
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _tool_call(call_id: str, name: str, arguments: dict):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _fake_completion(**kwargs):
+    """Answers with the prompt, failing for prompts that ask to"""
+    prompt = kwargs["messages"][1]["content"]
+    if prompt == "fail":
+        raise RuntimeError("provider down")
+    if prompt == "delete" and kwargs["messages"][-1]["role"] == "user":
+        return _response(tool_calls=[_tool_call("call_0", "delete", {})])
+    return _response(content=f"answer to {prompt}")
+
+
+def _delete(working_directory: str) -> str:
+    raise AssertionError("permission should have been refused")
+
+
+class TestBatch(unittest.TestCase):
+    """Test batch runs of manifest jobs"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        schema = FunctionDeclaration(
+            name="delete",
+            description="Delete everything",
+            parameters={"type": "object", "properties": {}},
+        )
+        self.registry.register("delete", _delete, schema)
+        self.tool = Tool(function_declarations=[schema], registry=self.registry)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        self.output = self.directory / "results.jsonl"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _config(self, working_directory: str, options: dict) -> AgentConfig:
+        return AgentConfig(
+            api_key="test_key",
+            working_directory=working_directory,
+            model="test/model",
+            tools=[self.tool],
+            permission_required={"delete"},
+        )
+
+    def _run(self, jobs, **kwargs):
+        with patch("proto_agent.agent.completion", side_effect=_fake_completion):
+            return run_batch(
+                jobs, self.output, workers=3, config_factory=self._config, **kwargs
+            )
+
+    def _results(self) -> dict:
+        results = {}
+        for line in self.output.read_text().splitlines():
+            if line.endswith("}"):  # Skips the line cut short below
+                result = json.loads(line)
+                results[result["id"]] = result
+        return results
+
+    def test_results_tokens_and_resume(self):
+        jobs = [
+            BatchJob(id=str(i), prompt=f"p{i}", working_directory=self.tmp.name)
+            for i in range(5)
+        ] + [
+            BatchJob(id="fail", prompt="fail", working_directory=self.tmp.name),
+            BatchJob(id="delete", prompt="delete", working_directory=self.tmp.name),
+        ]
+        summary = self._run(jobs)
+        self.assertEqual((summary.succeeded, summary.failed), (6, 1))
+        # The permission-gated call was refused, then a second completion answered
+        self.assertEqual(summary.prompt_tokens, 7 * 10)
+        results = self._results()
+        self.assertEqual(results["3"]["text"], "answer to p3")
+        self.assertEqual(results["delete"]["prompt_tokens"], 20)
+        self.assertIn("provider down", results["fail"]["error"])
+
+        # A crash mid-write leaves a partial line, its job runs again
+        lines = self.output.read_text().splitlines(keepends=True)
+        kept = [line for line in lines if json.loads(line)["id"] != "2"]
+        self.output.write_text("".join(kept) + '{"id": "2", "sta')
+        summary = self._run(jobs)
+        self.assertEqual((summary.skipped, summary.succeeded), (6, 1))
+        self.assertEqual(self._results()["2"]["text"], "answer to p2")
+
+        summary = self._run(jobs, retry_errors=True)
+        self.assertEqual((summary.skipped, summary.failed), (6, 1))
+
+    def test_manifest_validation(self):
+        manifest = self.directory / "manifest.jsonl"
+        manifest.write_text(
+            '{"prompt": "a", "working_directory": "/tmp", "read_only": true}\n'
+            "\n"
+            '{"id": "b", "prompt": "b", "working_directory": "/tmp"}\n'
+        )
+        jobs = load_manifest(manifest)
+        self.assertEqual([job.id for job in jobs], ["1", "b"])
+        self.assertTrue(jobs[0].options["read_only"])
+        self.assertFalse(jobs[1].options["enable_git"])
+
+        for content, message in (
+            ('{"prompt": "a"}\n', "working_directory"),
+            ('{"prompt": "a", "working_directory": "/", "model": "x"}\n', "model"),
+            ("[1]\n", "JSON object"),
+            ('{"id": 1, "prompt": "a", "working_directory": "/"}\n' * 2, "duplicate"),
+        ):
+            manifest.write_text(content)
+            with self.assertRaisesRegex(ValueError, message):
+                load_manifest(manifest)
+
+    def test_cli(self):
+        manifest = self.directory / "manifest.jsonl"
+        manifest.write_text(
+            "".join(
+                json.dumps(
+                    {
+                        "id": name,
+                        "prompt": name,
+                        "working_directory": self.tmp.name,
+                        "read_only": True,
+                        "no_system": True,
+                    }
+                )
+                + "\n"
+                for name in ("x", "y")
+            )
+        )
+        with (
+            patch("proto_agent.main.load_settings", return_value=("key", {})),
+            patch("proto_agent.agent.completion", side_effect=_fake_completion),
+        ):
+            result = CliRunner().invoke(
+                main_cli, ["batch", str(manifest), str(self.output), "-j", "2"]
+            )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("x: ok", result.output)
+        self.assertIn("Jobs: 2 run (2 ok, 0 failed), 0 already done", result.output)
+        self.assertIn("Tokens: 20 prompt (0 cached), 4 completion", result.output)
+        self.assertEqual(self._results()["y"]["text"], "answer to y")
+
+
+if __name__ == "__main__":
+    unittest.main()
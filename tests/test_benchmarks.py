@@ -0,0 +1,52 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import bench_agent  # noqa: E402
+from proto_agent.tool_kit_registry import ToolKitRegistery  # noqa: E402
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Smoke test of the benchmark harness so it doesn't rot"""
+
+    def tearDown(self):
+        ToolKitRegistery.cache.clear()
+        ToolKitRegistery.cache.enabled = True
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "results.json"
+            argv = [
+                "--sessions",
+                "2",
+                "--session-prompts",
+                "2",
+                "--output",
+                str(output),
+            ]
+            self.assertEqual(bench_agent.main(argv), 0)
+            results = json.loads(output.read_text())
+            tool_loop = results["scenarios"]["tool_loop"]
+            self.assertEqual(tool_loop["turns"], 8)
+            self.assertIn("search_files", tool_loop["tool_latency_ms"])
+            self.assertGreater(
+                results["scenarios"]["long_session"]["memory"]["messages"], 0
+            )
+            self.assertEqual(bench_agent.compare(results, results, threshold=0.25), [])
+
+    def test_startup_benchmark(self):
+        import bench_startup
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "startup.json"
+            argv = ["--runs", "1", "--scenario", "help", "--output", str(output)]
+            self.assertEqual(bench_startup.main(argv), 0)
+            results = json.loads(output.read_text())
+            self.assertEqual(results["scenarios"]["help"]["loaded"], [])
+            self.assertEqual(
+                bench_startup.compare(results, results, threshold=0.25), []
+            )
@@ -0,0 +1,71 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from proto_agent import Agent, AgentConfig, ConversationStore
+from proto_agent.compaction import TokenBudgetCompactor
+
+
+def _tool_result(call_id: str, size: int) -> dict:
+    return {"role": "tool", "tool_call_id": call_id, "content": "x" * size}
+
+
+class TestTokenBudgetCompactor(unittest.TestCase):
+    """Test history compaction under a token budget"""
+
+    def _conversation(self) -> ConversationStore:
+        store = ConversationStore("system prompt")
+        for i in range(4):
+            store.append({"role": "user", "content": f"read file {i}"})
+            store.append(_tool_result(f"call_{i}", 20_000))
+        return store
+
+    def test_under_budget_is_untouched(self):
+        store = self._conversation()
+        result = TokenBudgetCompactor(max_tokens=1_000_000).compact(store, "m")
+        self.assertEqual(result.tokens_saved, 0)
+
+    def test_old_tool_results_are_truncated_then_elided(self):
+        store = self._conversation()
+        compactor = TokenBudgetCompactor(
+            max_tokens=6_000, keep_recent_messages=2, truncate_chars=1_000
+        )
+        result = compactor.compact(store, "m")
+
+        self.assertGreater(result.tokens_saved, 0)
+        self.assertLessEqual(store.total_tokens, 6_000)
+        self.assertEqual(store.messages[0]["content"], "system prompt")
+        # The most recent tool result is never compacted
+        self.assertEqual(len(store.messages[-1]["content"]), 20_000)
+        self.assertIn("truncated", store.messages[2]["content"])
+        # Running again does not compact already shortened results further
+        self.assertEqual(compactor.compact(store, "m").tokens_saved, 0)
+
+    def test_summarizer_replaces_elision(self):
+        store = self._conversation()
+        compactor = TokenBudgetCompactor(
+            max_tokens=100, keep_recent_messages=0, summarizer=lambda c: "summary"
+        )
+        compactor.compact(store, "m")
+        self.assertTrue(store.messages[2]["content"].endswith("summary"))
+
+    def test_agent_compacts_before_each_completion(self):
+        config = AgentConfig(
+            api_key="test_key",
+            working_directory=".",
+            model="test/model",
+            compactor=TokenBudgetCompactor(max_tokens=500, keep_recent_messages=1),
+        )
+        agent = Agent(config)
+        agent.conversation.append(_tool_result("old", 50_000))
+        message = SimpleNamespace(content="ok", tool_calls=None)
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=message)], usage=None
+        )
+        with patch("proto_agent.agent.completion", return_value=response) as mock:
+            agent.generate_content("hi")
+
+        sent = mock.call_args.kwargs["messages"]
+        self.assertLess(len(json.dumps(sent)), 10_000)
+        self.assertGreater(agent.tokens_saved_by_compaction, 0)
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from pydantic import BaseModel
+
+from proto_agent import Agent, AgentConfig, AsyncAgent
+from proto_agent.completion_cache import (
+    CompletionCache,
+    CompletionCacheMiss,
+    cache_key,
+    configured_cache,
+)
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _tool_call(call_id: str):
+    return SimpleNamespace(
+        id=call_id,
+        type="function",
+        function=SimpleNamespace(name="lookup", arguments=json.dumps({"key": "a"})),
+    )
+
+
+def _fake_completion(**kwargs):
+    if kwargs["messages"][-1]["role"] == "user":
+        return _response(tool_calls=[_tool_call("call_0")])
+    result = json.loads(kwargs["messages"][-1]["content"])["result"]
+    return _response(content=f"found {result}")
+
+
+def _lookup(working_directory: str, key: str) -> str:
+    return key * 3
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class TestCompletionCache(unittest.TestCase):
+    """Test recording and replaying completions"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        schema = FunctionDeclaration(
+            name="lookup",
+            description="Look a key up",
+            parameters={"type": "object", "properties": {"key": {"type": "string"}}},
+        )
+        self.registry.register("lookup", _lookup, schema)
+        self.tool = Tool(function_declarations=[schema], registry=self.registry)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "completions.sqlite3"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _config(self, cache, model="test/model") -> AgentConfig:
+        return AgentConfig(
+            api_key="k",
+            working_directory=".",
+            model=model,
+            tools=[self.tool],
+            completion_cache=cache,
+        )
+
+    def test_record_then_replay(self):
+        cache = CompletionCache(self.path)
+        with patch(
+            "proto_agent.agent.completion", side_effect=_fake_completion
+        ) as completion:
+            response = Agent(self._config(cache)).generate_content(prompt="look a up")
+        self.assertEqual(response.text, "found aaa")
+        self.assertEqual(completion.call_count, 2)
+        self.assertEqual(len(cache), 2)
+        cache.close()
+
+        # A replay serves both turns, tool calls included, without the provider
+        cache = CompletionCache(self.path, mode="replay")
+        with patch("proto_agent.agent.completion") as completion:
+            response = Agent(self._config(cache)).generate_content(prompt="look a up")
+        completion.assert_not_called()
+        self.assertEqual(response.text, "found aaa")
+        self.assertEqual(response.usage_metadata.prompt_token_count, 10)
+        self.assertEqual(cache.hits, 2)
+
+        lookup = cache.lookup
+        threads = []
+
+        def tracked_lookup(completion_kwargs):
+            threads.append(threading.current_thread())
+            return lookup(completion_kwargs)
+
+        with (
+            patch(
+                "proto_agent.async_agent.acompletion",
+                AsyncMock(side_effect=AssertionError),
+            ),
+            patch.object(cache, "lookup", tracked_lookup),
+        ):
+            response = asyncio.run(
+                AsyncAgent(self._config(cache)).agenerate_content(prompt="look a up")
+            )
+        self.assertEqual(response.text, "found aaa")
+        # The async agent reads the cache off the event loop's thread
+        self.assertNotIn(threading.main_thread(), threads)
+
+        # A prompt never recorded fails instead of reaching the provider
+        with patch("proto_agent.agent.completion") as completion:
+            with self.assertRaisesRegex(Exception, "No recorded completion"):
+                Agent(self._config(cache)).generate_content(prompt="look b up")
+        completion.assert_not_called()
+        with self.assertRaises(CompletionCacheMiss):
+            cache.lookup({"model": "test/model", "messages": []})
+
+    def test_passthrough(self):
+        cache = CompletionCache(self.path, mode="passthrough")
+        with patch(
+            "proto_agent.agent.completion", side_effect=_fake_completion
+        ) as completion:
+            Agent(self._config(cache)).generate_content(prompt="look a up")
+            Agent(self._config(cache)).generate_content(prompt="look a up")
+        self.assertEqual(completion.call_count, 4)
+        self.assertEqual(len(cache), 0)
+
+    def test_key(self):
+        request = {
+            "model": "m",
+            "messages": [{"role": "user", "content": "hi"}],
+            "tools": [{"type": "function", "function": {"name": "f"}}],
+            "temperature": 1.0,
+            "response_format": Answer,
+            "api_key": "k1",
+        }
+        key = cache_key(request)
+        self.assertEqual(cache_key({**request, "api_key": "k2"}), key)
+        self.assertEqual(
+            cache_key(dict(reversed(list(request.items())))),
+            key,
+        )
+        for changed in (
+            {"model": "other"},
+            {"messages": [{"role": "user", "content": "hello"}]},
+            {"tools": None},
+            {"response_format": None},
+            {"temperature": 0.0},
+        ):
+            self.assertNotEqual(cache_key({**request, **changed}), key, changed)
+
+    def test_eviction_keeps_recently_used(self):
+        cache = CompletionCache(self.path)
+        requests = [
+            {"model": "m", "messages": [{"role": "user", "content": str(i)}]}
+            for i in range(6)
+        ]
+
+        def record(request):
+            key, _ = cache.lookup(request)
+            # Random text, so that entries compress to about the same size
+            content = os.urandom(600).hex()
+            cache.store(key, "m", _response(content=content))
+
+        record(requests[0])
+        # Room for four and a half entries
+        cache.max_bytes = cache.total_bytes * 9 // 2
+        for request in requests[1:3]:
+            record(request)
+        cache.lookup(requests[0])
+        for request in requests[3:]:
+            record(request)
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+        kept = [cache.lookup(request)[1] is not None for request in requests]
+        self.assertEqual(kept, [True, False, False, True, True, True])
+
+    def test_configured_cache(self):
+        self.assertIsNone(configured_cache({}))
+        config = {"completion_cache": {"path": str(self.path), "max_megabytes": 1}}
+        cache = configured_cache(config)
+        self.assertEqual((cache.mode, cache.max_bytes), ("record", 2**20))
+        self.assertIs(configured_cache(config), cache)
+        with patch.dict("os.environ", {"PROTO_AGENT_COMPLETION_CACHE": "replay"}):
+            self.assertEqual(configured_cache(config).mode, "replay")
+        with self.assertRaises(ValueError):
+            CompletionCache(self.path, mode="rewind")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from proto_agent import Agent, AgentConfig, ConversationStore
+
+
+class TestConversationStore(unittest.TestCase):
+    """Test incremental conversation bookkeeping"""
+
+    def test_sizes_are_tracked_incrementally(self):
+        store = ConversationStore("be brief")
+        first = store.entries[0]
+        store.append({"role": "user", "content": "hello"})
+        store.append({"role": "tool", "tool_call_id": "a", "content": "x" * 400})
+
+        self.assertEqual(len(store), 3)
+        self.assertIs(store.entries[0], first)
+        self.assertEqual(store.total_bytes, sum(e.byte_size for e in store))
+        self.assertEqual(store.total_tokens, sum(e.token_count for e in store))
+        self.assertGreaterEqual(store[2].token_count, 100)
+
+        before = store.total_bytes
+        store.replace(2, {"role": "tool", "tool_call_id": "a", "content": "x"})
+        self.assertLess(store.total_bytes, before)
+        self.assertEqual(store.total_bytes, sum(e.byte_size for e in store))
+
+        store.clear()
+        self.assertEqual(store.messages, [{"role": "system", "content": "be brief"}])
+
+    def test_agents_share_history_without_copies(self):
+        config = AgentConfig(
+            api_key="test_key", working_directory=".", model="test/model"
+        )
+        store = ConversationStore(config.system_prompt)
+        first, second = Agent(config, store), Agent(config, store)
+        first.conversation.append({"role": "user", "content": "hi"})
+        self.assertIs(first.conversation.messages, second._litellm_messages)
+        self.assertEqual(second.conversation.messages[-1]["content"], "hi")
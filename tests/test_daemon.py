@@ -0,0 +1,206 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from proto_agent import AgentConfig
+from proto_agent import daemon
+from proto_agent.daemon import AgentDaemon
+from proto_agent.daemon_client import DaemonClient, DaemonError
+from proto_agent.main import main_cli
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _tool_call(call_id: str, name: str, arguments: dict):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3, total_tokens=15)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _shout(working_directory: str, value: str) -> str:
+    return value.upper()
+
+
+class TestDaemon(unittest.TestCase):
+    """Test prompts served by the agent daemon over its Unix socket"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        ToolKitRegistery.cache.clear()
+        schema = FunctionDeclaration(
+            name="shout",
+            description="Upper-case the value",
+            parameters={"type": "object", "properties": {"value": {"type": "string"}}},
+        )
+        self.registry.register("shout", _shout, schema)
+        tool = Tool(function_declarations=[schema], registry=self.registry)
+        self.configs = []
+
+        def config_factory(working_directory: str, options: dict) -> AgentConfig:
+            self.configs.append((working_directory, options))
+            return AgentConfig(
+                api_key="test_key",
+                working_directory=working_directory,
+                model="test/model",
+                tools=[tool],
+                permission_required={"shout"},
+            )
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "daemon.sock"
+        self.server = AgentDaemon(self.path, config_factory=config_factory)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def _prompt(self, responses, permission_callback=None, verbose=False):
+        events = []
+        with (
+            patch("proto_agent.agent.completion", side_effect=responses),
+            DaemonClient.connect(self.path) as client,
+        ):
+            reply = client.prompt(
+                "go",
+                self.tmp.name,
+                {"read_only": True},
+                verbose=verbose,
+                permission_callback=permission_callback,
+                on_event=events.append,
+            )
+        return reply, events
+
+    def test_prompt_relays_permission_and_tool_events(self):
+        asked = []
+
+        def permission_callback(name, args):
+            asked.append((name, args))
+            return True
+
+        reply, events = self._prompt(
+            [
+                _response(tool_calls=[_tool_call("call_0", "shout", {"value": "hi"})]),
+                _response(content="done"),
+            ],
+            permission_callback,
+            verbose=True,
+        )
+        self.assertEqual(reply["text"], "done")
+        self.assertEqual(reply["usage"]["prompt_tokens"], 12)
+        self.assertEqual(asked, [("shout", {"value": "hi"})])
+        self.assertEqual(
+            events,
+            [
+                {"type": "tool_call", "name": "shout", "args": {"value": "hi"}},
+                {"type": "tool_result", "name": "shout", "result": {"result": "HI"}},
+            ],
+        )
+        self.assertEqual(self.configs, [(self.tmp.name, {"read_only": True})])
+
+    def test_refused_permission_and_warm_agent_reuse(self):
+        responses = [
+            _response(tool_calls=[_tool_call("call_0", "shout", {"value": "hi"})]),
+            _response(content="refused"),
+        ]
+        reply, events = self._prompt(responses, lambda name, args: False)
+        self.assertEqual(reply["text"], "refused")
+        self.assertEqual(events, [])
+        reply, _ = self._prompt([_response(content="again")])
+        self.assertEqual(reply["text"], "again")
+
+        with DaemonClient.connect(self.path) as client:
+            status = client.request({"type": "status"})
+        self.assertEqual(status["prompts_served"], 2)
+        self.assertEqual(status["warm_agents"], 1)
+        ((_, agent),) = next(iter(self.server._idle.values()))
+        # The history is dropped as soon as the prompt is answered
+        self.assertEqual([m["role"] for m in agent.conversation.messages], ["system"])
+
+    def test_idle_agents_are_capped_and_expire(self):
+        def release(count, options):
+            agents = [
+                self.server._acquire(self.tmp.name, options) for _ in range(count)
+            ]
+            for key, agent in agents:
+                self.server._release(key, agent)
+            return agents[0][0]
+
+        first = release(daemon.MAX_IDLE_AGENTS_PER_KEY + 2, {"read_only": True})
+        second = release(2, {"read_only": False})
+        self.assertEqual(len(self.server._idle[first]), daemon.MAX_IDLE_AGENTS_PER_KEY)
+        limit = daemon.MAX_IDLE_AGENTS_PER_KEY + 1
+        with patch.object(daemon, "MAX_IDLE_AGENTS", limit):
+            self.server._expire_idle()
+        # The agents released first go first
+        self.assertEqual(len(self.server._idle[first]), limit - 2)
+        self.assertEqual(len(self.server._idle[second]), 2)
+        with patch.object(daemon, "IDLE_AGENT_TTL", -1):
+            self.server._expire_idle()
+        self.assertEqual(self.server._idle, {})
+
+    def test_errors_and_refusing_a_second_daemon(self):
+        with patch("proto_agent.agent.completion", side_effect=RuntimeError("down")):
+            with DaemonClient.connect(self.path) as client:
+                with self.assertRaisesRegex(DaemonError, "down"):
+                    client.prompt("go", self.tmp.name, {})
+        with DaemonClient.connect(self.path) as client:
+            with self.assertRaises(DaemonError):
+                client.request({"type": "unknown"})
+        with self.assertRaises(DaemonError):
+            AgentDaemon(self.path)
+
+    def test_shutdown_removes_the_socket(self):
+        with DaemonClient.connect(self.path) as client:
+            self.assertEqual(client.request({"type": "shutdown"}), {"type": "ok"})
+        self.thread.join(timeout=5)
+        self.server.server_close()
+        self.assertFalse(self.path.exists())
+        self.assertIsNone(DaemonClient.connect(self.path))
+
+    def test_cli_uses_the_running_daemon(self):
+        runner = CliRunner()
+        with patch("proto_agent.agent.completion", return_value=_response("hello")):
+            result = runner.invoke(
+                main_cli,
+                ["hi", self.tmp.name, "--verbose"],
+                env={"PROTO_AGENT_SOCKET": str(self.path)},
+            )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("hello\n", result.output)
+        self.assertIn("Prompt tokens: 12", result.output)
+
+        result = runner.invoke(
+            main_cli,
+            ["daemon", "status"],
+            env={"PROTO_AGENT_SOCKET": str(self.path)},
+        )
+        self.assertIn("Prompts served: 1", result.output)
+
+        result = runner.invoke(
+            main_cli,
+            ["daemon", "status"],
+            env={"PROTO_AGENT_SOCKET": str(Path(self.tmp.name) / "missing.sock")},
+        )
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Daemon is not running", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
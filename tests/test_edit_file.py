@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from proto_agent.tool_kits.file_operation_toolkit import edit_file
+from proto_agent.tool_kits.patching import PatchError, apply_unified_diff
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+class TestEditFile(unittest.TestCase):
+    """Test unified diff and search/replace edits"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "file.txt"
+        self.path.write_text(ORIGINAL)
+        os.chmod(self.path, 0o640)
+        self.working_directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_search_replace(self):
+        patch = "<<<<<<< SEARCH\nline 5\n=======\nline five\n>>>>>>> REPLACE\n"
+        result = edit_file(self.working_directory, "file.txt", patch)
+        self.assertIn("-line 5\n+line five\n", result)
+        self.assertNotIn("line 1\n", result)
+        self.assertEqual(
+            self.path.read_text(), ORIGINAL.replace("line 5\n", "line five\n")
+        )
+        self.assertEqual(self.path.stat().st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.working_directory), ["file.txt"])
+
+    def test_ambiguous_or_missing_search_leaves_file_untouched(self):
+        ambiguous = "<<<<<<< SEARCH\n1\n=======\nx\n>>>>>>> REPLACE"
+        result = edit_file(self.working_directory, "file.txt", ambiguous)
+        self.assertIn("matches 2 times", result)
+        missing = "<<<<<<< SEARCH\nnope\n=======\nx\n>>>>>>> REPLACE"
+        self.assertIn(
+            "not found", edit_file(self.working_directory, "file.txt", missing)
+        )
+        self.assertEqual(self.path.read_text(), ORIGINAL)
+
+    def test_unified_diff_with_stale_line_numbers(self):
+        # Line numbers are off by three, the hunks are located by content
+        patch = (
+            "--- a/file.txt\n+++ b/file.txt\n"
+            "@@ -5,3 +5,3 @@\n line 7\n-line 8\n+line eight\n line 9\n"
+            "@@ -15,2 +15,3 @@\n line 18\n+inserted\n line 19\n"
+        )
+        result = edit_file(self.working_directory, "file.txt", patch)
+        self.assertTrue(result.startswith('Successfully edited "file.txt"'))
+        lines = self.path.read_text().splitlines()
+        self.assertEqual(lines[7], "line eight")
+        self.assertEqual(lines[17:20], ["line 18", "inserted", "line 19"])
+
+    def test_hunk_lines_that_look_like_file_headers(self):
+        text = "SELECT 1;\n-- comment\nSELECT 2;\n"
+        # Removing "-- comment" and adding "++ counter" gives lines starting
+        # with "--- " and "+++ ", the hunk counts tell them from file headers
+        patch = (
+            "--- a/q.sql\n+++ b/q.sql\n"
+            "@@ -1,3 +1,3 @@\n SELECT 1;\n--- comment\n+++ counter\n SELECT 2;\n"
+        )
+        self.assertEqual(
+            apply_unified_diff(text, patch), "SELECT 1;\n++ counter\nSELECT 2;\n"
+        )
+
+    def test_new_file_and_crlf(self):
+        patch = "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1,2 @@\n+a\n+b\n"
+        edit_file(self.working_directory, "new.txt", patch)
+        self.assertEqual(
+            (Path(self.working_directory) / "new.txt").read_text(), "a\nb\n"
+        )
+
+        self.assertEqual(
+            apply_unified_diff("a\r\nb\r\n", "@@ -1,2 +1,2 @@\n a\n-b\n+c\n"),
+            "a\r\nc\r\n",
+        )
+        with self.assertRaises(PatchError):
+            apply_unified_diff("a\n", "@@ -1 +1 @@\n-z\n+y\n")
+
+    def test_outside_boundary(self):
+        result = edit_file(self.working_directory, "../x.txt", "@@ -0,0 +1 @@\n+x\n")
+        self.assertIn("outside the permitted working directory", result)
@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from proto_agent.tool_kits.file_operation_toolkit import get_files_info
+from proto_agent.tool_kits.path_filters import GitIgnore
+
+
+def _names(listing: str) -> list[str]:
+    return [
+        line[2:].split(":")[0] for line in listing.splitlines() if line.startswith("- ")
+    ]
+
+
+class TestFileListing(unittest.TestCase):
+    """Test recursive, filtered and paginated directory listings"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        for path in ("src/a.py", "src/pkg/b.py", "src/pkg/c.txt", "build/out.o"):
+            (root / path).parent.mkdir(parents=True, exist_ok=True)
+            (root / path).write_text("x")
+        (root / ".gitignore").write_text("build/\n*.txt\n")
+        self.working_directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_non_recursive_listing(self):
+        names = _names(get_files_info(self.working_directory))
+        self.assertEqual(names, [".gitignore", "build", "src"])
+
+    def test_recursive_listing_respects_gitignore(self):
+        names = _names(get_files_info(self.working_directory, recursive=True))
+        self.assertEqual(
+            names, [".gitignore", "src", "src/a.py", "src/pkg", "src/pkg/b.py"]
+        )
+
+    def test_pattern_depth_and_pagination(self):
+        listing = get_files_info(self.working_directory, recursive=True, pattern="*.py")
+        self.assertEqual(_names(listing), ["src/a.py", "src/pkg/b.py"])
+
+        shallow = get_files_info(
+            self.working_directory, "src", recursive=True, max_depth=1
+        )
+        self.assertEqual(_names(shallow), ["src/a.py", "src/pkg"])
+
+        page = get_files_info(self.working_directory, recursive=True, limit=2)
+        self.assertEqual(_names(page), [".gitignore", "src"])
+        self.assertIn("offset=2", page)
+        rest = get_files_info(self.working_directory, recursive=True, offset=2)
+        self.assertEqual(_names(rest), ["src/a.py", "src/pkg", "src/pkg/b.py"])
+
+
+class TestGitIgnore(unittest.TestCase):
+    def test_rules(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            (root / ".gitignore").write_text(
+                "# comment\n*.log\n!keep.log\n/dist\ndocs/**/tmp\nvendor/\n"
+            )
+            gitignore = GitIgnore(root)
+            gitignore.load_directory("")
+            self.assertTrue(gitignore.is_ignored("a/b/x.log", False))
+            self.assertFalse(gitignore.is_ignored("a/keep.log", False))
+            self.assertTrue(gitignore.is_ignored("dist", True))
+            self.assertFalse(gitignore.is_ignored("src/dist", True))
+            self.assertTrue(gitignore.is_ignored("docs/a/b/tmp", True))
+            self.assertTrue(gitignore.is_ignored("lib/vendor", True))
+            self.assertFalse(gitignore.is_ignored("lib/vendor", False))
+            self.assertTrue(gitignore.is_ignored(".git", True))
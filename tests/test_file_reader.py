@@ -0,0 +1,98 @@
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from proto_agent.tool_kits.file_operation_toolkit import get_file_content
+from proto_agent.tool_kits.file_reader import line_indexes
+
+
+class TestFileReader(unittest.TestCase):
+    """Test ranged, line-based and binary file reads"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        (root / "lines.txt").write_text("".join(f"line {i}\n" for i in range(1, 101)))
+        (root / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(64))
+        (root / "empty.txt").write_text("")
+        self.working_directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_whole_file_and_truncation(self):
+        content = get_file_content(self.working_directory, "lines.txt")
+        self.assertTrue(content.startswith("line 1\n"))
+        self.assertTrue(content.endswith("line 100\n"))
+
+        head = get_file_content(self.working_directory, "lines.txt", max_bytes=14)
+        self.assertTrue(head.startswith("line 1\nline 2\n"))
+        self.assertIn("continue with offset=14", head)
+        self.assertEqual(get_file_content(self.working_directory, "empty.txt"), "")
+
+    def test_byte_range(self):
+        content = get_file_content(
+            self.working_directory, "lines.txt", offset=7, length=7
+        )
+        self.assertTrue(content.startswith("line 2\n"))
+        self.assertIn("continue with offset=14", content)
+
+    def test_line_range(self):
+        content = get_file_content(
+            self.working_directory, "lines.txt", start_line=50, end_line=52
+        )
+        self.assertEqual(content, "line 50\nline 51\nline 52\n\n[Lines 50-52 of 100]")
+        past_end = get_file_content(self.working_directory, "lines.txt", start_line=200)
+        self.assertIn("File has 100 lines", past_end)
+
+    def test_line_longer_than_max_bytes(self):
+        path = Path(self.working_directory) / "long.txt"
+        path.write_text("short\n" + "x" * 50 + "\nend\n")
+        content = get_file_content(
+            self.working_directory, "long.txt", max_bytes=20, start_line=2
+        )
+        self.assertTrue(content.startswith("x" * 20))
+        # Continuing from line 2 again would show the same bytes forever
+        self.assertIn("continue with offset=26]", content)
+        rest = get_file_content(
+            self.working_directory, "long.txt", max_bytes=20, offset=26
+        )
+        self.assertTrue(rest.startswith("x" * 20))
+
+    def test_paging_across_multibyte_characters(self):
+        text = "aé€😀b" * 5
+        (Path(self.working_directory) / "utf8.txt").write_text(text, encoding="utf-8")
+        # Shorter than a character too, a page then holds the whole character
+        for length in (1, 4):
+            pages, offset = [], 0
+            while True:
+                content = get_file_content(
+                    self.working_directory, "utf8.txt", offset=offset, length=length
+                )
+                page, _, marker = content.partition("[...File")
+                self.assertNotIn("\ufffd", page)
+                pages.append(page)
+                if not marker:
+                    break
+                offset = int(re.search(r"offset=(\d+)", marker).group(1))
+            self.assertEqual("".join(pages), text)
+
+    def test_line_index_follows_file_changes(self):
+        get_file_content(self.working_directory, "lines.txt", start_line=1, end_line=1)
+        path = Path(self.working_directory) / "lines.txt"
+        path.write_text("first\nsecond\n")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        content = get_file_content(self.working_directory, "lines.txt", start_line=2)
+        self.assertEqual(content, "second\n\n[Lines 2-2 of 2]")
+        self.assertEqual(
+            sum(1 for key in line_indexes._indexes if key[0] == str(path.resolve())),
+            1,
+        )
+
+    def test_binary_file_is_summarized(self):
+        content = get_file_content(self.working_directory, "image.png")
+        self.assertIn("PNG image", content)
+        self.assertIn("72 bytes", content)
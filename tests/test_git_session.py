@@ -0,0 +1,131 @@
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from proto_agent.tool_kits import git_session
+from proto_agent.tool_kits.git_session import GitRepository
+from proto_agent.tool_kits.git_toolkit import (
+    git_blame,
+    git_log,
+    git_show_file,
+    git_status,
+)
+
+
+class TestGitRepository(unittest.TestCase):
+    """Test the per-directory git session layer"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.working_directory = Path(self.tmp.name)
+        run = dict(cwd=self.working_directory, capture_output=True, check=True)
+        git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+        subprocess.run(["git", "init", "-q"], **run)
+        (self.working_directory / "a.txt").write_text("one\n")
+        subprocess.run(["git", "add", "a.txt"], **run)
+        subprocess.run([*git, "commit", "-qm", "init"], **run)
+        (self.working_directory / "a.txt").write_text("two\n")
+        (self.working_directory / "new.txt").write_text("new\n")
+
+    def tearDown(self):
+        GitRepository.close_all()
+        self.tmp.cleanup()
+
+    def test_repository_is_checked_once(self):
+        with patch.object(
+            git_session.subprocess_executor,
+            "run",
+            wraps=git_session.subprocess_executor.run,
+        ) as runner:
+            git_status(str(self.working_directory))
+            git_log(str(self.working_directory))
+            git_status(str(self.working_directory))
+        commands = [call.args[0][1] for call in runner.call_args_list]
+        self.assertEqual(commands.count("rev-parse"), 1)
+        self.assertEqual(commands.count("status"), 2)
+
+    def test_status_from_single_call(self):
+        status = json.loads(git_status(str(self.working_directory)))
+        self.assertEqual(status["modified"], ["a.txt"])
+        self.assertEqual(status["untracked"], ["new.txt"])
+
+    def test_show_file_reuses_cat_file_process(self):
+        working_directory = str(self.working_directory)
+        self.assertEqual(git_show_file(working_directory, "a.txt"), "one\n")
+        process = GitRepository.for_directory(working_directory)._cat_file
+        self.assertIn("Error", git_show_file(working_directory, "missing.txt"))
+        self.assertEqual(git_show_file(working_directory, "a.txt"), "one\n")
+        self.assertIs(GitRepository.for_directory(working_directory)._cat_file, process)
+
+    def test_show_file_caps_large_and_binary_blobs(self):
+        run = dict(cwd=self.working_directory, capture_output=True, check=True)
+        (self.working_directory / "big.txt").write_text("x" * 400_000)
+        (self.working_directory / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00")
+        subprocess.run(["git", "add", "big.txt", "image.png"], **run)
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "b"],
+            **run,
+        )
+        working_directory = str(self.working_directory)
+        text = git_show_file(working_directory, "big.txt", max_bytes=1000)
+        self.assertTrue(text.startswith("x" * 1000))
+        self.assertIn("continue with offset=1000]", text)
+        self.assertLess(len(text), 1200)
+        text = git_show_file(working_directory, "big.txt", offset=399_500)
+        self.assertEqual(text, "x" * 500)
+        self.assertIn("PNG image", git_show_file(working_directory, "image.png"))
+
+    def test_not_a_repository(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(git_status(directory), "Error: Not a git repository")
+
+
+class TestGitHistoryPagination(unittest.TestCase):
+    """Test paginated git_log and grouped git_blame"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.working_directory = str(self.tmp.name)
+        run = dict(cwd=self.working_directory, capture_output=True, check=True)
+        subprocess.run(["git", "init", "-q"], **run)
+        for i in range(5):
+            with open(Path(self.working_directory) / "a.txt", "a") as f:
+                f.write(f"line {i}\n")
+            subprocess.run(["git", "add", "a.txt"], **run)
+            subprocess.run(
+                ["git", "-c", f"user.name=dev{i % 2}", "-c", "user.email=d@d"]
+                + ["commit", "-qm", f"commit {i}"],
+                **run,
+            )
+
+    def tearDown(self):
+        GitRepository.close_all()
+        self.tmp.cleanup()
+
+    def test_cursor_pagination_walks_the_whole_history(self):
+        messages = []
+        cursor = None
+        while True:
+            page = json.loads(git_log(self.working_directory, limit=2, after=cursor))
+            messages.extend(c["message"] for c in page["commits"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(messages, [f"commit {i}" for i in reversed(range(5))])
+
+    def test_offset_pagination(self):
+        page = json.loads(git_log(self.working_directory, limit=2, offset=4))
+        self.assertEqual([c["message"] for c in page["commits"]], ["commit 0"])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_blame_groups_lines_per_commit(self):
+        blame = json.loads(git_blame(self.working_directory, "a.txt", "2,4", True))
+        self.assertEqual(len(blame["ranges"]), 3)
+        self.assertEqual(blame["ranges"][0]["lines"], ["line 1"])
+        self.assertEqual(len(blame["commits"]), 3)
+        self.assertEqual(
+            {c["author"] for c in blame["commits"].values()}, {"dev0", "dev1"}
+        )
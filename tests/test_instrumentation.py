@@ -0,0 +1,256 @@
+import asyncio
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from proto_agent import Agent, AgentConfig, AsyncAgent, OTLPJsonExporter
+from proto_agent.instrumentation import InstrumentationHook, Span, args_hash
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _tool_call(call_id: str, name: str, arguments: dict):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, total_tokens=110)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _echo(working_directory: str, value: str) -> str:
+    return value * 2
+
+
+class _BrokenHook(InstrumentationHook):
+    def on_span_end(self, span):
+        raise RuntimeError("broken hook")
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test spans and counters emitted by the agent loop"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        ToolKitRegistery.cache.clear()
+        schema = FunctionDeclaration(
+            name="echo",
+            description="Echo the value twice",
+            parameters={"type": "object", "properties": {"value": {"type": "string"}}},
+        )
+        self.registry.register("echo", _echo, schema)
+        self.tool = Tool(function_declarations=[schema], registry=self.registry)
+        self.exporter = OTLPJsonExporter()
+
+    def _responses(self):
+        return [
+            _response(
+                tool_calls=[
+                    _tool_call("call_0", "echo", {"value": "ab"}),
+                    _tool_call("call_1", "echo", {"value": "cde"}),
+                ]
+            ),
+            _response(content="done"),
+        ]
+
+    def _config(self, **config):
+        return AgentConfig(
+            api_key="test_key",
+            working_directory=".",
+            model="test/model",
+            tools=[self.tool],
+            hooks=[_BrokenHook(), self.exporter],
+            **config,
+        )
+
+    def _spans(self, name):
+        return [span for span in self.exporter.spans if span.name == name]
+
+    def _counter(self, name, **attributes):
+        return self.exporter.counters.get((name, tuple(sorted(attributes.items()))))
+
+    def test_generate_content_spans_and_counters(self):
+        agent = Agent(
+            self._config(
+                parallel_tool_calls=True,
+                permission_required={"echo"},
+                permission_callback=lambda name, args: args["value"] == "ab",
+            )
+        )
+        output = io.StringIO()
+        with (
+            patch("proto_agent.agent.completion", side_effect=self._responses()),
+            redirect_stdout(output),
+        ):
+            response = agent.generate_content("go")
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(response.usage_metadata.prompt_token_count, 100)
+
+        (root,) = self._spans("agent.generate_content")
+        self.assertIsNone(root.parent_id)
+        for span in self.exporter.spans:
+            self.assertEqual(span.trace_id, root.trace_id)
+
+        completions = self._spans("llm.completion")
+        self.assertEqual(len(completions), 2)
+        self.assertEqual(completions[0].parent_id, root.span_id)
+        self.assertEqual(completions[0].attributes["llm.usage.prompt_tokens"], 100)
+
+        tool_calls = self._spans("tool.call")
+        self.assertEqual(len(tool_calls), 2)
+        granted = [
+            span for span in tool_calls if "tool.result_bytes" in span.attributes
+        ]
+        self.assertEqual(len(granted), 1)
+        self.assertEqual(granted[0].attributes["tool.result_bytes"], 4)
+        self.assertEqual(
+            granted[0].attributes["tool.args_hash"], args_hash({"value": "ab"})
+        )
+
+        permissions = self._spans("permission.wait")
+        self.assertEqual(
+            sorted(span.attributes["permission.granted"] for span in permissions),
+            [False, True],
+        )
+        tool_span_ids = {span.span_id for span in tool_calls}
+        for span in permissions:
+            self.assertIn(span.parent_id, tool_span_ids)
+        self.assertEqual(len(self._spans("messages.convert")), 4)
+
+        self.assertEqual(
+            self._counter("llm.tokens", type="prompt", model="test/model"), 200
+        )
+        self.assertEqual(
+            self._counter("llm.tokens", type="completion", model="test/model"), 20
+        )
+        self.assertEqual(self._counter("tool.result.bytes", **{"tool.name": "echo"}), 4)
+        self.assertGreater(self._counter("llm.request.bytes", model="test/model"), 0)
+
+    def test_parallel_tool_spans_keep_their_parent(self):
+        agent = Agent(self._config(parallel_tool_calls=True))
+        with patch("proto_agent.agent.completion", side_effect=self._responses()):
+            agent.generate_content("go")
+        (root,) = self._spans("agent.generate_content")
+        tool_calls = self._spans("tool.call")
+        self.assertEqual(len(tool_calls), 2)
+        for span in tool_calls:
+            self.assertEqual(span.parent_id, root.span_id)
+
+    def test_async_agent_spans(self):
+        agent = AsyncAgent(self._config(parallel_tool_calls=True))
+        with patch(
+            "proto_agent.async_agent.acompletion",
+            AsyncMock(side_effect=self._responses()),
+        ):
+            asyncio.run(agent.agenerate_content("go"))
+        (root,) = self._spans("agent.generate_content")
+        tool_calls = self._spans("tool.call")
+        self.assertEqual(
+            sorted(span.attributes["tool.result_bytes"] for span in tool_calls), [4, 6]
+        )
+        for span in tool_calls + self._spans("llm.completion"):
+            self.assertEqual(span.parent_id, root.span_id)
+
+    def test_failed_completion_marks_span_as_error(self):
+        agent = Agent(self._config())
+        with patch("proto_agent.agent.completion", side_effect=RuntimeError("down")):
+            with self.assertRaises(Exception):
+                agent.generate_content("go")
+        (completion,) = self._spans("llm.completion")
+        self.assertEqual(completion.status, "ERROR")
+        self.assertEqual(completion.status_message, "down")
+
+    def test_otlp_json_export(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "telemetry.jsonl"
+            self.exporter = OTLPJsonExporter(path, service_name="test-agent")
+            agent = Agent(self._config())
+            with patch("proto_agent.agent.completion", side_effect=self._responses()):
+                agent.generate_content("go")
+            traces, metrics = [
+                json.loads(line) for line in path.read_text().splitlines()
+            ]
+
+        resource_spans = traces["resourceSpans"][0]
+        self.assertEqual(
+            resource_spans["resource"]["attributes"],
+            [{"key": "service.name", "value": {"stringValue": "test-agent"}}],
+        )
+        spans = resource_spans["scopeSpans"][0]["spans"]
+        root = next(span for span in spans if span["name"] == "agent.generate_content")
+        self.assertEqual(root["parentSpanId"], "")
+        self.assertEqual(len(root["traceId"]), 32)
+        tool = next(span for span in spans if span["name"] == "tool.call")
+        self.assertIn(
+            {"key": "tool.result_bytes", "value": {"intValue": "4"}},
+            tool["attributes"],
+        )
+
+        metric_list = metrics["resourceMetrics"][0]["scopeMetrics"][0]["metrics"]
+        tokens = next(
+            metric for metric in metric_list if metric["name"] == "llm.tokens"
+        )
+        self.assertTrue(tokens["sum"]["isMonotonic"])
+        self.assertEqual(
+            sorted(point["asInt"] for point in tokens["sum"]["dataPoints"]),
+            ["20", "200"],
+        )
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_spans_ending_during_a_flush_are_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "telemetry.jsonl"
+            exporter = OTLPJsonExporter(path)
+            late = Span("tool.call", "t", "late", parent_id="root")
+            metrics = exporter.metrics
+
+            def metrics_while_a_span_ends():
+                exporter.on_span_end(late)
+                return metrics()
+
+            with patch.object(exporter, "metrics", metrics_while_a_span_ends):
+                exporter.on_span_end(Span("agent.generate_content", "t", "root"))
+            self.assertEqual(exporter.spans, [late])
+            exporter.flush()
+            exported = [
+                span["spanId"]
+                for line in path.read_text().splitlines()[::2]
+                for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0][
+                    "spans"
+                ]
+            ]
+        self.assertEqual(exported, ["root", "late"])
+
+        # Without a path only the latest spans are kept
+        exporter = OTLPJsonExporter(max_spans=2)
+        for span_id in "abc":
+            exporter.on_span_end(Span("agent.generate_content", "t", span_id))
+        self.assertEqual([span.span_id for span in exporter.spans], ["b", "c"])
+
+    def test_no_hooks_records_nothing(self):
+        agent = Agent(
+            AgentConfig(
+                api_key="test_key",
+                working_directory=".",
+                model="test/model",
+                tools=[self.tool],
+            )
+        )
+        self.assertFalse(agent.instrumentation.enabled)
+        with agent.instrumentation.span("anything") as span:
+            self.assertFalse(span.recording)
+        with patch("proto_agent.agent.completion", side_effect=self._responses()):
+            self.assertEqual(agent.generate_content("go").text, "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from proto_agent import Agent, AgentConfig
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _tool_call(call_id: str, name: str, arguments: dict):
+    return SimpleNamespace(
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _slow_tool(working_directory: str, value: str) -> str:
+    time.sleep(0.3)
+    return value
+
+
+class TestParallelToolCalls(unittest.TestCase):
+    """Test concurrent dispatch of tool calls within one turn"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        schema = FunctionDeclaration(
+            name="slow_tool",
+            description="Sleep then echo the value",
+            parameters={"type": "object", "properties": {"value": {"type": "string"}}},
+        )
+        self.registry.register("slow_tool", _slow_tool, schema)
+        self.tool = Tool(function_declarations=[schema], registry=self.registry)
+
+    def _run(self, **config):
+        responses = [
+            _response(
+                tool_calls=[
+                    _tool_call(f"call_{i}", "slow_tool", {"value": str(i)})
+                    for i in range(3)
+                ]
+            ),
+            _response(content="done"),
+        ]
+        agent = Agent(
+            AgentConfig(
+                api_key="test_key",
+                working_directory=".",
+                model="test/model",
+                tools=[self.tool],
+                **config,
+            )
+        )
+        with patch("proto_agent.agent.completion", side_effect=responses):
+            start = time.perf_counter()
+            response = agent.generate_content("go")
+            elapsed = time.perf_counter() - start
+        return agent, response, elapsed
+
+    def test_parallel_dispatch_keeps_call_order(self):
+        agent, response, elapsed = self._run(parallel_tool_calls=True)
+        self.assertEqual(response.text, "done")
+        self.assertLess(elapsed, 0.8)
+        tool_messages = [m for m in agent._litellm_messages if m["role"] == "tool"]
+        self.assertEqual(
+            [m["tool_call_id"] for m in tool_messages], ["call_0", "call_1", "call_2"]
+        )
+        self.assertEqual(
+            [json.loads(m["content"])["result"] for m in tool_messages],
+            ["0", "1", "2"],
+        )
+
+    def test_permission_required_calls_are_serialized(self):
+        active = []
+        overlaps = []
+
+        def callback(name, args):
+            active.append(name)
+            overlaps.append(len(active))
+            time.sleep(0.05)
+            active.pop()
+            return True
+
+        _, response, _ = self._run(
+            parallel_tool_calls=True,
+            permission_callback=callback,
+            permission_required={"slow_tool"},
+        )
+        self.assertEqual(response.text, "done")
+        self.assertEqual(overlaps, [1, 1, 1])
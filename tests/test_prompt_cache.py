@@ -0,0 +1,159 @@
+import copy
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from proto_agent import Agent, AgentConfig
+from proto_agent.prompt_cache import (
+    CACHE_CONTROL,
+    add_cache_breakpoints,
+    cached_tokens,
+    uses_cache_breakpoints,
+)
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _response(content=None, tool_calls=None, **usage):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(
+        prompt_tokens=100, completion_tokens=5, total_tokens=105, **usage
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _tool_call(call_id: str):
+    return SimpleNamespace(
+        id=call_id, function=SimpleNamespace(name="lookup", arguments='{"key": "a"}')
+    )
+
+
+def _lookup(working_directory: str, key: str) -> str:
+    return key * 3
+
+
+def _strip_cache_control(messages):
+    stripped = []
+    for message in messages:
+        if isinstance(message.get("content"), list):
+            text = "".join(block["text"] for block in message["content"])
+            message = {**message, "content": text}
+        stripped.append(message)
+    return stripped
+
+
+class TestPromptCache(unittest.TestCase):
+    """Test prompt-cache breakpoints and cached token accounting"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        schema = FunctionDeclaration(
+            name="lookup",
+            description="Look a key up",
+            parameters={"type": "object", "properties": {"key": {"type": "string"}}},
+        )
+        self.registry.register("lookup", _lookup, schema)
+        self.tool = Tool(function_declarations=[schema], registry=self.registry)
+
+    def _agent(self, model="anthropic/claude-sonnet-4", **kwargs) -> Agent:
+        return Agent(
+            AgentConfig(
+                api_key="k",
+                working_directory=".",
+                model=model,
+                tools=[self.tool],
+                **kwargs,
+            )
+        )
+
+    def test_breakpoints_are_added_to_request_copies(self):
+        messages = [
+            {"role": "system", "content": "system"},
+            {"role": "user", "content": "hi"},
+        ]
+        tools = [{"type": "function", "function": {"name": "f"}}]
+        request, request_tools = add_cache_breakpoints(messages, tools)
+        self.assertEqual(request[0]["content"][-1]["cache_control"], CACHE_CONTROL)
+        self.assertEqual(request[1]["content"][-1]["text"], "hi")
+        self.assertEqual(request[1]["content"][-1]["cache_control"], CACHE_CONTROL)
+        self.assertIs(request_tools, tools)
+        self.assertEqual(messages[1], {"role": "user", "content": "hi"})
+
+        # Without a system prompt the static prefix ends with the tools
+        request, request_tools = add_cache_breakpoints(messages[1:], tools)
+        self.assertEqual(request_tools[-1]["cache_control"], CACHE_CONTROL)
+        self.assertNotIn("cache_control", tools[-1])
+
+        self.assertTrue(uses_cache_breakpoints("anthropic/claude-sonnet-4"))
+        self.assertTrue(uses_cache_breakpoints("bedrock/anthropic.claude-3-5-haiku"))
+        # Decided without loading litellm, which may still be importing
+        with patch.dict("sys.modules", {"litellm": None}):
+            self.assertFalse(uses_cache_breakpoints("gpt-4o"))
+
+    def test_prefix_stays_byte_stable_across_turns(self):
+        requests = []
+
+        def fake_completion(**kwargs):
+            requests.append(copy.deepcopy(kwargs))
+            if len(requests) < 3:
+                return _response(tool_calls=[_tool_call(f"call_{len(requests)}")])
+            return _response(content="done", cache_read_input_tokens=90)
+
+        agent = self._agent()
+        with patch("proto_agent.agent.completion", side_effect=fake_completion):
+            response = agent.generate_content(prompt="look a up")
+        self.assertEqual(response.usage_metadata.cached_content_token_count, 90)
+
+        for earlier, later in zip(requests, requests[1:]):
+            self.assertEqual(earlier["tools"], later["tools"])
+            self.assertEqual(earlier["messages"][0], later["messages"][0])
+            # Everything sent before is resent unchanged, apart from the
+            # moving breakpoint on what was the last message
+            previous = _strip_cache_control(earlier["messages"])
+            current = _strip_cache_control(later["messages"])
+            self.assertEqual(json.dumps(current[: len(previous)]), json.dumps(previous))
+            marked = [
+                message
+                for message in later["messages"][1:]
+                if isinstance(message.get("content"), list)
+            ]
+            self.assertEqual(marked, [later["messages"][-1]])
+        # The stored history never carries breakpoints
+        self.assertTrue(
+            all(
+                isinstance(m.get("content"), (str, type(None)))
+                for m in agent.conversation.messages
+            )
+        )
+
+    def test_prompt_caching_setting(self):
+        for model, setting, expect_breakpoints in (
+            ("test/model", None, False),
+            ("test/model", True, True),
+            ("anthropic/claude-sonnet-4", False, False),
+        ):
+            agent = self._agent(model=model, prompt_caching=setting)
+            agent.conversation.append({"role": "user", "content": "hi"})
+            kwargs = agent._prepare_completion(None)
+            self.assertEqual(
+                kwargs["messages"] is not agent.conversation.messages,
+                expect_breakpoints,
+            )
+
+    def test_cached_tokens(self):
+        self.assertEqual(
+            cached_tokens(
+                SimpleNamespace(prompt_tokens_details=SimpleNamespace(cached_tokens=64))
+            ),
+            64,
+        )
+        self.assertEqual(
+            cached_tokens(SimpleNamespace(prompt_tokens_details={"cached_tokens": 8})),
+            8,
+        )
+        self.assertEqual(cached_tokens(SimpleNamespace(prompt_tokens=10)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
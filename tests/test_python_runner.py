@@ -0,0 +1,107 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from proto_agent.tool_kits.file_operation_toolkit import run_python_file
+from proto_agent.tool_kits import python_runner
+from proto_agent.tool_kits.python_runner import PythonRunner, script_imports
+
+
+class TestPythonRunner(unittest.TestCase):
+    """Test script execution in warm worker interpreters"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "helper.py").write_text("counter = []\n")
+        self.working_directory = self.tmp.name
+        self.runner = PythonRunner.for_directory(self.working_directory, sys.executable)
+
+    def tearDown(self):
+        PythonRunner.close_all()
+        self.tmp.cleanup()
+
+    def _write(self, name: str, source: str) -> Path:
+        path = self.root / name
+        path.write_text(source)
+        return path
+
+    def test_output_exit_code_and_clean_state(self):
+        path = self._write(
+            "main.py",
+            "import json, sys, helper\n"
+            "helper.counter.append(1)\n"
+            "print(json.dumps(sys.argv[1:]), len(helper.counter))\n"
+            "sys.exit(3)\n",
+        )
+        for _ in range(2):
+            result = self.runner.run(path, ["a b"])
+            self.assertEqual(result.exit_code, 3)
+            # A fresh worker every run, so the local module starts over
+            self.assertEqual(result.stdout.getvalue(), b'["a b"] 1\n')
+        self.assertIn("json", self.runner.preload)
+        self.assertNotIn("helper", self.runner.preload)
+
+    def test_traceback_starts_at_the_script(self):
+        path = self._write("fail.py", "raise ValueError('boom')\n")
+        result = self.runner.run(path)
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn(b"ValueError: boom", result.stderr.getvalue())
+        self.assertNotIn(b"runpy", result.stderr.getvalue())
+
+    def test_output_cap_and_timeout(self):
+        path = self._write("loud.py", "print('x' * 100000)\n")
+        result = self.runner.run(path, max_output_bytes=1000)
+        self.assertEqual(result.stdout.total_bytes, 100001)
+        self.assertEqual(result.stdout.truncated_bytes, 99001)
+        self.assertEqual(result.stdout.tail, b"x" * 499 + b"\n")
+
+        path = self._write("slow.py", "import time\ntime.sleep(30)\n")
+        result = self.runner.run(path, timeout=0.5)
+        self.assertTrue(result.timed_out)
+
+    def test_memory_limit(self):
+        path = self._write("hungry.py", "data = bytearray(512 * 1024 * 1024)\n")
+        result = self.runner.run(path, memory_bytes=256 * 1024 * 1024)
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn(b"MemoryError", result.stderr.getvalue())
+
+    def test_run_python_file_report(self):
+        self._write("loud.py", "import sys\nprint('x' * 50)\nsys.stderr.write('e')\n")
+        runner = PythonRunner.for_directory(self.working_directory)
+        runner.interpreter = sys.executable
+        report = run_python_file(self.working_directory, "loud.py", max_output_bytes=10)
+        self.assertIn("Exit code: 0", report)
+        self.assertIn("STDOUT:\nxxxxx\n[... 41 bytes truncated ...]\nxxxx\n", report)
+        self.assertIn("STDERR:\ne\n", report)
+
+    def test_idle_workers_are_stopped(self):
+        path = self._write("ok.py", "print(1)\n")
+        self.runner.idle_timeout = 0.2
+        self.runner.run(path)
+        worker = self.runner._idle[0]
+        worker.wait(timeout=5)
+        self.assertEqual(self.runner._idle, [])
+        # The next run starts a worker again
+        self.assertEqual(self.runner.run(path).stdout.getvalue(), b"1\n")
+
+    def test_least_recently_used_runners_are_closed(self):
+        with tempfile.TemporaryDirectory() as parent:
+            runners = []
+            for i in range(python_runner.MAX_RUNNERS + 1):
+                directory = Path(parent) / str(i)
+                directory.mkdir()
+                runners.append(PythonRunner.for_directory(directory, sys.executable))
+                runners[-1].warm_up()
+            self.assertNotIn(self.runner, PythonRunner._runners.values())
+            self.assertEqual(self.runner._idle, [])
+            self.assertEqual(len(PythonRunner._runners), python_runner.MAX_RUNNERS)
+
+    def test_script_imports(self):
+        path = self._write(
+            "imports.py",
+            "from __future__ import annotations\nimport os.path, json\n"
+            "from . import sibling\nfrom collections import abc\n",
+        )
+        self.assertEqual(script_imports(path), {"os", "json", "collections"})
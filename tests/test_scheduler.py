@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from proto_agent import Agent, AgentConfig, AsyncAgent
+from proto_agent.scheduler import RateLimit, RequestScheduler, TokenBucket
+
+
+class _ProviderError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": retry_after} if retry_after else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+def _response(content="done", total_tokens=15):
+    message = SimpleNamespace(content=content, tool_calls=None)
+    usage = SimpleNamespace(
+        prompt_tokens=total_tokens - 3, completion_tokens=3, total_tokens=total_tokens
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """Test rate limiting, priorities and retries of completion calls"""
+
+    def setUp(self):
+        self.delays = []
+        self.scheduler = RequestScheduler(base_delay=0.01, sleep=self.delays.append)
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(60, now=0.0)
+        self.assertEqual(bucket.wait_time(60, 0.0), 0.0)
+        bucket.take(60, 0.0)
+        self.assertAlmostEqual(bucket.wait_time(10, 0.0), 10.0)
+        self.assertAlmostEqual(bucket.wait_time(10, 4.0), 6.0)
+        # A request larger than the bucket waits for a full bucket, not forever
+        self.assertAlmostEqual(bucket.wait_time(1000, 4.0), 56.0)
+        bucket.give(-20)  # Used more than estimated
+        self.assertAlmostEqual(bucket.wait_time(10, 4.0), 26.0)
+
+    def test_limits_per_model_and_key(self):
+        self.scheduler.default_limit = RateLimit(requests_per_minute=100)
+        self.scheduler.set_limit("a", RateLimit(tokens_per_minute=1000))
+        self.scheduler.set_limit("a", RateLimit(tokens_per_minute=50), api_key="k2")
+        self.scheduler.acquire("a", "k1", 800)
+        self.scheduler.acquire("a", "k2", 10)
+        self.assertAlmostEqual(self.scheduler._lane("a", "k1").tokens.level, 200, 0)
+        self.assertAlmostEqual(self.scheduler._lane("a", "k2").tokens.level, 40, 0)
+        self.assertIsNone(self.scheduler._lane("a", "k1").requests)
+        self.assertIsNotNone(self.scheduler._lane("b", "k1").requests)
+
+        self.scheduler.settle("a", "k1", 800, 900)
+        self.assertAlmostEqual(self.scheduler._lane("a", "k1").tokens.level, 100, 0)
+        lane = self.scheduler._lane("a", "k1")
+        self.scheduler.configure({"a": {"tokens_per_minute": 1000}})
+        self.assertIs(self.scheduler._lane("a", "k1").tokens, lane.tokens)
+        self.scheduler.configure({"a": {"tokens_per_minute": 2000}})
+        self.assertEqual(self.scheduler._lane("a", "k1").tokens.capacity, 2000)
+
+    def test_waiting_requests_are_admitted_by_priority(self):
+        lane = self.scheduler._lane("m", "k")
+        lane.blocked_until = time.monotonic() + 0.2
+        admitted = []
+
+        def request(priority):
+            self.scheduler.acquire("m", "k", 1, priority)
+            admitted.append(priority)
+
+        threads = []
+        for priority in (0, 5, 1, 5):
+            threads.append(threading.Thread(target=request, args=(priority,)))
+            threads[-1].start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(admitted, [5, 5, 1, 0])
+        self.assertEqual(lane.queue, [])
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        calls = []
+
+        def flaky(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise _ProviderError(429, retry_after="0.1")
+            if len(calls) == 2:
+                raise _ProviderError(503)
+            return _response()
+
+        response = self.scheduler.call(flaky, {"model": "m", "api_key": "k"}, 10)
+        self.assertEqual(response.choices[0].message.content, "done")
+        self.assertEqual(self.scheduler.retries, 2)
+        self.assertGreaterEqual(self.delays[0], 0.1)
+        self.assertLessEqual(self.delays[1], 0.02)
+        # Other requests on the lane hold back after a rate limit
+        self.assertGreater(self.scheduler._lane("m", "k").blocked_until, 0)
+
+        for error in (_ProviderError(400), ValueError("bad")):
+            with self.assertRaises(type(error)):
+                self.scheduler.call(
+                    unittest.mock.Mock(side_effect=error), {"model": "m"}, 1
+                )
+        always_down = unittest.mock.Mock(side_effect=_ProviderError(503))
+        with self.assertRaises(_ProviderError):
+            self.scheduler.call(always_down, {"model": "m"}, 1)
+        self.assertEqual(always_down.call_count, self.scheduler.max_retries + 1)
+
+    def test_errors_are_classified_by_litellm_type(self):
+        import httpx
+        from litellm import exceptions
+
+        def connection_error(cause):
+            try:
+                raise cause
+            except Exception:
+                try:
+                    raise exceptions.APIConnectionError(
+                        message=str(cause), llm_provider="gemini", model="m"
+                    )
+                except exceptions.APIConnectionError as error:
+                    return error
+
+        missing_key = connection_error(ValueError("Missing Gemini API key"))
+        self.assertEqual(missing_key.status_code, 500)
+        failing = unittest.mock.Mock(side_effect=missing_key)
+        with self.assertRaisesRegex(Exception, "Missing Gemini API key"):
+            self.scheduler.call(failing, {"model": "m"}, 1)
+        self.assertEqual(failing.call_count, 1)
+        self.assertEqual(self.delays, [])
+
+        for error in (
+            connection_error(httpx.ConnectError("connection refused")),
+            exceptions.Timeout(message="timed out", model="m", llm_provider="p"),
+            exceptions.InternalServerError(message="oops", llm_provider="p", model="m"),
+        ):
+            flaky = unittest.mock.Mock(side_effect=[error, _response()])
+            self.scheduler.call(flaky, {"model": "m"}, 1)
+            self.assertEqual(flaky.call_count, 2, type(error))
+
+    def test_agents_go_through_their_scheduler(self):
+        self.scheduler.set_limit("test/model", RateLimit(tokens_per_minute=10_000))
+        config = AgentConfig(
+            api_key="k",
+            working_directory=".",
+            model="test/model",
+            scheduler=self.scheduler,
+            priority=3,
+        )
+        agent = Agent(config)
+        with patch(
+            "proto_agent.agent.completion",
+            side_effect=[_ProviderError(429), _response(total_tokens=500)],
+        ):
+            self.assertEqual(agent.generate_content(prompt="hi").text, "done")
+        self.assertEqual(self.scheduler.retries, 1)
+        level = self.scheduler._lane("test/model", "k").tokens.level
+        self.assertAlmostEqual(level, 9_500, delta=5)
+
+        async_agent = AsyncAgent(config)
+        with patch(
+            "proto_agent.async_agent.acompletion",
+            AsyncMock(side_effect=[_ProviderError(502), _response()]),
+        ):
+            response = asyncio.run(async_agent.agenerate_content(prompt="hi"))
+        self.assertEqual(response.text, "done")
+        self.assertEqual(self.scheduler.retries, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from proto_agent.tool_kits.file_operation_toolkit import search_files, write_file
+from proto_agent.tool_kits.search_index import SearchIndex, required_literals
+
+
+class TestSearchFiles(unittest.TestCase):
+    """Test content search backed by the trigram index"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = tempfile.TemporaryDirectory()
+        SearchIndex.cache_dir = Path(self.cache.name)
+        root = Path(self.tmp.name) / "project"
+        for path, content in {
+            "src/app.py": "import os\n\ndef handle_request(request):\n    return None\n",
+            "src/util.py": "def helper():\n    return 'Handle_Request'\n",
+            "docs/notes.md": "handle_request is documented here\n",
+            "build/out.py": "handle_request = 1\n",
+        }.items():
+            (root / path).parent.mkdir(parents=True, exist_ok=True)
+            (root / path).write_text(content)
+        (root / ".gitignore").write_text("build/\n")
+        (root / "blob.bin").write_bytes(b"\x00handle_request")
+        self.working_directory = str(root)
+
+    def tearDown(self):
+        for index in SearchIndex._indexes.values():
+            index.close()
+        SearchIndex._indexes.clear()
+        SearchIndex.cache_dir = None
+        self.tmp.cleanup()
+        self.cache.cleanup()
+
+    def test_literal_search(self):
+        result = search_files(self.working_directory, "handle_request")
+        self.assertEqual(
+            result.splitlines(),
+            [
+                "docs/notes.md:1: handle_request is documented here",
+                "src/app.py:3: def handle_request(request):",
+            ],
+        )
+        insensitive = search_files(
+            self.working_directory, "handle_request", case_sensitive=False, glob="*.py"
+        )
+        self.assertIn("src/util.py:2:", insensitive)
+        self.assertNotIn("docs/notes.md", insensitive)
+
+    def test_regex_search_and_limits(self):
+        result = search_files(
+            self.working_directory, r"def \w+\(", regex=True, directory="src"
+        )
+        self.assertEqual(len(result.splitlines()), 2)
+        limited = search_files(
+            self.working_directory, "return", directory="src", max_results=1
+        )
+        self.assertIn("more than 1 matches", limited)
+        self.assertIn(
+            "Invalid regular expression",
+            search_files(self.working_directory, "(", regex=True),
+        )
+        self.assertIn(
+            "outside", search_files(self.working_directory, "x", directory="..")
+        )
+
+    def test_index_is_incremental(self):
+        search_files(self.working_directory, "handle_request")
+        index = SearchIndex.for_directory(self.working_directory)
+        self.assertEqual(index.refresh(), 0)
+
+        write_file(self.working_directory, "src/new.py", "handle_request()\n")
+        with patch.object(index, "_walk", side_effect=AssertionError):
+            # Within the refresh interval only the written file is re-read
+            result = search_files(self.working_directory, "handle_request")
+        self.assertIn("src/new.py:1:", result)
+
+        index.mark_stale()
+        (Path(self.working_directory) / "src/new.py").unlink()
+        self.assertNotIn("src/new.py", search_files(self.working_directory, "handle"))
+
+    def test_index_persists(self):
+        search_files(self.working_directory, "helper")
+        SearchIndex._indexes.pop(str(Path(self.working_directory).resolve())).close()
+        index = SearchIndex.for_directory(self.working_directory)
+        self.assertEqual(index.refresh(), 0)
+
+    def test_instances_sharing_a_database(self):
+        root = Path(self.working_directory)
+        db_path = str(Path(self.cache.name) / "shared.sqlite3")
+        first = SearchIndex(root, db_path, refresh_interval=0)
+        second = SearchIndex(root, db_path, refresh_interval=0)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        first.refresh()
+        second.refresh()
+
+        # One instance reindexes and removes files the other had loaded
+        (root / "src/app.py").write_text("def handle_request():\n    pass\n")
+        (root / "docs/notes.md").unlink()
+        first.refresh()
+        (root / "src/util.py").write_text("handle_request\n")
+        second.refresh()
+        first.refresh()
+        for index in (first, second):
+            matches, _ = index.search("handle_request")
+            self.assertEqual(
+                [path for path, _, _ in matches], ["src/app.py", "src/util.py"]
+            )
+
+    def test_required_literals(self):
+        self.assertEqual(required_literals(r"foo\.bar(x|y)+baz"), ["foo.bar", "baz"])
+        self.assertEqual(required_literals("a|bcd"), [])
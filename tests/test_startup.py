@@ -0,0 +1,81 @@
+import json
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+import proto_agent
+from proto_agent import agent, async_agent, tool_kits
+
+HEAVY_MODULES = ("litellm", "openai", "psutil", "pydantic", "asyncio")
+
+
+def _loaded_after(code: str) -> list:
+    report = (
+        f"import json, sys; print(json.dumps([m for m in {HEAVY_MODULES!r} "
+        "if m in sys.modules]))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{report}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    """Test that heavy dependencies load only when they are needed"""
+
+    def test_cli_import_and_help_load_nothing_heavy(self):
+        self.assertEqual(_loaded_after("import proto_agent.main"), [])
+        help_code = (
+            "import proto_agent.main\n"
+            "try:\n"
+            "    proto_agent.main.main_cli(['--help'])\n"
+            "except SystemExit:\n"
+            "    pass"
+        )
+        self.assertEqual(_loaded_after(help_code), [])
+
+    def test_group_help_lists_subcommands(self):
+        from click.testing import CliRunner
+
+        from proto_agent.main import main_cli
+
+        result = CliRunner().invoke(main_cli, ["--help"])
+        self.assertEqual(result.exit_code, 0)
+        for command in ("run", "batch", "daemon"):
+            self.assertIn(f"  {command} ", result.output)
+        # The default command's arguments are shown too
+        self.assertIn("WORKING_DIRECTORY", result.output)
+        result = CliRunner().invoke(main_cli, ["run", "--help"])
+        self.assertIn("WORKING_DIRECTORY", result.output)
+
+    def test_toolkits_load_their_own_dependencies(self):
+        loaded = _loaded_after(
+            "from proto_agent.tool_kits import FileOperationToolkit, GitToolkit"
+        )
+        self.assertNotIn("psutil", loaded)
+        self.assertNotIn("litellm", loaded)
+        self.assertIn(
+            "psutil",
+            _loaded_after("from proto_agent.tool_kits import SystemInfoToolkit"),
+        )
+
+    def test_lazy_exports(self):
+        self.assertIs(proto_agent.Agent, agent.Agent)
+        self.assertIs(proto_agent.AsyncAgent, async_agent.AsyncAgent)
+        with self.assertRaises(AttributeError):
+            proto_agent.NotAnExport
+        with self.assertRaises(AttributeError):
+            tool_kits.NotAToolkit
+
+    def test_completion_forwards_to_litellm(self):
+        with patch("litellm.completion", return_value="response") as completion:
+            self.assertEqual(agent.completion(model="m", messages=[]), "response")
+        completion.assert_called_once_with(model="m", messages=[])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from proto_agent import Agent, AgentConfig, AsyncAgent
+from proto_agent.streaming import ToolCallAssembler
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+
+def _chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+
+def _fragment(index, arguments, call_id=None, name=None):
+    return SimpleNamespace(
+        index=index,
+        id=call_id,
+        function=SimpleNamespace(name=name, arguments=arguments),
+    )
+
+
+class TestToolCallAssembler(unittest.TestCase):
+    def test_fragments_are_joined_and_completed_early(self):
+        assembler = ToolCallAssembler()
+        self.assertEqual(assembler.add([_fragment(0, '{"val', "call_a", "echo")]), [])
+        self.assertEqual(assembler.add([_fragment(0, 'ue": "x"}')]), [0])
+        self.assertEqual(assembler.add([_fragment(1, "", "call_b", "echo")]), [])
+        self.assertEqual(assembler.finish(), [1])
+        self.assertEqual(assembler.function_call_args(0), ("echo", {"value": "x"}))
+        self.assertEqual([c.id for c in assembler.tool_calls], ["call_a", "call_b"])
+
+    def test_brackets_inside_strings(self):
+        arguments = {"code": 'print("}{]")', "path": "a\\", "items": [{"n": 1}]}
+        text = json.dumps(arguments)
+        assembler = ToolCallAssembler()
+        assembler.add([_fragment(0, "", "call_a", "write")])
+        # One character per chunk, complete exactly on the closing brace
+        for position, char in enumerate(text, start=1):
+            completed = assembler.add([_fragment(0, char)])
+            self.assertEqual(completed, [0] if position == len(text) else [])
+        self.assertEqual(assembler.function_call_args(0), ("write", arguments))
+
+
+class TestStreamContent(unittest.TestCase):
+    """Test streamed responses and early tool execution"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        self.started = threading.Event()
+
+        def echo(working_directory, value: str = "") -> str:
+            self.started.set()
+            return value
+
+        schema = FunctionDeclaration(
+            name="echo",
+            description="Echo the value",
+            parameters={"type": "object", "properties": {"value": {"type": "string"}}},
+        )
+        self.registry.register("echo", echo, schema)
+        self.config = AgentConfig(
+            api_key="test_key",
+            working_directory=".",
+            model="test/model",
+            tools=[Tool(function_declarations=[schema], registry=self.registry)],
+        )
+
+    def _tool_stream(self):
+        yield _chunk(content="Let me check")
+        yield _chunk(tool_calls=[_fragment(0, '{"value":', "call_0", "echo")])
+        yield _chunk(tool_calls=[_fragment(0, ' "hi"}')])
+        # The call is complete, it should be running before the stream ends
+        self.assertTrue(self.started.wait(timeout=2))
+        yield _chunk()
+
+    def _text_stream(self):
+        yield _chunk(content="all ")
+        yield _chunk(content="done")
+
+    def test_stream_content_yields_deltas_and_tool_results(self):
+        agent = Agent(self.config)
+        with patch(
+            "proto_agent.agent.completion",
+            side_effect=[self._tool_stream(), self._text_stream()],
+        ):
+            events = list(agent.stream_content("go"))
+
+        self.assertEqual(
+            [e.type for e in events],
+            ["text", "tool_call", "tool_result", "text", "text", "done"],
+        )
+        self.assertEqual(events[2].function_response.response, {"result": "hi"})
+        self.assertEqual(events[-1].response.text, "all done")
+        tool_message = [m for m in agent._litellm_messages if m["role"] == "tool"][0]
+        self.assertEqual(tool_message["tool_call_id"], "call_0")
+
+    def test_astream_content(self):
+        async def astream(chunks):
+            for chunk in chunks:
+                yield chunk
+
+        async def collect():
+            agent = AsyncAgent(self.config)
+            return [event async for event in agent.astream_content("go")]
+
+        streams = [
+            astream(
+                [
+                    _chunk(tool_calls=[_fragment(0, '{"value": "hi"}', "c", "echo")]),
+                ]
+            ),
+            astream([_chunk(content="done")]),
+        ]
+        with patch(
+            "proto_agent.async_agent.acompletion", AsyncMock(side_effect=streams)
+        ):
+            events = asyncio.run(collect())
+        self.assertEqual(
+            [e.type for e in events], ["tool_call", "tool_result", "text", "done"]
+        )
+        self.assertEqual(
+            json.dumps(events[1].function_response.response), '{"result": "hi"}'
+        )
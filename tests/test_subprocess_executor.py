@@ -0,0 +1,61 @@
+import sys
+import threading
+import time
+import unittest
+
+from proto_agent.tool_kits.subprocess_executor import OutputBuffer, run
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_keeps_head_and_tail(self):
+        buffer = OutputBuffer(10)
+        for chunk in (b"abc", b"defgh", b"ijklmnop", b"qr"):
+            buffer.write(chunk)
+        self.assertEqual(buffer.head, b"abcde")
+        self.assertEqual(buffer.tail, b"nopqr")
+        self.assertEqual(buffer.truncated_bytes, 8)
+        self.assertEqual(
+            buffer.getvalue(), b"abcde\n[... 8 bytes truncated ...]\nnopqr"
+        )
+
+    def test_small_output_is_untouched(self):
+        buffer = OutputBuffer(10)
+        buffer.write(b"abcdefgh")
+        self.assertEqual(buffer.truncated_bytes, 0)
+        self.assertEqual(buffer.getvalue(), b"abcdefgh")
+
+
+class TestRun(unittest.TestCase):
+    """Test bounded subprocess runs"""
+
+    def test_large_output_is_bounded(self):
+        result = run(
+            [sys.executable, "-c", "import sys; sys.stdout.write('x' * 10_000_000)"],
+            max_output_bytes=100,
+        )
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(result.stdout.total_bytes, 10_000_000)
+        self.assertEqual(len(result.stdout.head + result.stdout.tail), 100)
+
+    def test_input_and_streaming(self):
+        chunks = []
+        result = run(
+            [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"],
+            input=b"hello",
+            on_output=lambda name, chunk: chunks.append((name, chunk)),
+        )
+        self.assertEqual(result.stdout.text(), "HELLO\n")
+        self.assertEqual({name for name, _ in chunks}, {"stdout"})
+        self.assertEqual(b"".join(chunk for _, chunk in chunks), b"HELLO\n")
+
+    def test_timeout_and_cancel(self):
+        sleep = [sys.executable, "-c", "import time; time.sleep(30)"]
+        result = run(sleep, timeout=0.2)
+        self.assertTrue(result.timed_out)
+
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+        start = time.monotonic()
+        result = run(sleep, cancel=cancel)
+        self.assertTrue(result.cancelled)
+        self.assertLess(time.monotonic() - start, 5)
@@ -0,0 +1,52 @@
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+from proto_agent.tool_kits import system_info_toolkit
+from proto_agent.tool_kits.system_info_toolkit import SystemInfoToolkit, get_cpu_info
+from proto_agent.tool_kits.system_sampler import SystemSampler
+
+
+class TestSystemSampler(unittest.TestCase):
+    """Test background sampling of system counters"""
+
+    def test_window_statistics(self):
+        sampler = SystemSampler(interval=0.05, window=3)
+        try:
+            self.assertIsNotNone(sampler.latest())
+            time.sleep(0.3)
+            stats = sampler.window_stats("cpu_percent")
+            self.assertEqual(stats["samples"], 3)
+            self.assertLessEqual(stats["min"], stats["avg"])
+            self.assertLessEqual(stats["avg"], stats["max"])
+        finally:
+            sampler.stop()
+
+    def test_sampler_stops_when_idle(self):
+        sampler = SystemSampler(interval=0.05, idle_timeout=0.1)
+        sampler.latest()
+        self.assertTrue(sampler.running)
+        time.sleep(0.5)
+        self.assertFalse(sampler.running)
+        # Reading again restarts it
+        self.assertIsNotNone(sampler.latest())
+        sampler.stop()
+
+    def test_closing_one_toolkit_keeps_sampling_for_others(self):
+        shared = SystemSampler(interval=0.05)
+        with patch.object(system_info_toolkit, "sampler", shared):
+            first = SystemInfoToolkit()
+            second = SystemInfoToolkit()
+            first.close()
+            first.close()
+            self.assertTrue(shared.running)
+            second.close()
+            self.assertFalse(shared.running)
+
+    def test_get_cpu_info_does_not_block(self):
+        get_cpu_info(".")
+        start = time.perf_counter()
+        info = json.loads(get_cpu_info("."))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn("recent_usage", info)
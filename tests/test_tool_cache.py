@@ -0,0 +1,103 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from proto_agent.tool_cache import (
+    FILES,
+    MISS,
+    CachePolicy,
+    ToolResultCache,
+    git_fingerprint,
+)
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.tool_kits import FileOperationToolkit
+from proto_agent.tool_kits import file_operation_toolkit
+
+
+class TestToolResultCache(unittest.TestCase):
+    """Test caching of read-only toolkit results in the registry"""
+
+    def setUp(self):
+        ToolKitRegistery.cache.clear()
+        self.registry = FileOperationToolkit(enable_execute=False).registry
+        self.tmp = tempfile.TemporaryDirectory()
+        self.working_directory = Path(self.tmp.name)
+        (self.working_directory / "a.txt").write_text("first")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _read(self):
+        return self.registry.dispatch(
+            "get_file_content", self.working_directory, {"file_path": "a.txt"}
+        )
+
+    def test_repeated_reads_hit_the_cache(self):
+        with patch.object(
+            file_operation_toolkit,
+            "get_file_content",
+            wraps=file_operation_toolkit.get_file_content,
+        ) as reader:
+            self.assertEqual(self._read(), "first")
+            self.assertEqual(self._read(), "first")
+        self.assertEqual(reader.call_count, 1)
+
+    def test_write_file_evicts_the_entry(self):
+        self._read()
+        self.registry.dispatch(
+            "write_file",
+            self.working_directory,
+            {"file_path": "a.txt", "content": "second"},
+        )
+        self.assertEqual(self._read(), "second")
+
+    def test_outside_change_is_detected_by_fingerprint(self):
+        self._read()
+        path = self.working_directory / "a.txt"
+        path.write_text("changed!")
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(self._read(), "changed!")
+
+    def test_listing_follows_files_rewritten_in_place(self):
+        def listing(**args):
+            return self.registry.dispatch(
+                "get_files_info", self.working_directory, args
+            )
+
+        (self.working_directory / "sub").mkdir()
+        before = listing()
+        directory = self.working_directory.stat()
+        (self.working_directory / "a.txt").write_text("rewritten")
+        os.utime(
+            self.working_directory, ns=(directory.st_atime_ns, directory.st_mtime_ns)
+        )
+        self.assertNotEqual(listing(), before)
+        self.assertIn("file_size=9", listing())
+
+        listing(recursive=True)
+        (self.working_directory / "sub" / "b.txt").write_text("b")
+        self.assertIn("sub/b.txt", listing(recursive=True))
+
+    def test_git_fingerprint_tracks_head_and_index(self):
+        git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+        run = dict(cwd=self.working_directory, capture_output=True, check=True)
+        subprocess.run(["git", "init", "-q"], **run)
+        before = git_fingerprint(str(self.working_directory), {})
+        subprocess.run(["git", "add", "a.txt"], **run)
+        staged = git_fingerprint(str(self.working_directory), {})
+        subprocess.run([*git, "commit", "-qm", "init"], **run)
+        committed = git_fingerprint(str(self.working_directory), {})
+        self.assertNotEqual(before, staged)
+        self.assertNotEqual(staged, committed)
+
+    def test_large_results_are_not_cached(self):
+        cache = ToolResultCache()
+        policy = CachePolicy(group=FILES, max_result_bytes=10)
+        small, large = (cache.make_key(name, ".", {}) for name in ("small", "large"))
+        cache.put(small, policy, {}, "x" * 10, None)
+        cache.put(large, policy, {}, "x" * 11, None)
+        self.assertEqual(cache.get(small, None), "x" * 10)
+        self.assertIs(cache.get(large, None), MISS)
@@ -0,0 +1,103 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from proto_agent import Agent, AgentConfig
+from proto_agent import tool_kit_registry
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.tool_kits import FileOperationToolkit
+from proto_agent.types_llm import FunctionCall, FunctionDeclaration, Tool
+
+
+def _echo(working_directory: str, value: str) -> str:
+    return value
+
+
+class TestToolRegistries(unittest.TestCase):
+    """Test per-toolkit and per-agent tool registries"""
+
+    def setUp(self):
+        ToolKitRegistery.cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        (Path(self.tmp.name) / "a.txt").write_text("0123456789")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _agent(self, *tools) -> Agent:
+        return Agent(
+            AgentConfig(
+                api_key="test_key",
+                working_directory=self.tmp.name,
+                model="test/model",
+                tools=list(tools),
+            )
+        )
+
+    def _call(self, agent: Agent, name: str, **args):
+        response = agent.call_function(FunctionCall(name=name, arguments=args))
+        return response.parts[0].function_response.response
+
+    def test_toolkits_with_different_settings_coexist(self):
+        reader = FileOperationToolkit(
+            enable_write=False, enable_execute=False, max_bytes=4
+        )
+        writer = FileOperationToolkit(enable_execute=False)
+        self.assertIsNone(tool_kit_registry.global_registry.get_function("write_file"))
+
+        read_only_agent = self._agent(reader.tool)
+        full_agent = self._agent(writer.tool)
+        # Same function name and arguments, cached separately per toolkit
+        self.assertTrue(
+            self._call(read_only_agent, "get_file_content", file_path="a.txt")[
+                "result"
+            ].startswith("0123[")
+        )
+        self.assertEqual(
+            self._call(full_agent, "get_file_content", file_path="a.txt")["result"],
+            "0123456789",
+        )
+        self.assertEqual(
+            self._call(read_only_agent, "write_file", file_path="b.txt", content="x"),
+            {"error": "Unknown function: write_file"},
+        )
+        self._call(full_agent, "write_file", file_path="b.txt", content="x")
+        self.assertEqual((Path(self.tmp.name) / "b.txt").read_text(), "x")
+
+    def test_plain_tools_use_the_global_registry(self):
+        schema = FunctionDeclaration(
+            name="echo",
+            description="Echo the value",
+            parameters={"type": "object", "properties": {"value": {"type": "string"}}},
+        )
+        with self.assertRaisesRegex(ValueError, "'echo' is declared but not"):
+            self._agent(Tool(function_declarations=[schema]))
+
+        registry = ToolKitRegistery()
+        with patch.object(tool_kit_registry, "global_registry", registry):
+            # The class-level call of custom toolkits still reaches the global registry
+            with self.assertWarns(DeprecationWarning):
+                ToolKitRegistery.register("echo", _echo, schema)
+            self.assertIs(registry.get_function("echo"), _echo)
+            agent = self._agent(Tool(function_declarations=[schema]))
+            with self.assertRaises(ValueError):
+                registry.register("echo", _echo, schema)
+        self.assertEqual(self._call(agent, "echo", value="hi"), {"result": "hi"})
+
+        toolkit = FileOperationToolkit()
+        with self.assertRaisesRegex(ValueError, "two tools"):
+            self._agent(toolkit.tool, FileOperationToolkit().tool)
+
+    def test_agents_share_converted_schemas(self):
+        tool = FileOperationToolkit().tool
+        first, second = self._agent(tool), self._agent(tool)
+        self.assertEqual(len(first._litellm_tools), len(tool.function_declarations))
+        for a, b in zip(first._litellm_tools, second._litellm_tools):
+            self.assertIs(a, b)
+        self.assertIsNot(first.registry, second.registry)
+        self.assertEqual(first.registry._functions, second.registry._functions)
+
+
+if __name__ == "__main__":
+    unittest.main()
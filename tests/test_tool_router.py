@@ -0,0 +1,122 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from proto_agent import Agent, AgentConfig
+from proto_agent.tool_kit_registry import ToolKitRegistery
+from proto_agent.tool_router import BM25ToolRouter
+from proto_agent.types_llm import FunctionDeclaration, Tool
+
+DESCRIPTIONS = {
+    "read_file": "Read the contents of a file",
+    "write_file": "Write content to a file, overwriting it",
+    "list_directory": "List the files in a directory",
+    "git_log": "Show the commit history of the repository",
+    "git_diff": "Show uncommitted changes in the repository",
+    "memory_usage": "Report system memory usage",
+    "cpu_info": "Report CPU load and core count",
+    "disk_usage": "Report free disk space",
+}
+
+
+def _response(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _tool_call(call_id: str, name: str):
+    return SimpleNamespace(
+        id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps({}))
+    )
+
+
+def _names(tools):
+    return [tool["function"]["name"] for tool in tools]
+
+
+class TestToolRouter(unittest.TestCase):
+    """Test per-turn tool selection"""
+
+    def setUp(self):
+        self.registry = ToolKitRegistery()
+        declarations = []
+        for name, description in DESCRIPTIONS.items():
+            schema = FunctionDeclaration(
+                name=name,
+                description=description,
+                parameters={"type": "object", "properties": {}},
+            )
+            self.registry.register(name, lambda working_directory: "ok", schema)
+            declarations.append(schema)
+        self.tool = Tool(function_declarations=declarations, registry=self.registry)
+        self.schemas = self.tool.litellm_tools()
+        self.router = BM25ToolRouter(max_tools=2)
+
+    def _select(self, *messages):
+        return _names(self.router.select(list(self.schemas), list(messages)))
+
+    def test_selection(self):
+        user = {"role": "user", "content": "How much memory and disk space is left?"}
+        self.assertEqual(self._select(user), ["memory_usage", "disk_usage"])
+        # Nothing matches: every tool is offered
+        self.assertEqual(
+            self._select({"role": "user", "content": "hello"}), list(DESCRIPTIONS)
+        )
+
+        called = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"id": "1", "function": {"name": "git_log"}}],
+        }
+        later = {"role": "user", "content": "Which files are in the directory?"}
+        # Recently used tools stay offered, in their original order
+        self.assertEqual(
+            self._select(user, called, later),
+            ["read_file", "list_directory", "git_log"],
+        )
+        # A call to a tool that does not exist brings every tool back
+        guessed = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"id": "2", "function": {"name": "read_files"}}],
+        }
+        self.assertEqual(self._select(user, guessed), list(DESCRIPTIONS))
+
+        self.router.keep_recent_turns = 0
+        self.assertEqual(
+            self._select(user, called, later), ["read_file", "list_directory"]
+        )
+
+    def test_agent_offers_routed_tools(self):
+        requests = []
+
+        def fake_completion(**kwargs):
+            requests.append(_names(kwargs["tools"]))
+            if len(requests) == 1:
+                return _response(tool_calls=[_tool_call("call_0", "git_log")])
+            return _response(content="done")
+
+        agent = Agent(
+            AgentConfig(
+                api_key="k",
+                working_directory=".",
+                model="test/model",
+                tools=[self.tool],
+                tool_router=self.router,
+            )
+        )
+        with patch("proto_agent.agent.completion", side_effect=fake_completion):
+            agent.generate_content(prompt="Show the commit history")
+        self.assertEqual(requests, [["git_log", "git_diff"]] * 2)
+
+        # Without a router every tool is sent
+        agent.settings.tool_router = None
+        with patch("proto_agent.agent.completion", side_effect=fake_completion):
+            agent.generate_content(prompt="Show the commit history")
+        self.assertEqual(requests[-1], list(DESCRIPTIONS))
+
+
+if __name__ == "__main__":
+    unittest.main()